@@ -6,6 +6,7 @@ from app.config import Config
 from app import commands
 from app.routes import register_blueprints
 from app.models import db
+from app.services import library_stats
 import os
 
 # Initialize extensions
@@ -23,14 +24,11 @@ def create_app():
     db.init_app(app) 
     jwt.init_app(app)
     commands.init_app(app) 
+    library_stats.init_app(app)
     
     CORS(
         app,
-        origins=[
-            "https://chitterchatter.app",
-            "https://www.chitterchatter.app",
-            "http://localhost:3000"
-        ],
+        origins=app.config["CORS_ORIGINS"],
         supports_credentials=True
     )
     
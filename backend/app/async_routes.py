@@ -0,0 +1,355 @@
+# app/async_routes.py
+
+"""
+ASGI routes for the endpoints that spend most of their time waiting on OpenAI:
+realtime session minting, end-of-conversation feedback and the dialogic
+feedback chat. (Image generation runs as background jobs, app.services.image_jobs.)
+
+Served by asgi.py in front of the Flask app, these handle the same URLs as
+their Flask views with async HTTP clients, so an in-flight upstream call holds
+a coroutine instead of a worker. There is no async database driver, so the
+short database phases (shared with the Flask views) run in the thread pool
+inside the request's app context. Every other URL falls through to Flask.
+"""
+
+import asyncio
+import functools
+import os
+import time
+
+import jwt
+from flask import current_app, jsonify
+from flask_jwt_extended import decode_token
+from flask_jwt_extended.exceptions import JWTExtendedException
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.middleware.wsgi import WSGIMiddleware
+from starlette.responses import Response
+from starlette.routing import Mount, Route
+
+from app.models import db
+from app.routes.chatbot import (
+    voice_service,
+    prepare_session,
+    queued_response,
+    session_unavailable_response,
+    authorize_case_start,
+    admit_case_start,
+    create_conversation,
+    bootstrap_response,
+    abandon_bootstrap,
+)
+from app.routes.conversations import (
+    close_conversation,
+    store_conversation_feedback,
+    feedback_unavailable_response,
+)
+from app.routes.dialogic_feedback import (
+    receive_feedback_message,
+    reply_to_feedback_message,
+    feedback_reply_context,
+    request_feedback_reply_async,
+    take_prefetched_answer_async,
+    discard_prefetched_answers,
+    FEEDBACK_REPLY_UNAVAILABLE,
+    FEEDBACK_REPLY_FAILED,
+)
+from app.services.llm_metrics import case_labels
+from app.services.llm_transport import CircuitOpenError, FEEDBACK_POLICY, get_async_openai_client
+from app.services.model_router import routed_completion_async, select_models
+from app.services.session_pool import session_pool
+from app.services.session_registry import activate, release
+
+
+class AuthError(Exception):
+    """Missing or invalid bearer token; mirrors Flask-JWT-Extended's responses."""
+
+    def __init__(self, message, status=401):
+        self.message = message
+        self.status = status
+        super().__init__(message)
+
+
+def run_db(fn, *args, **kwargs):
+    """Run blocking database work in the thread pool, inside the request's app context."""
+    return run_in_threadpool(fn, *args, **kwargs)
+
+
+def run_db_phase(fn, *args, **kwargs):
+    """
+    run_db, then end the transaction, for work followed by an upstream call:
+    an open transaction would hold a pooled connection (and, on SQLite, the
+    write lock) for the whole wait.
+    """
+    def phase():
+        result = fn(*args, **kwargs)
+        db.session.commit()
+        return result
+    return run_in_threadpool(phase)
+
+
+def jwt_identity(request):
+    """The identity of the request's bearer token, like get_jwt_identity() after @jwt_required()."""
+    header = request.headers.get("Authorization", "")
+    if not header.startswith("Bearer "):
+        raise AuthError("Missing Authorization Header")
+    try:
+        claims = decode_token(header[len("Bearer "):])
+    except jwt.ExpiredSignatureError:
+        raise AuthError("Token has expired")
+    except (jwt.InvalidTokenError, JWTExtendedException) as e:
+        raise AuthError(str(e), status=422)
+    if claims.get("type") != "access":
+        raise AuthError("Only non-refresh tokens are allowed", status=422)
+    return claims[current_app.config["JWT_IDENTITY_CLAIM"]]
+
+
+def to_asgi_response(result, request):
+    """
+    Convert a Flask view return value (a response, or a (response, status)
+    pair) to a Starlette response, adding the CORS headers Flask-CORS would.
+    Preflight requests still reach Flask, which knows these URLs too.
+    """
+    status = None
+    if isinstance(result, tuple):
+        result, status = result
+    headers = dict(result.headers)
+    origin = request.headers.get("origin")
+    if origin in current_app.config["CORS_ORIGINS"]:
+        headers["Access-Control-Allow-Origin"] = origin
+        headers["Access-Control-Allow-Credentials"] = "true"
+        headers["Vary"] = "Origin"
+    return Response(content=result.get_data(), status_code=status or result.status_code, headers=headers)
+
+
+def flask_endpoint(handler):
+    """
+    Wrap an async handler so it runs inside a Flask app context and may return
+    Flask responses, like the views it stands in for.
+    """
+    @functools.wraps(handler)
+    async def endpoint(request):
+        with request.app.state.flask_app.app_context():
+            try:
+                result = await handler(request)
+            except AuthError as e:
+                result = jsonify({"msg": e.message}), e.status
+            return to_asgi_response(result, request)
+    return endpoint
+
+
+# ============================================================================
+# CHATBOT
+# ============================================================================
+
+@flask_endpoint
+async def create_session(request):
+    try:
+        data = await request.json()
+        prepared, error = await run_db(prepare_session, data)
+        if error:
+            return error
+
+        compiled, speed, admission = prepared
+        if not admission.admitted:
+            return queued_response(admission)
+
+        try:
+            # Hand out a pre-warmed session if one is ready; the pool refills in the background
+            session_data = session_pool.take(compiled, speed)
+            if not session_data:
+                session_data = await voice_service.start_session_async(compiled.build(speed), **compiled.labels)
+        except Exception:
+            await run_db(release, admission.entry)
+            raise
+
+        await run_db(activate, admission.entry, session_data, data.get("conversation_id"))
+        return jsonify(session_data)
+
+    except CircuitOpenError as e:
+        return session_unavailable_response(e)
+
+    except Exception as e:
+        current_app.logger.error(f"Error creating session: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+
+@flask_endpoint
+async def bootstrap_conversation(request):
+    """Async /api/chatbot/bootstrap: the session is minted while the conversation row is written."""
+    user_id = jwt_identity(request)
+    timings = {}
+    started = time.perf_counter()
+    conversation = None
+    admission = None
+
+    def mark(name, since):
+        timings[name] = round((time.perf_counter() - since) * 1000, 1)
+        return time.perf_counter()
+
+    async def mint(compiled, speed):
+        minted_at = time.perf_counter()
+        session_data = session_pool.take(compiled, speed)
+        pooled = session_data is not None
+        if not pooled:
+            session_data = await voice_service.start_session_async(compiled.build(speed), **compiled.labels)
+        return session_data, round((time.perf_counter() - minted_at) * 1000, 1), pooled
+
+    try:
+        try:
+            data = await request.json()
+        except ValueError:
+            data = {}
+
+        step = time.perf_counter()
+        authorized, error = await run_db(authorize_case_start, user_id, data.get("practice_case_id"))
+        if error:
+            return error
+        user, practice_case = authorized
+        step = mark("auth", step)
+
+        compiled, speed, admission = await run_db(admit_case_start, user, practice_case, data)
+        if not admission.admitted:
+            return queued_response(admission)
+        step = mark("admission", step)
+
+        session_task = asyncio.ensure_future(mint(compiled, speed))
+        try:
+            conversation, case_data = await run_db(create_conversation, user, practice_case)
+        except Exception:
+            session_task.cancel()
+            raise
+        step = mark("conversation", step)
+
+        session_data, session_ms, pooled = await session_task
+        timings["session"] = session_ms
+        await run_db(activate, admission.entry, session_data, conversation.id)
+        mark("session_wait", step)
+        mark("total", started)
+
+        return bootstrap_response(conversation, case_data, session_data, pooled, timings)
+
+    except Exception as e:
+        return await run_db(abandon_bootstrap, e, conversation, admission)
+
+
+# ============================================================================
+# CONVERSATIONS
+# ============================================================================
+
+@flask_endpoint
+async def end_conversation(request):
+    user_id = jwt_identity(request)
+    conversation_id = request.path_params["conversation_id"]
+    try:
+        current_app.logger.info(f"🔥 Attempting to end conversation {conversation_id}")
+
+        def close():
+            closed, error = close_conversation(conversation_id, user_id)
+            if error:
+                return None, error
+            conversation, practice_case, feedback_messages = closed
+            context = (select_models("feedback", practice_case), case_labels(practice_case))
+            return (conversation, feedback_messages, context), None
+
+        closed, error = await run_db_phase(close)
+        if error:
+            return error
+        conversation, feedback_messages, (models, labels) = closed
+
+        # Generate structured JSON feedback with the model routed for this case
+        client = get_async_openai_client().with_options(timeout=FEEDBACK_POLICY.timeout)
+
+        try:
+            response, feedback_model = await routed_completion_async(
+                "feedback",
+                "end_conversation",
+                lambda model: client.chat.completions.create(model=model, messages=feedback_messages),
+                FEEDBACK_POLICY,
+                labels=labels,
+                models=models
+            )
+            return await run_db(store_conversation_feedback, conversation, user_id, response, feedback_model)
+
+        except CircuitOpenError as circuit_error:
+            return feedback_unavailable_response(circuit_error)
+
+        except Exception as ai_error:
+            current_app.logger.error(f"❌ OpenAI API call failed: {str(ai_error)}")
+            return jsonify({"error": f"Failed to generate AI feedback: {str(ai_error)}"}), 500
+
+    except Exception as e:
+        await run_db(db.session.rollback)
+        current_app.logger.error(f"❌ General error ending conversation: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+
+# ============================================================================
+# DIALOGIC FEEDBACK
+# ============================================================================
+
+@flask_endpoint
+async def send_feedback_message(request):
+    user_id = jwt_identity(request)
+    feedback_conversation_id = request.path_params["feedback_conversation_id"]
+    try:
+        data = await request.json()
+        def receive():
+            received, error = receive_feedback_message(feedback_conversation_id, user_id, data)
+            if error:
+                return None, error
+            feedback_conv, user_message, feedback_json, prefetched = received
+            # Read before the commit expires the row, so the event loop never lazy-loads
+            return (feedback_conv, feedback_conv.id, feedback_json, prefetched), None
+
+        received, error = await run_db_phase(receive)
+        if error:
+            return error
+        feedback_conv, feedback_conv_id, feedback_json, prefetched = received
+
+        # Serve a prefetched answer for an initial suggestion click, otherwise generate one
+        ai_response = await take_prefetched_answer_async(*prefetched) if prefetched else None
+        if ai_response:
+            current_app.logger.info(f"⚡ Served prefetched suggestion answer for feedback conversation {feedback_conv_id}")
+        discard_prefetched_answers(feedback_conv_id)
+
+        if ai_response is None:
+            ai_response = await generate_ai_feedback_response(feedback_conv, feedback_json)
+
+        return await run_db(reply_to_feedback_message, feedback_conv, ai_response, feedback_json)
+
+    except Exception as e:
+        current_app.logger.error(f"❌ Error in feedback chat: {str(e)}")
+        return jsonify({"error": "Failed to process message"}), 500
+
+
+async def generate_ai_feedback_response(feedback_conv, feedback_json=None):
+    """Async counterpart of dialogic_feedback.generate_ai_feedback_response."""
+    try:
+        if not os.getenv("OPENAI_API_KEY"):
+            return FEEDBACK_REPLY_UNAVAILABLE
+
+        api_messages, labels, models = await run_db_phase(feedback_reply_context, feedback_conv, feedback_json)
+        return await request_feedback_reply_async(api_messages, labels=labels, models=models)
+
+    except Exception as e:
+        current_app.logger.error(f"❌ Error generating AI response: {str(e)}")
+        return FEEDBACK_REPLY_FAILED
+
+
+ROUTES = [
+    Route("/api/chatbot/session", create_session, methods=["POST"]),
+    Route("/api/chatbot/bootstrap", bootstrap_conversation, methods=["POST"]),
+    Route("/api/conversations/conversation/{conversation_id:int}/end", end_conversation, methods=["POST"]),
+    Route("/api/dialogic_feedback/feedback/{feedback_conversation_id:int}/chat", send_feedback_message, methods=["POST"]),
+]
+
+
+def create_asgi_app(flask_app):
+    """
+    ASGI application serving ROUTES natively and every other request through
+    the Flask app.
+    """
+    app = Starlette(routes=ROUTES + [Mount("/", app=WSGIMiddleware(flask_app))])
+    app.state.flask_app = flask_app
+    return app
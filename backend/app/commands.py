@@ -2,6 +2,7 @@
 
 import os
 import click
+from datetime import timezone
 from flask.cli import with_appcontext
 from .models import db, User  # Adjust the import based on your project structure
 
@@ -53,6 +54,156 @@ def seed_master_command():
     
     click.echo('Master user created successfully.')
 
+@click.command('regenerate-feedback')
+@click.option('--feedback-version', required=True, help='Version label for the new FeedbackConversation rows, e.g. json_v2.')
+@click.option('--model', default=None, help='Model to generate feedback with (defaults to the live feedback model).')
+@click.option('--class-id', type=int, default=None, help='Only conversations in this class.')
+@click.option('--case-id', type=int, default=None, help='Only conversations for this practice case.')
+@click.option('--since', type=click.DateTime(), default=None, help='Only conversations started on or after this date (UTC).')
+@click.option('--until', type=click.DateTime(), default=None, help='Only conversations started before this date (UTC).')
+@click.option('--limit', type=int, default=None, help='Maximum number of conversations to process.')
+@click.option('--concurrency', type=int, default=8, show_default=True, help='Maximum in-flight model requests.')
+@click.option('--max-attempts', type=int, default=3, show_default=True, help='Attempts per conversation.')
+@click.option('--retry-budget', type=int, default=100, show_default=True, help='Total retries allowed across the run.')
+@click.option('--chunk-size', type=int, default=100, show_default=True, help='Conversations fetched and committed per chunk.')
+@click.option('--resume/--no-resume', default=True, show_default=True, help='Skip conversations that already have feedback for this version.')
+@click.option('--export-batch', type=click.Path(dir_okay=False, writable=True), default=None, help='Write a JSONL batch request file instead of calling the model.')
+@click.option('--import-batch', type=click.Path(exists=True, dir_okay=False), default=None, help='Store feedback from a JSONL batch results file.')
+@with_appcontext
+def regenerate_feedback_command(feedback_version, model, class_id, case_id, since, until, limit,
+                                concurrency, max_attempts, retry_budget, chunk_size, resume,
+                                export_batch, import_batch):
+    """Re-run feedback generation over historical conversations."""
+    from .services.feedback_regeneration import FeedbackRegenerator
+    from .services.model_router import select_models
+
+    regenerator = FeedbackRegenerator(
+        feedback_version,
+        model=model or select_models("feedback")[0],
+        concurrency=concurrency,
+        max_attempts=max_attempts,
+        retry_budget=retry_budget,
+        chunk_size=chunk_size,
+    )
+
+    if import_batch:
+        stats = regenerator.import_batch(import_batch, resume=resume)
+        click.echo(f'Imported batch results from {import_batch}: {stats}')
+        return
+
+    conversations = regenerator.select_conversations(
+        class_id=class_id,
+        case_id=case_id,
+        since=since.replace(tzinfo=timezone.utc) if since else None,
+        until=until.replace(tzinfo=timezone.utc) if until else None,
+        resume=resume,
+        limit=limit,
+    )
+
+    if export_batch:
+        count = regenerator.export_batch(conversations, export_batch)
+        click.echo(f'Wrote {count} batch requests to {export_batch}.')
+        return
+
+    stats = regenerator.run(conversations)
+    click.echo(f'Feedback regeneration finished: {stats}')
+
+@click.command('prerender-voice-previews')
+@click.option('--text', default=None, help='Sample sentence to render (defaults to the one the case editor plays).')
+@click.option('--force', is_flag=True, help='Re-render previews that are already cached.')
+@with_appcontext
+def prerender_voice_previews_command(text, force):
+    """Render and cache a preview for every voice in /api/chatbot/voice/options."""
+    from .services.audio_cache import get_or_render_preview
+    from .services.voice_service import VOICE_OPTIONS, DEFAULT_PREVIEW_TEXT
+
+    failed = []
+    for voice in VOICE_OPTIONS:
+        key, audio = get_or_render_preview(voice["id"], text or DEFAULT_PREVIEW_TEXT, force=force)
+        if audio is None:
+            failed.append(voice["id"])
+            click.echo(f'Failed to render preview for {voice["id"]}.')
+        else:
+            click.echo(f'{voice["id"]}: {key} ({len(audio)} bytes)')
+
+    click.echo(f'Pre-rendered {len(VOICE_OPTIONS) - len(failed)} of {len(VOICE_OPTIONS)} voice previews.')
+
+@click.command('reap-realtime-sessions')
+@with_appcontext
+def reap_realtime_sessions_command():
+    """Expire realtime session leases that ran out and drop abandoned queue tickets."""
+    from .services.session_registry import reap_expired
+
+    reaped = reap_expired()
+    db.session.commit()
+    click.echo(f'Reaped {reaped} realtime sessions.')
+
+@click.command('refresh-library-stats')
+@with_appcontext
+def refresh_library_stats_command():
+    """Recompute the materialized library statistics (for a scheduler)."""
+    from .services.library_stats import refresh_library_stats
+
+    stats = refresh_library_stats()
+    db.session.commit()
+    click.echo(f'Library stats refreshed: {stats.total_cases} cases, {stats.total_downloads} downloads.')
+
+@click.command('fold-library-downloads')
+@with_appcontext
+def fold_library_downloads_command():
+    """Fold pending library downloads into the case and library stats counters."""
+    from .services.library_counters import fold_downloads
+
+    click.echo(f'Folded {fold_downloads()} library downloads.')
+
+@click.command('build-library-neighbors')
+@click.option('--top-k', type=int, default=10, show_default=True, help='Neighbours stored per case.')
+@with_appcontext
+def build_library_neighbors_command(top_k):
+    """Refit the library TF-IDF index and recompute every case's similar-case list."""
+    from .services.library_similarity import build_index
+
+    click.echo(f'Indexed {build_index(top_k=top_k)} library cases.')
+
+@click.command('index-library-signatures')
+@with_appcontext
+def index_library_signatures_command():
+    """Compute near-duplicate signatures for library cases submitted before they were stored."""
+    from .services.library_duplicates import index_case
+    from .models import PracticeCase
+
+    cases = PracticeCase.query.filter(PracticeCase.submitted_to_library == True).order_by(PracticeCase.id).all()
+    flagged = sum(1 for case in cases if index_case(case))
+    db.session.commit()
+    click.echo(f'Indexed {len(cases)} library cases; {flagged} look like near-duplicates.')
+
+@click.command('build-image-derivatives')
+@with_appcontext
+def build_image_derivatives_command():
+    """Add WebP/AVIF derivatives and placeholders to case images stored before they existed."""
+    from .services.image_service import ImageService
+    from .models import PracticeCaseImage
+
+    images = PracticeCaseImage.query.filter(PracticeCaseImage.variants.is_(None)).all()
+    built = 0
+    for image in images:
+        try:
+            if ImageService.add_derivatives(image):
+                built += 1
+                db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            click.echo(f'Failed to build derivatives for image {image.id}: {e}')
+    click.echo(f'Built derivatives for {built} of {len(images)} images.')
+
 def init_app(app):
     """Register the command with the Flask app."""
-    app.cli.add_command(seed_master_command)
\ No newline at end of file
+    app.cli.add_command(seed_master_command)
+    app.cli.add_command(regenerate_feedback_command)
+    app.cli.add_command(prerender_voice_previews_command)
+    app.cli.add_command(reap_realtime_sessions_command)
+    app.cli.add_command(refresh_library_stats_command)
+    app.cli.add_command(fold_library_downloads_command)
+    app.cli.add_command(build_library_neighbors_command)
+    app.cli.add_command(index_library_signatures_command)
+    app.cli.add_command(build_image_derivatives_command)
\ No newline at end of file
@@ -1,5 +1,6 @@
 from dotenv import load_dotenv
 import os
+import json
 from datetime import timedelta
 
 # Load environment variables from the .env file
@@ -23,6 +24,54 @@ class Config:
 
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(hours=1)
 
+    # Origins allowed to call the API (Flask-CORS, and the ASGI routes in app.async_routes)
+    CORS_ORIGINS = [
+        "https://chitterchatter.app",
+        "https://www.chitterchatter.app",
+        "http://localhost:3000"
+    ]
+
+    # Mixed into conditional-GET ETags (app.utils.http_cache) so a deploy that changes a
+    # response shape never revalidates a body cached by the previous release
+    ETAG_SALT = os.getenv("ETAG_SALT") or os.getenv("HEROKU_SLUG_COMMIT", "")
+
+    # Model routing per call type (unset falls back to app.services.model_router.DEFAULT_ROUTES;
+    # a case can override these via feedback_config["models"])
+    FEEDBACK_MODEL = os.getenv("FEEDBACK_MODEL")
+    FEEDBACK_FALLBACK_MODEL = os.getenv("FEEDBACK_FALLBACK_MODEL")
+    FEEDBACK_CHAT_MODEL = os.getenv("FEEDBACK_CHAT_MODEL")
+    FEEDBACK_CHAT_FALLBACK_MODEL = os.getenv("FEEDBACK_CHAT_FALLBACK_MODEL")
+
+    # Speculative answers for the dialogic feedback suggestion buttons
+    SUGGESTION_PREFETCH_ENABLED = os.getenv("SUGGESTION_PREFETCH_ENABLED", "true").lower() == "true"
+    SUGGESTION_PREFETCH_WAIT_SECONDS = int(os.getenv("SUGGESTION_PREFETCH_WAIT_SECONDS", "20"))
+
+    # Pre-minted realtime sessions per practice case (see app.services.session_pool). Off by
+    # default: each worker mints about one session a minute per case viewed, mostly unused
+    REALTIME_SESSION_POOL_ENABLED = os.getenv("REALTIME_SESSION_POOL_ENABLED", "false").lower() == "true"
+    REALTIME_SESSION_POOL_SIZE = int(os.getenv("REALTIME_SESSION_POOL_SIZE", "1"))
+
+    # Concurrent realtime sessions per institution (see app.services.session_registry); 0 means
+    # unlimited, so admission control is off until enabled, usually per institution through
+    # REALTIME_SESSION_LIMITS, e.g. '{"3": 40}'
+    REALTIME_SESSION_LIMIT = int(os.getenv("REALTIME_SESSION_LIMIT", "0"))
+    REALTIME_SESSION_LIMITS = json.loads(os.getenv("REALTIME_SESSION_LIMITS", "{}"))
+    REALTIME_SESSION_MAX_SECONDS = int(os.getenv("REALTIME_SESSION_MAX_SECONDS", "1800"))
+
+    # /library/stats is recomputed on library writes, and at least this often (see app.services.library_stats)
+    LIBRARY_STATS_MAX_AGE_SECONDS = int(os.getenv("LIBRARY_STATS_MAX_AGE_SECONDS", "900"))
+
+    # Case image generation runs as background jobs (see app.services.image_jobs): at most
+    # IMAGE_JOB_WORKERS at once per process, IMAGE_JOBS_PER_USER queued or running per user
+    IMAGE_JOB_WORKERS = int(os.getenv("IMAGE_JOB_WORKERS", "4"))
+    IMAGE_JOBS_PER_USER = int(os.getenv("IMAGE_JOBS_PER_USER", "2"))
+
+    # Content-addressed voice preview cache: "disk" (VOICE_PREVIEW_CACHE_DIR, default
+    # <instance>/voice_previews) or "s3" (AWS_S3_BUCKET_NAME under voice-previews/)
+    VOICE_PREVIEW_CACHE_BACKEND = os.getenv("VOICE_PREVIEW_CACHE_BACKEND", "disk")
+    VOICE_PREVIEW_CACHE_DIR = os.getenv("VOICE_PREVIEW_CACHE_DIR")
+    VOICE_PREVIEW_CACHE_MAX_BYTES = int(os.getenv("VOICE_PREVIEW_CACHE_MAX_BYTES", str(50 * 1024 * 1024)))
+
     @staticmethod
     def validate():
         """Ensure all required variables are set."""
@@ -16,10 +16,21 @@ from .term import Term
 from .feedback_conversation import FeedbackConversation
 from .feedback_message import FeedbackMessage
 from .practice_case_image import PracticeCaseImage
+from .llm_usage import LLMUsage
+from .realtime_session import RealtimeSession
+from .library_tag import LibraryTag, library_case_tags
+from .library_stats import LibraryStats
+from .library_rating import LibraryRating, LibraryDownload
+from .library_similarity import LibraryVectorModel, LibraryCaseVector
+from .library_signature import LibraryCaseSignature, LibraryLSHBucket
+from .image_job import ImageJob
 
 __all__ = [
     "User", "Institution", "Class", "Section", "Enrollment", 
     "Conversation", "Message", "PracticeCase", "SystemFeedback", 
     "Survey", "Term", "FeedbackConversation", "FeedbackMessage"
-    "PracticeCaseImage", "UserImageCredits"
+    "PracticeCaseImage", "UserImageCredits", "LLMUsage", "RealtimeSession",
+    "LibraryTag", "LibraryStats", "LibraryRating", "LibraryDownload",
+    "LibraryVectorModel", "LibraryCaseVector", "LibraryCaseSignature", "LibraryLSHBucket",
+    "ImageJob"
 ]
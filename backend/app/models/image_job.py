@@ -0,0 +1,49 @@
+from app.models import db
+
+class ImageJob(db.Model):
+    """
+    A background image generation for a practice case (app.services.image_jobs).
+    Stored in the database so any worker can report its progress; image_id is
+    the saved image once it succeeds.
+    """
+    __tablename__ = "image_jobs"
+
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    ACTIVE_STATUSES = (QUEUED, RUNNING)
+
+    id = db.Column(db.Integer, primary_key=True)
+    practice_case_id = db.Column(db.Integer, db.ForeignKey("practice_cases.id", ondelete="CASCADE"), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    include_person = db.Column(db.Boolean, default=False, nullable=False)
+    status = db.Column(db.String(20), default=QUEUED, nullable=False)
+    image_id = db.Column(db.Integer, db.ForeignKey("practice_case_images.id", ondelete="SET NULL"), nullable=True)
+    error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime(timezone=True), default=db.func.now())
+    started_at = db.Column(db.DateTime(timezone=True), nullable=True)
+    finished_at = db.Column(db.DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        db.Index("ix_image_jobs_user_status", "user_id", "status"),
+        # One queued or running job per case
+        db.Index("uq_image_jobs_active_case", "practice_case_id", unique=True,
+                 postgresql_where=db.text("status IN ('queued', 'running')"),
+                 sqlite_where=db.text("status IN ('queued', 'running')")),
+    )
+
+    image = db.relationship("PracticeCaseImage")
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "practice_case_id": self.practice_case_id,
+            "include_person": self.include_person,
+            "status": self.status,
+            "image": self.image.to_dict() if self.image else None,
+            "error": self.error,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None
+        }
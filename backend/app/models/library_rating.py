@@ -0,0 +1,32 @@
+from app.models import db
+
+class LibraryRating(db.Model):
+    """
+    One user's rating of a library case. PracticeCase.library_rating and
+    library_rating_count are kept in step by app.services.library_counters.
+    """
+    __tablename__ = "library_ratings"
+
+    id = db.Column(db.Integer, primary_key=True)
+    practice_case_id = db.Column(db.Integer, db.ForeignKey("practice_cases.id", ondelete="CASCADE"), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    rating = db.Column(db.Float, nullable=False)
+    created_at = db.Column(db.DateTime(timezone=True), default=db.func.now())
+    updated_at = db.Column(db.DateTime(timezone=True), default=db.func.now(), onupdate=db.func.now())
+
+    __table_args__ = (
+        db.UniqueConstraint("practice_case_id", "user_id", name="uq_library_ratings_case_user"),
+    )
+
+
+class LibraryDownload(db.Model):
+    """
+    A library download not yet counted in PracticeCase.library_downloads.
+    Copies only insert here, so a popular case never waits on its own row;
+    app.services.library_counters folds the rows into the counters periodically.
+    """
+    __tablename__ = "library_downloads"
+
+    id = db.Column(db.Integer, primary_key=True)
+    practice_case_id = db.Column(db.Integer, db.ForeignKey("practice_cases.id", ondelete="CASCADE"), nullable=False)
+    created_at = db.Column(db.DateTime(timezone=True), default=db.func.now())
@@ -0,0 +1,32 @@
+from app.models import db
+
+class LibraryCaseSignature(db.Model):
+    """
+    MinHash signature of a library case's text, stored when it is submitted.
+    duplicate_of_id is the approved library case it was found to nearly
+    duplicate (estimated Jaccard similarity duplicate_score), if any; see
+    app.services.library_duplicates.
+    """
+    __tablename__ = "library_case_signatures"
+
+    practice_case_id = db.Column(db.Integer, db.ForeignKey("practice_cases.id", ondelete="CASCADE"), primary_key=True)
+    signature = db.Column(db.JSON, nullable=False)  # NUM_PERM minimum hash values
+    duplicate_of_id = db.Column(db.Integer, db.ForeignKey("practice_cases.id", ondelete="SET NULL"), nullable=True)
+    duplicate_score = db.Column(db.Float, nullable=True)
+    created_at = db.Column(db.DateTime(timezone=True), default=db.func.now())
+
+
+class LibraryLSHBucket(db.Model):
+    """
+    One LSH band of a case's signature: cases sharing any (band, bucket) are
+    near-duplicate candidates, so lookups never scan every signature.
+    """
+    __tablename__ = "library_lsh_buckets"
+
+    band = db.Column(db.SmallInteger, primary_key=True)
+    bucket = db.Column(db.BigInteger, primary_key=True)  # hash of the band's rows
+    practice_case_id = db.Column(db.Integer, db.ForeignKey("practice_cases.id", ondelete="CASCADE"), primary_key=True)
+
+    __table_args__ = (
+        db.Index("ix_library_lsh_buckets_case", "practice_case_id"),
+    )
@@ -0,0 +1,31 @@
+from app.models import db
+
+class LibraryVectorModel(db.Model):
+    """
+    The fitted TF-IDF vocabulary for library similarity: a single row (id 1)
+    written by the offline indexer, so cases approved later can be vectorized
+    against it without refitting (see app.services.library_similarity).
+    """
+    __tablename__ = "library_vector_model"
+
+    SINGLETON_ID = 1
+
+    id = db.Column(db.Integer, primary_key=True)
+    vocabulary = db.Column(db.JSON, nullable=False)  # term -> column index
+    idf = db.Column(db.JSON, nullable=False)  # inverse document frequency per column
+    top_k = db.Column(db.Integer, nullable=False)
+    case_count = db.Column(db.Integer, default=0, nullable=False)
+    built_at = db.Column(db.DateTime(timezone=True), nullable=True)
+
+
+class LibraryCaseVector(db.Model):
+    """
+    An approved library case's TF-IDF vector and its precomputed nearest
+    neighbours, so /library/<id>/similar is a primary-key lookup.
+    """
+    __tablename__ = "library_case_vectors"
+
+    practice_case_id = db.Column(db.Integer, db.ForeignKey("practice_cases.id", ondelete="CASCADE"), primary_key=True)
+    vector = db.Column(db.JSON, nullable=False)  # {"indices": [...], "weights": [...]}, L2-normalized
+    neighbors = db.Column(db.JSON, nullable=False, default=list)  # [[case_id, cosine similarity], ...], best first
+    updated_at = db.Column(db.DateTime(timezone=True), default=db.func.now(), onupdate=db.func.now())
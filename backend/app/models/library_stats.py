@@ -0,0 +1,27 @@
+from app.models import db
+
+class LibraryStats(db.Model):
+    """
+    Materialized statistics for the global case library: a single row (id 1)
+    rewritten by app.services.library_stats whenever library state changes,
+    so /library/stats never aggregates over the cases itself.
+    """
+    __tablename__ = "library_stats"
+
+    SINGLETON_ID = 1
+
+    id = db.Column(db.Integer, primary_key=True)
+    total_cases = db.Column(db.Integer, default=0, nullable=False)
+    total_downloads = db.Column(db.Integer, default=0, nullable=False)
+    popular_languages = db.Column(db.JSON, nullable=True)  # most common target languages, descending
+    popular_tags = db.Column(db.JSON, nullable=True)  # most used tag names, descending
+    computed_at = db.Column(db.DateTime(timezone=True), nullable=True)
+
+    def to_dict(self):
+        return {
+            "total_cases": self.total_cases,
+            "total_downloads": self.total_downloads,
+            "popular_languages": self.popular_languages or [],
+            "popular_tags": self.popular_tags or [],
+            "computed_at": self.computed_at.isoformat() if self.computed_at else None
+        }
@@ -0,0 +1,34 @@
+from app.models import db
+
+# Which tags a library case carries; rows go with the case
+library_case_tags = db.Table(
+    "library_case_tags",
+    db.Column("practice_case_id", db.Integer, db.ForeignKey("practice_cases.id", ondelete="CASCADE"), primary_key=True),
+    db.Column("tag_id", db.Integer, db.ForeignKey("library_tags.id", ondelete="CASCADE"), primary_key=True),
+    db.Index("ix_library_case_tags_tag", "tag_id"),
+)
+
+
+class LibraryTag(db.Model):
+    """
+    A normalized (trimmed, lowercased) library tag. case_count is the number of
+    approved library cases carrying it, adjusted in place by
+    app.services.library_tags whenever a case's tags or approval change.
+    """
+    __tablename__ = "library_tags"
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), unique=True, nullable=False)
+    case_count = db.Column(db.Integer, default=0, nullable=False)
+
+    __table_args__ = (
+        db.Index("ix_library_tags_case_count", "case_count"),
+    )
+
+    cases = db.relationship("PracticeCase", secondary=library_case_tags, back_populates="tags")
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "case_count": self.case_count
+        }
@@ -0,0 +1,67 @@
+from app.models import db
+
+class LLMUsage(db.Model):
+    """
+    Daily aggregate of upstream model usage per institution, route and model.
+    Rows are incremented in place by the in-process usage buffer; reports sum
+    over rows, so the occasional duplicate row from concurrent workers is harmless.
+    """
+    __tablename__ = "llm_usage"
+
+    id = db.Column(db.Integer, primary_key=True)
+    day = db.Column(db.Date, nullable=False)
+    institution_id = db.Column(db.Integer, db.ForeignKey("institutions.id"), nullable=True)
+    route = db.Column(db.String(50), nullable=False)  # e.g., "end_conversation"
+    model = db.Column(db.String(50), nullable=False)  # e.g., "gpt-4o"
+
+    call_count = db.Column(db.Integer, default=0, nullable=False)
+    error_count = db.Column(db.Integer, default=0, nullable=False)
+    prompt_tokens = db.Column(db.BigInteger, default=0, nullable=False)
+    completion_tokens = db.Column(db.BigInteger, default=0, nullable=False)
+    cached_tokens = db.Column(db.BigInteger, default=0, nullable=False)
+    total_latency_ms = db.Column(db.BigInteger, default=0, nullable=False)
+    cost_usd = db.Column(db.Float, default=0.0, nullable=False)
+    updated_at = db.Column(db.DateTime(timezone=True), default=db.func.now(), onupdate=db.func.now())
+
+    __table_args__ = (
+        db.Index("ix_llm_usage_day_institution", "day", "institution_id"),
+    )
+
+    COUNTER_FIELDS = (
+        "call_count", "error_count", "prompt_tokens", "completion_tokens",
+        "cached_tokens", "total_latency_ms", "cost_usd",
+    )
+
+    @classmethod
+    def add_usage(cls, session, day, institution_id, route, model, totals):
+        """Atomically add usage deltas to the matching row, inserting it if missing."""
+        institution_filter = cls.institution_id.is_(None) if institution_id is None else cls.institution_id == institution_id
+        updated = session.query(cls).filter(
+            cls.day == day,
+            institution_filter,
+            cls.route == route,
+            cls.model == model
+        ).update(
+            {getattr(cls, field): getattr(cls, field) + totals[field] for field in cls.COUNTER_FIELDS},
+            synchronize_session=False
+        )
+        if not updated:
+            session.add(cls(day=day, institution_id=institution_id, route=route, model=model, **totals))
+
+    def __repr__(self):
+        return f"<LLMUsage {self.day} - Institution {self.institution_id} - {self.route}/{self.model}>"
+
+    def to_dict(self):
+        return {
+            "day": self.day.isoformat(),
+            "institution_id": self.institution_id,
+            "route": self.route,
+            "model": self.model,
+            "call_count": self.call_count,
+            "error_count": self.error_count,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "cached_tokens": self.cached_tokens,
+            "average_latency_ms": self.total_latency_ms / self.call_count if self.call_count else None,
+            "cost_usd": round(self.cost_usd, 6),
+        }
@@ -1,4 +1,5 @@
-from sqlalchemy.orm import relationship
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.orm import relationship, deferred, load_only, selectinload
 from app.models import db
 import json
 from datetime import datetime
@@ -61,9 +62,28 @@ class PracticeCase(db.Model):
     library_rating = db.Column(db.Float, nullable=True)  # Average rating
     library_rating_count = db.Column(db.Integer, default=0)
 
+    # Full-text search document, maintained by app.services.library_search (Postgres only)
+    search_vector = deferred(db.Column(TSVECTOR().with_variant(db.Text(), "sqlite"), nullable=True))
+
+    # The library_* indexes back keyset pagination for each library sort (see
+    # app.services.library_pagination); each is scanned in either direction and
+    # only covers approved library cases
+    __table_args__ = (
+        db.Index("ix_practice_cases_search_vector", "search_vector", postgresql_using="gin"),
+        db.Index("ix_practice_cases_library_approved_at", library_approved_at, id,
+                 postgresql_where=library_approved),
+        db.Index("ix_practice_cases_library_downloads", db.func.coalesce(library_downloads, 0), id,
+                 postgresql_where=library_approved),
+        db.Index("ix_practice_cases_library_rating", db.func.coalesce(library_rating, 0.0), id,
+                 postgresql_where=library_approved),
+        db.Index("ix_practice_cases_library_title", db.func.coalesce(title, ''), id,
+                 postgresql_where=library_approved),
+    )
+
     # Relationships
     conversations = db.relationship("Conversation", back_populates="practice_case")
     images = db.relationship("PracticeCaseImage", back_populates="practice_case", cascade="all, delete-orphan")
+    tags = db.relationship("LibraryTag", secondary="library_case_tags", back_populates="cases")
 
     def generate_system_prompt(self):
         """Generate system prompt from individual components"""
@@ -317,9 +337,7 @@ class PracticeCase(db.Model):
             library_approved=False
         )
         
-        # Increment download counter
-        self.library_downloads += 1
-        
+        # The download is counted by app.services.library_counters.record_download()
         return new_case
 
     def to_library_dict(self):
@@ -348,59 +366,96 @@ class PracticeCase(db.Model):
             "library_approved_at": self.library_approved_at.isoformat() if self.library_approved_at else None
         }
 
-    def to_dict(self):
-        # sort images newest-first (handle nulls defensively)
-        images_sorted = sorted(
-            self.images or [],
-            key=lambda i: i.created_at or datetime.min,
-            reverse=True
-        )
+    # Keys of to_dict(), in output order
+    DICT_FIELDS = (
+        "id", "class_id", "title", "description", "min_time", "max_time", "accessible_on",
+        "published", "is_draft", "voice", "language_code", "image_url", "image_variants",
+        "image_placeholder", "images",
+        "target_language", "situation_instructions", "cultural_context", "curricular_goals",
+        "key_items", "behavioral_guidelines", "proficiency_level", "instructor_notes",
+        "notes_for_students", "feedback_prompt", "feedback_config", "speaking_speed",
+        "created_at", "updated_at", "created_by",
+        "submitted_to_library", "library_approved", "library_submitted_at", "library_approved_at",
+        "author_name", "author_institution", "library_tags", "library_downloads",
+        "library_rating", "library_rating_count"
+    )
 
-        return {
-            "id": self.id,
-            "class_id": self.class_id,
-            "title": self.title,
-            "description": self.description,
-            "min_time": self.min_time,
-            "max_time": self.max_time,
-            "accessible_on": self.accessible_on.isoformat() if self.accessible_on else None,
-            "published": self.published,
-            "is_draft": self.is_draft,
-            "voice": self.voice,
-            "language_code": self.language_code,
+    # Flat fields describing the latest image
+    LATEST_IMAGE_FIELDS = ("image_url", "image_variants", "image_placeholder")
 
-            # 👇 convenient flat field for the latest image
-            "image_url": images_sorted[0].image_url if images_sorted else None,
+    # Compact representation for list views (?view=summary): no long text columns or image list
+    SUMMARY_FIELDS = (
+        "id", "class_id", "title", "description", "min_time", "max_time", "accessible_on",
+        "published", "is_draft", "target_language", "proficiency_level", "image_url",
+        "image_variants", "image_placeholder", "created_at", "submitted_to_library", "library_approved"
+    )
 
-            # keep full list too (now sorted)
-            "images": [img.to_dict() for img in images_sorted],
+    @classmethod
+    def fields_from_args(cls, args, default=None, extra=()):
+        """
+        Sparse fieldset requested by a list endpoint: ?fields=a,b,c or ?view=summary.
+        Falls back to default (None meaning every field). extra names fields the
+        route adds itself. Raises ValueError for unknown fields.
+        """
+        raw = args.get("fields")
+        if raw:
+            fields = [name.strip() for name in raw.split(",") if name.strip()]
+            unknown = [name for name in fields if name not in cls.DICT_FIELDS and name not in extra]
+            if unknown:
+                raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+            return fields
+        if args.get("view") == "summary":
+            return list(cls.SUMMARY_FIELDS) + list(extra)
+        return default
 
-            # New individual fields
-            "target_language": self.target_language,
-            "situation_instructions": self.situation_instructions,
-            "cultural_context": self.cultural_context,
-            "curricular_goals": self.curricular_goals,
-            "key_items": self.key_items,
-            "behavioral_guidelines": self.behavioral_guidelines,
-            "proficiency_level": self.proficiency_level,
-            "instructor_notes": self.instructor_notes,
-            "notes_for_students": self.notes_for_students,
-            "feedback_prompt": self.feedback_prompt,
-            "feedback_config": self.feedback_config,
-            "speaking_speed": self.speaking_speed,
-
-            "created_at": self.created_at.isoformat(),
-            "updated_at": self.updated_at.isoformat(),
-            "created_by": self.created_by,
-
-            "submitted_to_library": self.submitted_to_library,
-            "library_approved": self.library_approved,
-            "library_submitted_at": self.library_submitted_at.isoformat() if self.library_submitted_at else None,
-            "library_approved_at": self.library_approved_at.isoformat() if self.library_approved_at else None,
-            "author_name": self.author_name,
-            "author_institution": self.author_institution,
-            "library_tags": json.loads(self.library_tags) if self.library_tags else [],
-            "library_downloads": self.library_downloads,
-            "library_rating": self.library_rating,
-            "library_rating_count": self.library_rating_count
-        }
\ No newline at end of file
+    @classmethod
+    def load_options(cls, fields=None, also=()):
+        """
+        Query options loading only what to_dict(fields) reads, plus the columns
+        in also; images are fetched with one selectin query when needed.
+        """
+        options = []
+        if fields is None or "images" in fields or any(name in fields for name in cls.LATEST_IMAGE_FIELDS):
+            options.append(selectinload(cls.images))
+        if fields is not None:
+            columns = cls.__table__.columns
+            names = dict.fromkeys(name for name in [*fields, *also] if name in columns and name != "id")
+            options.append(load_only(cls.id, *[getattr(cls, name) for name in names]))
+        return options
+
+    def to_dict(self, fields=None):
+        """
+        Serialize the case. fields limits the output to those keys (see
+        DICT_FIELDS and SUMMARY_FIELDS); columns outside it are not read, so a
+        query projected with load_options(fields) never lazy-loads them.
+        """
+        names = self.DICT_FIELDS if fields is None else [name for name in self.DICT_FIELDS if name in fields]
+
+        images_sorted = None
+        if "images" in names or any(name in names for name in self.LATEST_IMAGE_FIELDS):
+            # sort images newest-first (handle nulls defensively)
+            images_sorted = sorted(
+                self.images or [],
+                key=lambda i: i.created_at or datetime.min,
+                reverse=True
+            )
+
+        latest = images_sorted[0] if images_sorted else None
+
+        data = {}
+        for name in names:
+            if name == "image_url":
+                # 👇 convenient flat fields for the latest image
+                data[name] = latest.image_url if latest else None
+            elif name == "image_variants":
+                data[name] = (latest.variants or []) if latest else []
+            elif name == "image_placeholder":
+                data[name] = latest.placeholder if latest else None
+            elif name == "images":
+                data[name] = [img.to_dict() for img in images_sorted]
+            elif name == "library_tags":
+                data[name] = json.loads(self.library_tags) if self.library_tags else []
+            else:
+                value = getattr(self, name)
+                data[name] = value.isoformat() if isinstance(value, datetime) else value
+        return data
\ No newline at end of file
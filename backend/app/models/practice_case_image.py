@@ -11,6 +11,9 @@ class PracticeCaseImage(db.Model):
     practice_case_id = db.Column(db.Integer, db.ForeignKey("practice_cases.id"), nullable=False)
     image_url = db.Column(db.String(255), nullable=False) # URL to the stored image
     prompt_text = db.Column(db.Text, nullable=True) # The prompt used to generate it
+    content_hash = db.Column(db.String(64), nullable=True, index=True) # SHA-256 of the original; keys its derivatives
+    variants = db.Column(db.JSON, nullable=True) # [{"url", "width", "format"}] WebP/AVIF derivatives
+    placeholder = db.Column(db.Text, nullable=True) # Tiny blurred data URI shown while loading
     created_at = db.Column(db.DateTime(timezone=True), default=db.func.now())
 
     # Relationship back to the PracticeCase
@@ -22,5 +25,7 @@ class PracticeCaseImage(db.Model):
             "practice_case_id": self.practice_case_id,
             "image_url": self.image_url,
             "prompt_text": self.prompt_text,
+            "variants": self.variants or [],
+            "placeholder": self.placeholder,
             "created_at": self.created_at.isoformat()
         }
\ No newline at end of file
@@ -0,0 +1,57 @@
+from datetime import datetime, timezone
+from app.models import db
+
+class RealtimeSession(db.Model):
+    """
+    Server-side record of a realtime voice session slot.
+
+    A row starts "queued" when its institution is at its concurrency limit, or
+    "active" once admitted. Active rows hold a slot until the linked
+    conversation ends or the lease (expires_at) runs out; the reaper then marks
+    them "ended", "expired", or "abandoned" for queued rows nobody polls anymore.
+    """
+    __tablename__ = "realtime_sessions"
+
+    QUEUED = "queued"
+    ACTIVE = "active"
+    ENDED = "ended"
+    EXPIRED = "expired"
+    ABANDONED = "abandoned"
+    FAILED = "failed"
+
+    id = db.Column(db.Integer, primary_key=True)
+    institution_id = db.Column(db.Integer, db.ForeignKey("institutions.id"), nullable=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
+    practice_case_id = db.Column(db.Integer, db.ForeignKey("practice_cases.id", ondelete="SET NULL"), nullable=True)
+    conversation_id = db.Column(db.Integer, db.ForeignKey("conversations.id", ondelete="SET NULL"), nullable=True)
+    session_id = db.Column(db.String(100), nullable=True)  # Upstream realtime session id, once minted
+    status = db.Column(db.String(20), nullable=False, default=QUEUED)
+
+    queued_at = db.Column(db.DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+    last_polled_at = db.Column(db.DateTime(timezone=True), nullable=True)
+    admitted_at = db.Column(db.DateTime(timezone=True), nullable=True)
+    expires_at = db.Column(db.DateTime(timezone=True), nullable=True)  # End of the slot lease
+    ended_at = db.Column(db.DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        db.Index("ix_realtime_sessions_institution_status", "institution_id", "status"),
+        db.Index("ix_realtime_sessions_conversation", "conversation_id"),
+    )
+
+    def __repr__(self):
+        return f"<RealtimeSession {self.id} - Institution {self.institution_id} - {self.status}>"
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "institution_id": self.institution_id,
+            "user_id": self.user_id,
+            "practice_case_id": self.practice_case_id,
+            "conversation_id": self.conversation_id,
+            "session_id": self.session_id,
+            "status": self.status,
+            "queued_at": self.queued_at.isoformat() if self.queued_at else None,
+            "admitted_at": self.admitted_at.isoformat() if self.admitted_at else None,
+            "expires_at": self.expires_at.isoformat() if self.expires_at else None,
+            "ended_at": self.ended_at.isoformat() if self.ended_at else None,
+        }
@@ -3,6 +3,7 @@ from werkzeug.security import generate_password_hash, check_password_hash
 from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
 from app.models import User, db
 from app.utils.user_roles import is_user_student
+from app.utils.http_cache import etag_cached
 from datetime import datetime, timezone
 import app.routes.auth
 import random
@@ -160,8 +161,21 @@ def login():
         return jsonify({"error": "Login failed"}), 500
 
 
+def current_user_version():
+    """Version signal for /me: the stored (still encrypted) columns it renders."""
+    user = db.session.get(User, get_jwt_identity())
+    if not user:
+        return None
+    return (
+        user.email_encrypted, user.first_name_encrypted, user.last_name_encrypted,
+        user.is_master, user.created_at, user.last_login, user.profile_picture,
+        is_user_student(user)
+    )
+
+
 @auth.route('/me', methods=['GET'])
 @jwt_required()
+@etag_cached(current_user_version)
 def get_current_user():
     """Return the current user info, including first and last names."""
     try:
@@ -1,10 +1,20 @@
 import os
+import time
 import requests
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
 from sqlalchemy.orm import Session
+from cachetools import TTLCache
 from flask import Blueprint, Response, jsonify, request, current_app, send_file
+from flask_jwt_extended import jwt_required, get_jwt_identity
 from app.models import User, PracticeCase, Conversation, Message, db
-from app.services.voice_service import VoiceService
+from app.services.voice_service import get_voice_service, clamp_speed, VOICE_OPTIONS, DEFAULT_VOICE, DEFAULT_PREVIEW_TEXT
+from app.services.session_payloads import get_compiled_session
+from app.services.audio_cache import get_or_render_preview, preview_cache_key
+from app.services.session_pool import session_pool
+from app.services.session_registry import admit, activate, release, QUEUE_POLL_SECONDS
+from app.services.llm_transport import CircuitOpenError, REALTIME_SESSION_POLICY
+from app.routes.practice_cases import can_user_access_class
 from pathlib import Path
 from werkzeug.exceptions import NotFound
 
@@ -12,46 +22,271 @@ from werkzeug.exceptions import NotFound
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 
 chatbot = Blueprint("chatbot", __name__)
-voice_service = VoiceService()
+voice_service = get_voice_service()
+
+# Mints realtime sessions for /bootstrap while the request thread writes the conversation
+_bootstrap_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="session-bootstrap")
+
+# User ids already validated by /session; users are never deleted mid-session
+_known_user_ids = TTLCache(maxsize=10000, ttl=600)
+
+
+def user_exists(user_id):
+    """Check a user id exists, remembering positive answers for a while."""
+    if user_id in _known_user_ids:
+        return True
+    if db.session.get(User, user_id) is None:
+        return False
+    _known_user_ids[user_id] = True
+    return True
+
+
+def queued_response(admission):
+    """202 telling the client its place in the institution's queue and when to poll again."""
+    response = jsonify(admission.to_dict())
+    response.headers["Retry-After"] = str(QUEUE_POLL_SECONDS)
+    return response, 202
+
+
+def session_unavailable_response(error):
+    """503 while the realtime sessions circuit is open."""
+    current_app.logger.warning(f"Realtime session creation skipped: {str(error)}")
+    response = jsonify({"error": "Voice sessions are temporarily unavailable. Please try again shortly."})
+    response.headers["Retry-After"] = str(int(error.retry_after) + 1)
+    return response, 503
+
+
+def prepare_session(data):
+    """
+    Validate a /session request body and admit it under the institution's
+    concurrency limit. Returns ((compiled, speed, admission), None), or
+    (None, error response). Shared by the WSGI and ASGI routes.
+    """
+    user_id = data.get("user_id")
+    practice_case_id = data.get("practice_case_id")
+
+    if not user_id:
+        return None, (jsonify({"error": "Missing user_id"}), 400)
+
+    if not user_exists(user_id):
+        return None, (jsonify({"error": "User not found"}), 404)
+
+    # Compiled per case and cached, so this normally reads nothing from the database
+    compiled = get_compiled_session(practice_case_id) if practice_case_id else None
+    if not compiled:
+        return None, (jsonify({"error": "Practice case not found"}), 404)
+
+    # (Optional) clamp server-side too
+    speed = clamp_speed(data.get("speed"))
+    if speed is not None:
+        current_app.logger.info(f"Realtime speed requested: {speed}")
+
+    # Hold a slot under the institution's concurrency limit, or wait in line for one
+    admission = admit(
+        user_id,
+        compiled.labels.get("institution_id"),
+        compiled.case_id,
+        max_time=compiled.max_time,
+        ticket=data.get("ticket")
+    )
+    return (compiled, speed, admission), None
 
 
 @chatbot.route("/session", methods=["POST"])
 def create_session():
     try:
         data = request.get_json()
-        user_id = data.get("user_id")
-        practice_case_id = data.get("practice_case_id")
-        speed = data.get("speed")  # ← NEW
+        prepared, error = prepare_session(data)
+        if error:
+            return error
+
+        compiled, speed, admission = prepared
+        if not admission.admitted:
+            return queued_response(admission)
+
+        try:
+            # Hand out a pre-warmed session if one is ready; the pool refills in the background
+            session_data = session_pool.take(compiled, speed)
+            if session_data:
+                current_app.logger.info(f"Using pre-warmed realtime session for case {compiled.case_id}")
+            else:
+                # ↓↓↓ pass speed
+                session_data = voice_service.start_session(compiled.build(speed), **compiled.labels)
+        except Exception:
+            release(admission.entry)
+            raise
+
+        activate(admission.entry, session_data, conversation_id=data.get("conversation_id"))
+        return jsonify(session_data)
+
+    except CircuitOpenError as e:
+        return session_unavailable_response(e)
+
+    except Exception as e:
+        current_app.logger.error(f"Error creating session: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+
+def authorize_case_start(user_id, practice_case_id):
+    """
+    Load the user and practice case for starting a conversation and check the
+    user may practice it now. Returns ((user, practice_case), None) or
+    (None, error response).
+    """
+    if not practice_case_id:
+        return None, (jsonify({"error": "Missing practice_case_id"}), 400)
+
+    user = db.session.get(User, int(user_id))
+    if not user:
+        return None, (jsonify({"error": "User not found"}), 404)
 
-        if not user_id:
-            return jsonify({"error": "Missing user_id"}), 400
+    practice_case = db.session.get(PracticeCase, practice_case_id)
+    if not practice_case:
+        return None, (jsonify({"error": "Practice case not found"}), 404)
+    if not can_user_access_class(user, practice_case.class_id):
+        return None, (jsonify({"error": "Unauthorized to access this practice case"}), 403)
+    accessible_on = practice_case.accessible_on
+    if accessible_on is not None and accessible_on.tzinfo is None:
+        accessible_on = accessible_on.replace(tzinfo=timezone.utc)
+    if user.is_student and (not practice_case.published or (
+            accessible_on and accessible_on > datetime.now(timezone.utc))):
+        return None, (jsonify({"error": "Practice case not available"}), 403)
 
-        user = db.session.get(User, user_id)
-        if not user:
-            return jsonify({"error": "User not found"}), 404
+    return (user, practice_case), None
 
-        practice_case = db.session.get(PracticeCase, practice_case_id)
-        if not practice_case:
-            return jsonify({"error": "Practice case not found"}), 404
 
-        prompt_text = practice_case.system_prompt
+def admit_case_start(user, practice_case, data):
+    """Compile the case's session payload and take a concurrency slot. Returns (compiled, speed, admission)."""
+    compiled = get_compiled_session(practice_case.id, practice_case=practice_case)
+    admission = admit(
+        user.id,
+        compiled.labels.get("institution_id"),
+        practice_case.id,
+        max_time=compiled.max_time,
+        ticket=data.get("ticket")
+    )
+    speed = clamp_speed(data.get("speed"))
+    if speed is None:
+        speed = compiled.default_speed
+    return compiled, speed, admission
 
-        # (Optional) clamp server-side too
-        if isinstance(speed, (int, float)):
-            speed = max(0.25, min(1.5, float(speed)))
-            current_app.logger.info(f"Realtime speed requested: {speed}")
 
-        # ↓↓↓ pass speed
-        session_data = voice_service.create_session(
-            prompt_text,
-            practice_case_id=practice_case_id,
-            speed=speed,  # ← NEW
+def create_conversation(user, practice_case):
+    """Insert the Conversation row for a bootstrap. Returns (conversation, serialized case)."""
+    conversation = Conversation(
+        user_id=user.id,
+        practice_case_id=practice_case.id,
+        start_time=datetime.now(timezone.utc),
+        language=practice_case.language_code or "en"
+    )
+    db.session.add(conversation)
+    db.session.commit()
+    return conversation, practice_case.to_dict()
+
+
+def bootstrap_response(conversation, case_data, session_data, pooled, timings):
+    response = jsonify({
+        "case": case_data,
+        "conversation_id": conversation.id,
+        "start_time": conversation.start_time.isoformat(),
+        "session": session_data,
+        "prewarmed": pooled,
+        "timings": timings
+    })
+    response.headers["Server-Timing"] = ", ".join(f"{name};dur={ms}" for name, ms in timings.items())
+    return response
+
+
+def abandon_bootstrap(error, conversation, admission):
+    """Undo a failed bootstrap (conversation row, session slot) and build the error response."""
+    db.session.rollback()
+    if conversation is not None and conversation.id:
+        # Don't leave an empty conversation behind when no session could be minted
+        try:
+            db.session.delete(conversation)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+    if admission is not None and admission.admitted:
+        try:
+            release(admission.entry)
+        except Exception:
+            db.session.rollback()
+    if isinstance(error, CircuitOpenError):
+        return session_unavailable_response(error)
+    current_app.logger.error(f"Error bootstrapping conversation: {str(error)}")
+    return jsonify({"error": "Failed to start conversation"}), 500
+
+
+@chatbot.route("/bootstrap", methods=["POST"])
+@jwt_required()
+def bootstrap_conversation():
+    """
+    Start a practice session in one round trip: authorize the student once,
+    create the Conversation row while the realtime session is being minted,
+    and return the case, conversation id and session together.
+
+    Body: {"practice_case_id": int, "speed": float (optional, defaults to the
+    case's speaking speed), "ticket": int (optional, from a queued response)}.
+    Per-step server timings are returned in "timings" (milliseconds) and in the
+    Server-Timing header. When the institution is at its concurrent session
+    limit the response is a 202 with the queue position instead.
+    """
+    timings = {}
+    started = time.perf_counter()
+    conversation = None
+    admission = None
+
+    def mark(name, since):
+        timings[name] = round((time.perf_counter() - since) * 1000, 1)
+        return time.perf_counter()
+
+    try:
+        data = request.get_json(silent=True) or {}
+
+        step = time.perf_counter()
+        authorized, error = authorize_case_start(get_jwt_identity(), data.get("practice_case_id"))
+        if error:
+            return error
+        user, practice_case = authorized
+        step = mark("auth", step)
+
+        compiled, speed, admission = admit_case_start(user, practice_case, data)
+        if not admission.admitted:
+            return queued_response(admission)
+        step = mark("admission", step)
+
+        # Mint the realtime session in the background (or take a pre-warmed one)
+        session_future = _bootstrap_executor.submit(
+            _mint_session, current_app._get_current_object(), compiled, speed
         )
-        return jsonify(session_data)
+
+        # Meanwhile, create the conversation and serialize the case
+        conversation, case_data = create_conversation(user, practice_case)
+        step = mark("conversation", step)
+
+        session_data, session_ms, pooled = session_future.result(timeout=REALTIME_SESSION_POLICY.timeout * 3)
+        timings["session"] = session_ms
+        activate(admission.entry, session_data, conversation_id=conversation.id)
+        mark("session_wait", step)
+        mark("total", started)
+
+        return bootstrap_response(conversation, case_data, session_data, pooled, timings)
 
     except Exception as e:
-        current_app.logger.error(f"Error creating session: {str(e)}")
-        return jsonify({"error": str(e)}), 500
+        return abandon_bootstrap(e, conversation, admission)
+
+
+def _mint_session(app, compiled, speed):
+    """Background part of /bootstrap: returns (session_data, elapsed ms, whether it was pre-warmed)."""
+    started = time.perf_counter()
+    with app.app_context():
+        session_data = session_pool.take(compiled, speed)
+        pooled = session_data is not None
+        if not pooled:
+            session_data = voice_service.start_session(compiled.build(speed), **compiled.labels)
+    return session_data, round((time.perf_counter() - started) * 1000, 1), pooled
+
 
 @chatbot.route("/realtime", methods=["POST"])
 def proxy_openai_realtime():
@@ -75,31 +310,44 @@ def proxy_openai_realtime():
         return jsonify({"error": str(e)}), 500
     
     
-@chatbot.route("/voice/preview", methods=["POST"])
+@chatbot.route("/voice/preview", methods=["GET", "POST"])
 def preview_voice():
     """
     Generate a voice preview using the application's configured voice service.
+
+    Previews are content-addressed: the strong ETag is the hash of model, voice,
+    text and format, so a matching If-None-Match gets a 304 without touching the
+    cache or the TTS API. GET with query parameters is cacheable by browsers.
     """
     try:
-        data = request.get_json()
-        voice_id = data.get("voice", "aura-asteria-en") # Use a valid default voice
-        sample_text = data.get("text", "Hello! I'm here to help you practice your conversation skills.")
-        
-        # The `voice_service` now handles the API call
-        audio_content = voice_service.generate_preview(voice_id, sample_text)
+        data = (request.get_json(silent=True) or {}) if request.method == "POST" else request.args
+        voice_id = data.get("voice", DEFAULT_VOICE)
+        sample_text = data.get("text", DEFAULT_PREVIEW_TEXT)
+        cache_headers = {"Cache-Control": "public, max-age=31536000, immutable"}
+
+        etag = preview_cache_key(voice_id, sample_text)
+        if etag in request.if_none_match:
+            response = Response(status=304, headers=cache_headers)
+            response.set_etag(etag)
+            return response
+
+        # The `voice_service` handles the API call on a cache miss
+        etag, audio_content = get_or_render_preview(voice_id, sample_text)
         
         if not audio_content:
             return jsonify({"error": "Failed to generate voice preview from service"}), 502
 
         # Return the audio file directly
-        return Response(
+        response = Response(
             audio_content,
             mimetype="audio/mpeg",
             headers={
                 "Content-Disposition": "inline; filename=voice_preview.mp3",
-                "Cache-Control": "no-cache"
+                **cache_headers
             }
         )
+        response.set_etag(etag)
+        return response
         
     except Exception as e:
         current_app.logger.error(f"Error generating voice preview: {str(e)}")
@@ -112,20 +360,9 @@ def get_voice_options():
     Get available voice options with descriptions for the frontend.
     """
     try:
-        voice_options = [
-            {"id": "alloy", "name": "Alloy", "description": "Neutral, balanced tone"},
-            {"id": "ash", "name": "Ash", "description": "Warm, friendly voice"},
-            {"id": "ballad", "name": "Ballad", "description": "Calm, soothing tone"},
-            {"id": "coral", "name": "Coral", "description": "Bright, energetic voice"},
-            {"id": "echo", "name": "Echo", "description": "Clear, professional tone"},
-            {"id": "sage", "name": "Sage", "description": "Wise, measured voice"},
-            {"id": "shimmer", "name": "Shimmer", "description": "Light, pleasant tone"},
-            {"id": "verse", "name": "Verse", "description": "Expressive, dynamic voice"}
-        ]
-        
         return jsonify({
-            "voices": voice_options,
-            "default": "verse"
+            "voices": VOICE_OPTIONS,
+            "default": DEFAULT_VOICE
         })
         
     except Exception as e:
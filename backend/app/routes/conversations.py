@@ -1,6 +1,15 @@
 from flask import Blueprint, request, jsonify, current_app
 from datetime import datetime, timezone
 from app.models import Conversation, Message, PracticeCase, FeedbackConversation, db
+from app.routes.dialogic_feedback import prefetch_suggestion_answers
+from app.services.feedback_service import (
+    build_feedback_messages,
+    parse_feedback_response,
+    generate_text_summary_from_json,
+)
+from app.services.llm_transport import CircuitOpenError, FEEDBACK_POLICY
+from app.services.model_router import routed_completion
+from app.services.session_registry import end_conversation_sessions, link_conversation_sessions
 from flask_jwt_extended import jwt_required, get_jwt_identity
 import os
 import json
@@ -38,6 +47,9 @@ def start_conversation():
         )
 
         db.session.add(conversation)
+        db.session.flush()
+        # A session minted before the conversation existed is released with it
+        link_conversation_sessions(conversation)
         db.session.commit()
 
         return jsonify({"conversation_id": conversation.id, "start_time": conversation.start_time.isoformat()})
@@ -121,227 +133,26 @@ def end_conversation(conversation_id):
         current_app.logger.info(f"🔥 Attempting to end conversation {conversation_id}")
 
         user_id = get_jwt_identity()
-        conversation = Conversation.query.get(conversation_id)
-        if not conversation:
-            current_app.logger.error(f"❌ Conversation {conversation_id} not found")
-            return jsonify({"error": "Conversation not found"}), 404
-        
-        if str(conversation.user_id) != str(user_id):
-            return jsonify({"error": "Unauthorized"}), 403
+        closed, error = close_conversation(conversation_id, user_id)
+        if error:
+            return error
+        conversation, practice_case, feedback_messages = closed
 
-        # Fetch associated practice case
-        practice_case = conversation.practice_case  
-        if not practice_case:
-            current_app.logger.error(f"❌ No associated practice case found for conversation {conversation_id}")
-            return jsonify({"error": "Practice case not found"}), 404
+        # Generate structured JSON feedback with the model routed for this case
+        client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"), timeout=FEEDBACK_POLICY.timeout, max_retries=0)
 
-        # Load feedback configuration and prompt from the practice case
-        feedback_prompt = practice_case.feedback_prompt
-        feedback_config = practice_case.feedback_config or {}
-        
-        if not feedback_prompt:
-            current_app.logger.error(f"❌ Feedback prompt missing for practice case {practice_case.id}")
-            return jsonify({"error": "Feedback prompt not found"}), 500
-
-        # Set conversation end time & duration
-        conversation.end_time = datetime.now(timezone.utc)
-        conversation.duration = int((conversation.end_time - conversation.start_time).total_seconds())
-
-        # Determine if conversation meets minimum required time
-        if conversation.duration >= practice_case.min_time:
-            conversation.completed = True
-            current_app.logger.info(f"✅ Conversation {conversation_id} marked as completed.")
-
-        # Compile messages for feedback generation
-        compiled_messages = conversation.get_messages_history()
-        current_app.logger.info(f"📜 Compiled conversation transcript: {compiled_messages}")
-
-        # Check OpenAI API Key
-        api_key = os.getenv("OPENAI_API_KEY")
-        if not api_key:
-            current_app.logger.error("❌ OPENAI_API_KEY is missing or not set in environment variables.")
-            return jsonify({"error": "OpenAI API key is missing"}), 500
-
-        # Generate structured JSON feedback using GPT-4o
-        client = OpenAI(api_key=api_key)
-        
         try:
-            # Create enhanced prompt for structured JSON feedback
-            json_feedback_prompt = f"""
-            {feedback_prompt}
-            
-            CRITICAL INSTRUCTIONS FOR RESPONSE FORMAT:
-            You must respond with ONLY a valid JSON object. No explanatory text, no markdown formatting, no backticks - just pure JSON.
-
-            IMPORTANT PEDAGOGICAL REQUIREMENTS:
-            1. **LANGUAGE**: Provide ALL feedback in English only, regardless of the target language being practiced. This reduces cognitive load for language learners.
-            
-            2. **PROFICIENCY-LEVEL AWARENESS**: The student's proficiency level is: {practice_case.proficiency_level}
-               - Tailor your feedback complexity and expectations to this proficiency level
-               - For beginners: Focus on basic communication success, simple corrections
-               - For intermediate: Balance communication effectiveness with accuracy improvements  
-               - For advanced: Include more nuanced feedback on style, register, and cultural appropriateness
-               - Always reference this proficiency level when setting expectations
-            
-            3. **PRAGMATIC FOCUS**: Prioritize communication effectiveness over linguistic perfection
-               - Emphasize whether the student successfully conveyed their intended meaning
-               - Focus on communication breakdowns only when they actually impeded understanding
-               - Celebrate successful meaning-making even if grammar/vocabulary isn't perfect
-               - Remember: comprehensibility and communicative competence come before accuracy
-
-            4. **STUDENT-FOCUSED LANGUAGE**: Address the student directly using "you" and "your" throughout, not "the student" or "they"
-
-            Use this EXACT structure:
-            {{
-                "summary": {{
-                    "strengths": ["2-3 overall communication successes from your conversation"],
-                    "areas_for_improvement": ["2-3 pragmatic areas for you to focus on next"]
-                }},
-                "detailed_feedback": {{
-                    "sections": [
-                        {{
-                            "area": "Area Name (exactly as specified in the 'Areas to evaluate' feedback areas above)",
-                            "strengths": ["specific communicative successes with examples from your conversation", "another success that helped you get your message across"],
-                            "areas_for_improvement": ["pragmatic improvement areas appropriate for {practice_case.proficiency_level} level", "communication aspects to work on"],
-                            "tips": ["actionable suggestions appropriate for your proficiency level", "practical communication strategies for you"]
-                        }}
-                    ]
-                }},
-                "encouragement": "A brief, motivational closing message directly to you about your communication progress"
-            }}
-
-            IMPORTANT RULES:
-            1. Create a detailed_feedback section for EACH feedback area mentioned above that applies to this conversation
-            2. Each section must have the exact area name as specified in the instructions above
-            3. Include 2-3 items in each array (strengths, areas_for_improvement, tips)
-            4. Reference specific examples from the conversation transcript when possible
-            5. If an area doesn't apply to this conversation, skip that section entirely
-            6. Your response must be valid JSON that can be parsed by json.loads()
-            7. ALL feedback must be in English only
-            8. Adjust feedback complexity and expectations to match the {practice_case.proficiency_level} proficiency level
-            9. Focus on pragmatic communication success over linguistic perfection
-            10. Be encouraging and constructive - highlight communicative achievements
-
-            DO NOT include any text outside the JSON structure. Start your response with {{ and end with }}.
-            """
-
-            response = client.chat.completions.create(
-                model="gpt-4o",
-                messages=[
-                    {"role": "system", "content": json_feedback_prompt},
-                    {"role": "user", "content": "\n".join([f"{msg['role']}: {msg['content']}" for msg in compiled_messages])},
-                ]
+            response, feedback_model = routed_completion(
+                "feedback",
+                "end_conversation",
+                lambda model: client.chat.completions.create(model=model, messages=feedback_messages),
+                FEEDBACK_POLICY,
+                practice_case=practice_case
             )
+            return store_conversation_feedback(conversation, user_id, response, feedback_model)
 
-            # Extract and parse JSON feedback
-            feedback_text = response.choices[0].message.content.strip()
-            current_app.logger.info(f"📝 Raw AI response: {feedback_text[:200]}...")
-            
-            # Clean up any potential markdown formatting
-            if feedback_text.startswith("```json"):
-                feedback_text = feedback_text.replace("```json", "").replace("```", "").strip()
-            elif feedback_text.startswith("```"):
-                feedback_text = feedback_text.replace("```", "").strip()
-            
-            # Fix common JSON formatting issues
-            feedback_text = feedback_text.replace("areas*for*improvement", "areas_for_improvement")
-            feedback_text = feedback_text.replace("*", "_")  # Replace any remaining asterisks with underscores
-            
-            # Ensure proper JSON closure if missing
-            if not feedback_text.endswith('}'):
-                # Count opening and closing braces to determine what's missing
-                open_braces = feedback_text.count('{')
-                close_braces = feedback_text.count('}')
-                missing_braces = open_braces - close_braces
-                feedback_text += '}' * missing_braces
-            
-            current_app.logger.info(f"🧹 Cleaned feedback text: {feedback_text[:200]}...")
-            
-            try:
-                feedback_json = json.loads(feedback_text)
-                current_app.logger.info(f"✅ Successfully parsed JSON feedback")
-                current_app.logger.info(f"📊 JSON structure: summary={bool(feedback_json.get('summary'))}, sections={len(feedback_json.get('detailed_feedback', {}).get('sections', []))}")
-                
-                # Generate text summary for backward compatibility
-                summary_text = generate_text_summary_from_json(feedback_json)
-                current_app.logger.info(f"📄 Generated summary text: {summary_text[:100]}...")
-                
-                # Store text summary in conversation (for backward compatibility)
-                conversation.feedback = summary_text
-                
-                # Create FeedbackConversation record with JSON structure
-                feedback_conversation = FeedbackConversation(
-                    original_conversation_id=conversation.id,
-                    user_id=user_id,
-                    summary_feedback=summary_text,
-                    detailed_feedback=json.dumps(feedback_json),  # Store full JSON as string
-                    start_time=datetime.now(timezone.utc),
-                    model="gpt-4o",
-                    feedback_version="json_v1"
-                )
-
-                db.session.add(feedback_conversation)
-                db.session.commit()
-
-                current_app.logger.info(f"✅ FeedbackConversation {feedback_conversation.id} created successfully")
-
-                return jsonify({
-                    "message": "Conversation ended",
-                    "conversation": conversation.to_dict(),
-                    "feedback": summary_text,
-                    "feedback_json": feedback_json,  # Include structured feedback
-                    "feedback_conversation_id": feedback_conversation.id,
-                    "dialogic_feedback_available": True
-                })
-                
-            except json.JSONDecodeError as json_error:
-                current_app.logger.error(f"❌ Failed to parse JSON feedback: {str(json_error)}")
-                current_app.logger.error(f"🔍 Problematic text: {feedback_text}")
-                
-                # Try to extract JSON from within the text if it's embedded
-                import re
-                json_match = re.search(r'\{.*\}', feedback_text, re.DOTALL)
-                if json_match:
-                    try:
-                        extracted_json = json_match.group(0)
-                        current_app.logger.info(f"🔧 Attempting to parse extracted JSON...")
-                        feedback_json = json.loads(extracted_json)
-                        current_app.logger.info(f"✅ Successfully parsed extracted JSON")
-                        
-                        # Generate text summary for backward compatibility
-                        summary_text = generate_text_summary_from_json(feedback_json)
-                        
-                        # Store text summary in conversation (for backward compatibility)
-                        conversation.feedback = summary_text
-                        
-                        # Create FeedbackConversation record with JSON structure
-                        feedback_conversation = FeedbackConversation(
-                            original_conversation_id=conversation.id,
-                            user_id=user_id,
-                            summary_feedback=summary_text,
-                            detailed_feedback=json.dumps(feedback_json),
-                            start_time=datetime.now(timezone.utc),
-                            model="gpt-4o",
-                            feedback_version="json_v1_extracted"
-                        )
-
-                        db.session.add(feedback_conversation)
-                        db.session.commit()
-
-                        return jsonify({
-                            "message": "Conversation ended",
-                            "conversation": conversation.to_dict(),
-                            "feedback": summary_text,
-                            "feedback_json": feedback_json,
-                            "feedback_conversation_id": feedback_conversation.id,
-                            "dialogic_feedback_available": True
-                        })
-                        
-                    except json.JSONDecodeError:
-                        current_app.logger.error(f"❌ Even extracted JSON failed to parse")
-                
-                # Fallback to text-based feedback
-                return generate_fallback_feedback(conversation, feedback_text, user_id)
+        except CircuitOpenError as circuit_error:
+            return feedback_unavailable_response(circuit_error)
 
         except Exception as ai_error:
             current_app.logger.error(f"❌ OpenAI API call failed: {str(ai_error)}")
@@ -353,41 +164,125 @@ def end_conversation(conversation_id):
         return jsonify({"error": str(e)}), 500
 
 
-def generate_text_summary_from_json(feedback_json):
+def close_conversation(conversation_id, user_id):
+    """
+    Mark a conversation as ended, free its realtime session slot and build the
+    feedback prompt. Returns ((conversation, practice_case, feedback_messages),
+    None) or (None, error response). Shared by the WSGI and ASGI routes.
     """
-    Convert structured JSON feedback to a readable text summary for backward compatibility.
+    conversation = Conversation.query.get(conversation_id)
+    if not conversation:
+        current_app.logger.error(f"❌ Conversation {conversation_id} not found")
+        return None, (jsonify({"error": "Conversation not found"}), 404)
+
+    if str(conversation.user_id) != str(user_id):
+        return None, (jsonify({"error": "Unauthorized"}), 403)
+
+    # Fetch associated practice case
+    practice_case = conversation.practice_case
+    if not practice_case:
+        current_app.logger.error(f"❌ No associated practice case found for conversation {conversation_id}")
+        return None, (jsonify({"error": "Practice case not found"}), 404)
+
+    # Load the feedback prompt from the practice case
+    if not practice_case.feedback_prompt:
+        current_app.logger.error(f"❌ Feedback prompt missing for practice case {practice_case.id}")
+        return None, (jsonify({"error": "Feedback prompt not found"}), 500)
+
+    # Set conversation end time & duration
+    conversation.end_time = datetime.now(timezone.utc)
+    conversation.duration = int((conversation.end_time - conversation.start_time).total_seconds())
+
+    # Determine if conversation meets minimum required time
+    if conversation.duration >= practice_case.min_time:
+        conversation.completed = True
+        current_app.logger.info(f"✅ Conversation {conversation_id} marked as completed.")
+
+    # The voice session is over; free its slot now rather than after feedback generation
+    link_conversation_sessions(conversation)
+    end_conversation_sessions(conversation.id)
+    db.session.commit()
+
+    # Compile messages for feedback generation
+    compiled_messages = conversation.get_messages_history()
+    current_app.logger.info(f"📜 Compiled conversation transcript: {compiled_messages}")
+
+    # Check OpenAI API Key
+    if not os.getenv("OPENAI_API_KEY"):
+        current_app.logger.error("❌ OPENAI_API_KEY is missing or not set in environment variables.")
+        return None, (jsonify({"error": "OpenAI API key is missing"}), 500)
+
+    return (conversation, practice_case, build_feedback_messages(practice_case, compiled_messages)), None
+
+
+def store_conversation_feedback(conversation, user_id, response, feedback_model):
+    """Parse the feedback model's response, store it and build the end-of-conversation response."""
+    # Extract and parse JSON feedback
+    feedback_text = response.choices[0].message.content.strip()
+    current_app.logger.info(f"📝 Raw AI response: {feedback_text[:200]}...")
+
+    feedback_json, feedback_text, feedback_version = parse_feedback_response(feedback_text)
+    if feedback_json is None:
+        # Fallback to text-based feedback
+        return generate_fallback_feedback(conversation, feedback_text, user_id, feedback_model)
+
+    # Generate text summary for backward compatibility
+    summary_text = generate_text_summary_from_json(feedback_json)
+    current_app.logger.info(f"📄 Generated summary text: {summary_text[:100]}...")
+
+    # Store text summary in conversation (for backward compatibility)
+    conversation.feedback = summary_text
+
+    # Create FeedbackConversation record with JSON structure
+    feedback_conversation = FeedbackConversation(
+        original_conversation_id=conversation.id,
+        user_id=user_id,
+        summary_feedback=summary_text,
+        detailed_feedback=json.dumps(feedback_json),  # Store full JSON as string
+        start_time=datetime.now(timezone.utc),
+        model=feedback_model,
+        feedback_version=feedback_version
+    )
+
+    db.session.add(feedback_conversation)
+    db.session.commit()
+
+    current_app.logger.info(f"✅ FeedbackConversation {feedback_conversation.id} created successfully")
+    start_suggestion_prefetch(feedback_conversation)
+
+    return jsonify({
+        "message": "Conversation ended",
+        "conversation": conversation.to_dict(),
+        "feedback": summary_text,
+        "feedback_json": feedback_json,  # Include structured feedback
+        "feedback_conversation_id": feedback_conversation.id,
+        "dialogic_feedback_available": True
+    })
+
+
+def feedback_unavailable_response(circuit_error):
+    """503 while the feedback models' circuits are open."""
+    current_app.logger.warning(f"⚠️ Feedback generation skipped: {str(circuit_error)}")
+    response = jsonify({"error": "Feedback generation is temporarily unavailable. Please try again shortly."})
+    response.headers["Retry-After"] = str(int(circuit_error.retry_after) + 1)
+    return response, 503
+
+
+def start_suggestion_prefetch(feedback_conversation):
+    """
+    Kick off background generation of answers to the initial suggestion buttons.
+    Never lets a prefetch problem fail the end of a conversation.
     """
     try:
-        summary_parts = []
-        
-        # Add strengths
-        if feedback_json.get("summary", {}).get("strengths"):
-            summary_parts.append("**Strengths:**")
-            for strength in feedback_json["summary"]["strengths"]:
-                summary_parts.append(f"• {strength}")
-            summary_parts.append("")
-        
-        # Add areas for improvement
-        if feedback_json.get("summary", {}).get("areas_for_improvement"):
-            summary_parts.append("**Areas for Improvement:**")
-            for area in feedback_json["summary"]["areas_for_improvement"]:
-                summary_parts.append(f"• {area}")
-            summary_parts.append("")
-        
-        # Add encouragement
-        if feedback_json.get("encouragement"):
-            summary_parts.append(feedback_json["encouragement"])
-        
-        return "\n".join(summary_parts)
-        
+        prefetch_suggestion_answers(feedback_conversation)
     except Exception as e:
-        current_app.logger.error(f"Error generating text summary: {str(e)}")
-        return "Feedback generated successfully."
+        current_app.logger.warning(f"⚠️ Could not start suggestion prefetch for FeedbackConversation {feedback_conversation.id}: {str(e)}")
 
 
-def generate_fallback_feedback(conversation, feedback_text, user_id):
+def generate_fallback_feedback(conversation, feedback_text, user_id, model):
     """
     Generate fallback feedback when JSON parsing fails.
+    model is the model that produced feedback_text.
     """
     try:
         # Store the raw feedback
@@ -400,12 +295,13 @@ def generate_fallback_feedback(conversation, feedback_text, user_id):
             summary_feedback=feedback_text,
             detailed_feedback=feedback_text,
             start_time=datetime.now(timezone.utc),
-            model="gpt-4o",
+            model=model,
             feedback_version="fallback_v1"
         )
 
         db.session.add(feedback_conversation)
         db.session.commit()
+        start_suggestion_prefetch(feedback_conversation)
 
         return jsonify({
             "message": "Conversation ended",
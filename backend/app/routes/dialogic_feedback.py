@@ -5,12 +5,31 @@ from app.models.feedback_conversation import FeedbackConversation
 from app.models.feedback_message import FeedbackMessage
 from app.models import Conversation, PracticeCase
 from flask_jwt_extended import jwt_required, get_jwt_identity
+import asyncio
 import os
 import json
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from threading import Lock
+from cachetools import TTLCache
 from openai import OpenAI
+from app.services.llm_metrics import case_labels
+from app.services.llm_transport import CHAT_POLICY, BACKGROUND_CHAT_POLICY, get_async_openai_client
+from app.services.model_router import routed_completion, routed_completion_async, select_models
 
 dialogic_feedback = Blueprint("dialogic_feedback", __name__)
 
+# Speculative answers to the initial suggestion buttons, keyed by
+# (feedback_conversation_id, suggestion). Values are futures so that a click
+# arriving while the prefetch is still in flight waits on it instead of
+# starting a second GPT-4o round trip.
+_suggestion_answers = TTLCache(maxsize=2048, ttl=60 * 60)
+_suggestion_answers_lock = Lock()
+_prefetch_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="suggestion-prefetch")
+
+# Replies shown in the chat when the coach model cannot be reached
+FEEDBACK_REPLY_UNAVAILABLE = "I'm sorry, I'm having trouble connecting right now. Please try again later."
+FEEDBACK_REPLY_FAILED = "I'm sorry, I'm having trouble processing your question right now. Could you try rephrasing it?"
+
 @dialogic_feedback.route("/feedback/<int:feedback_conversation_id>/start", methods=["POST"])
 @jwt_required()
 def start_dialogic_feedback(feedback_conversation_id):
@@ -67,59 +86,77 @@ def send_feedback_message(feedback_conversation_id):
     Send a message in the dialogic feedback conversation and get AI response.
     """
     try:
-        user_id = get_jwt_identity()
-        data = request.json
-        user_message = data.get("message", "").strip()
-        is_suggestion = data.get("is_suggestion", False)
-
-        if not user_message:
-            return jsonify({"error": "Message cannot be empty"}), 400
+        received, error = receive_feedback_message(feedback_conversation_id, get_jwt_identity(), request.json)
+        if error:
+            return error
+        feedback_conv, user_message, feedback_json, prefetched = received
 
-        feedback_conv = FeedbackConversation.query.get(feedback_conversation_id)
-        
-        if not feedback_conv:
-            return jsonify({"error": "Feedback conversation not found"}), 404
-        
-        if str(feedback_conv.user_id) != str(user_id):
-            return jsonify({"error": "Unauthorized"}), 403
+        # Serve a prefetched answer for an initial suggestion click, otherwise generate one
+        ai_response = take_prefetched_answer(*prefetched) if prefetched else None
+        if ai_response:
+            current_app.logger.info(f"⚡ Served prefetched suggestion answer for feedback conversation {feedback_conv.id}")
+        discard_prefetched_answers(feedback_conv.id)
 
-        if not feedback_conv.is_active:
-            return jsonify({"error": "Feedback session has ended"}), 400
+        if ai_response is None:
+            ai_response = generate_ai_feedback_response(feedback_conv, user_message, feedback_json)
 
-        # Save user message
-        user_msg = feedback_conv.add_message("user", user_message)
-        user_msg.is_suggestion = is_suggestion
-        
-        # Parse JSON feedback if available
-        feedback_json = None
-        if feedback_conv.detailed_feedback:
-            try:
-                feedback_json = json.loads(feedback_conv.detailed_feedback)
-            except json.JSONDecodeError:
-                pass
-        
-        # Generate AI response
-        ai_response = generate_ai_feedback_response(feedback_conv, user_message, feedback_json)
-        
-        # Save AI response
-        feedback_conv.add_message("feedback_assistant", ai_response)
-        
-        db.session.commit()
-
-        # Generate new suggestions based on the conversation
-        suggestions = generate_feedback_suggestions(feedback_conv, feedback_json)
-
-        return jsonify({
-            "ai_response": ai_response,
-            "messages": feedback_conv.get_messages_history(),
-            "suggestions": suggestions
-        })
+        return reply_to_feedback_message(feedback_conv, ai_response, feedback_json)
 
     except Exception as e:
         current_app.logger.error(f"❌ Error in feedback chat: {str(e)}")
         return jsonify({"error": "Failed to process message"}), 500
 
 
+def receive_feedback_message(feedback_conversation_id, user_id, data):
+    """
+    Validate and store a student's message in a feedback conversation.
+    Returns ((feedback_conv, user_message, feedback_json, prefetch key or None),
+    None) or (None, error response). Shared by the WSGI and ASGI routes.
+    """
+    user_message = data.get("message", "").strip()
+    is_suggestion = data.get("is_suggestion", False)
+
+    if not user_message:
+        return None, (jsonify({"error": "Message cannot be empty"}), 400)
+
+    feedback_conv = FeedbackConversation.query.get(feedback_conversation_id)
+
+    if not feedback_conv:
+        return None, (jsonify({"error": "Feedback conversation not found"}), 404)
+
+    if str(feedback_conv.user_id) != str(user_id):
+        return None, (jsonify({"error": "Unauthorized"}), 403)
+
+    if not feedback_conv.is_active:
+        return None, (jsonify({"error": "Feedback session has ended"}), 400)
+
+    # Prefetched answers only match a conversation the student has not written in yet
+    untouched = not any(msg.role == "user" for msg in feedback_conv.feedback_messages)
+
+    # Save user message
+    user_msg = feedback_conv.add_message("user", user_message)
+    user_msg.is_suggestion = is_suggestion
+
+    prefetched = (feedback_conv.id, user_message) if is_suggestion and untouched else None
+    return (feedback_conv, user_message, parse_feedback_json(feedback_conv), prefetched), None
+
+
+def reply_to_feedback_message(feedback_conv, ai_response, feedback_json):
+    """Store the coach's reply and build the chat response with fresh suggestions."""
+    feedback_conv.add_message("feedback_assistant", ai_response)
+
+    db.session.commit()
+
+    # Generate new suggestions based on the conversation
+    suggestions = generate_feedback_suggestions(feedback_conv, feedback_json)
+
+    return jsonify({
+        "ai_response": ai_response,
+        "messages": feedback_conv.get_messages_history(),
+        "suggestions": suggestions
+    })
+
+
 @dialogic_feedback.route("/feedback/<int:feedback_conversation_id>/end", methods=["POST"])
 @jwt_required()
 def end_dialogic_feedback(feedback_conversation_id):
@@ -295,34 +332,25 @@ def generate_feedback_suggestions(feedback_conv, feedback_json=None):
         return ["What did I do well?", "How can I improve?", "Any specific tips?"]
 
 
-def generate_ai_feedback_response(feedback_conv, user_message, feedback_json=None):
+def build_feedback_chat_messages(feedback_conv, messages_history, feedback_json=None):
     """
-    Generate AI response to user's question about their feedback.
-    Enhanced to work with structured JSON feedback.
+    Build the chat completion messages for the feedback coach from the feedback,
+    the original practice transcript and the feedback conversation history.
     """
-    try:
-        api_key = os.getenv("OPENAI_API_KEY")
-        if not api_key:
-            return "I'm sorry, I'm having trouble connecting right now. Please try again later."
+    original_conversation = feedback_conv.original_conversation
+    practice_transcript = original_conversation.get_messages_history() if original_conversation else []
+
+    # Prepare feedback context based on format
+    feedback_context = ""
+    if feedback_json:
+        # Use structured feedback
+        feedback_context = f"STRUCTURED FEEDBACK:\n{json.dumps(feedback_json, indent=2)}"
+    else:
+        # Use text feedback
+        feedback_context = f"ORIGINAL FEEDBACK:\n{feedback_conv.detailed_feedback or feedback_conv.summary_feedback}"
 
-        client = OpenAI(api_key=api_key)
-        
-        # Get conversation history for context
-        messages_history = feedback_conv.get_messages_history()
-        original_conversation = feedback_conv.original_conversation
-        practice_transcript = original_conversation.get_messages_history() if original_conversation else []
-        
-        # Prepare feedback context based on format
-        feedback_context = ""
-        if feedback_json:
-            # Use structured feedback
-            feedback_context = f"STRUCTURED FEEDBACK:\n{json.dumps(feedback_json, indent=2)}"
-        else:
-            # Use text feedback
-            feedback_context = f"ORIGINAL FEEDBACK:\n{feedback_conv.detailed_feedback or feedback_conv.summary_feedback}"
-        
-        # Build system prompt with full context
-        system_prompt = f"""You are a supportive, *conversational* AI feedback coach for language learners.
+    # Build system prompt with full context
+    system_prompt = f"""You are a supportive, *conversational* AI feedback coach for language learners.
 
 STYLE:
 - Use friendly, natural language (think encouraging tutor, not formal report).
@@ -353,29 +381,201 @@ ALWAYS finish with one question, e.g.:
 - “Would you like a quick practice line for that?”
 """
 
-        # Build conversation history for the API call
-        api_messages = [{"role": "system", "content": system_prompt}]
-        
-        # Add recent conversation history (last 10 messages to stay within token limits)
-        recent_messages = messages_history[-10:] if len(messages_history) > 10 else messages_history
-        for msg in recent_messages:
-            if msg["role"] in ["user", "feedback_assistant"]:
-                role = "user" if msg["role"] == "user" else "assistant"
-                api_messages.append({"role": role, "content": msg["content"]})
-
-        response = client.chat.completions.create(
-            model="gpt-4o",
+    # Build conversation history for the API call
+    api_messages = [{"role": "system", "content": system_prompt}]
+
+    # Add recent conversation history (last 10 messages to stay within token limits)
+    recent_messages = messages_history[-10:] if len(messages_history) > 10 else messages_history
+    for msg in recent_messages:
+        if msg["role"] in ["user", "feedback_assistant"]:
+            role = "user" if msg["role"] == "user" else "assistant"
+            api_messages.append({"role": role, "content": msg["content"]})
+
+    return api_messages
+
+
+def request_feedback_reply(api_messages, route="dialogic_feedback_chat", labels=None, policy=CHAT_POLICY, models=None):
+    """
+    Send the prepared messages to the feedback coach model and return its reply.
+    labels carries the case_id/institution_id metrics labels for the call;
+    policy is the transport policy (the interactive one hedges slow requests);
+    models is the routed [primary, fallback] list from select_models.
+    """
+    api_key = os.getenv("OPENAI_API_KEY")
+    if not api_key:
+        raise RuntimeError("OPENAI_API_KEY is not set")
+
+    client = OpenAI(api_key=api_key, timeout=policy.timeout, max_retries=0)
+    response, _ = routed_completion(
+        "feedback_chat",
+        route,
+        lambda model: client.chat.completions.create(
+            model=model,
             messages=api_messages,
             max_tokens=350,  # Reduced for faster responses
             temperature=0.7,  
             presence_penalty=0.2
-        )
+        ),
+        policy,
+        labels=labels,
+        models=models
+    )
+
+    return response.choices[0].message.content
+
+
+async def request_feedback_reply_async(api_messages, route="dialogic_feedback_chat", labels=None, policy=CHAT_POLICY, models=None):
+    """Async counterpart of request_feedback_reply for the ASGI routes."""
+    client = get_async_openai_client().with_options(timeout=policy.timeout)
+    response, _ = await routed_completion_async(
+        "feedback_chat",
+        route,
+        lambda model: client.chat.completions.create(
+            model=model,
+            messages=api_messages,
+            max_tokens=350,
+            temperature=0.7,
+            presence_penalty=0.2
+        ),
+        policy,
+        labels=labels,
+        models=models
+    )
+
+    return response.choices[0].message.content
 
-        return response.choices[0].message.content
+
+def feedback_reply_context(feedback_conv, feedback_json=None):
+    """The (api_messages, labels, models) for answering the latest message. Reads the database."""
+    messages_history = feedback_conv.get_messages_history()
+    return (
+        build_feedback_chat_messages(feedback_conv, messages_history, feedback_json),
+        feedback_case_labels(feedback_conv),
+        select_models("feedback_chat", feedback_practice_case(feedback_conv))
+    )
+
+
+def generate_ai_feedback_response(feedback_conv, user_message, feedback_json=None):
+    """
+    Generate AI response to user's question about their feedback.
+    Enhanced to work with structured JSON feedback.
+    """
+    try:
+        api_key = os.getenv("OPENAI_API_KEY")
+        if not api_key:
+            return FEEDBACK_REPLY_UNAVAILABLE
+
+        # Get conversation history for context
+        api_messages, labels, models = feedback_reply_context(feedback_conv, feedback_json)
+        return request_feedback_reply(api_messages, labels=labels, models=models)
 
     except Exception as e:
         current_app.logger.error(f"❌ Error generating AI response: {str(e)}")
-        return "I'm sorry, I'm having trouble processing your question right now. Could you try rephrasing it?"
+        return FEEDBACK_REPLY_FAILED
+
+
+def prefetch_suggestion_answers(feedback_conv):
+    """
+    Speculatively generate answers to the initial suggestion buttons of a new
+    feedback conversation in the background. The history used for each answer
+    mirrors what the chat endpoint sees on a first click: the welcome message
+    followed by the suggestion.
+    """
+    if not current_app.config.get("SUGGESTION_PREFETCH_ENABLED", True):
+        return
+    if not os.getenv("OPENAI_API_KEY"):
+        return
+
+    feedback_json = parse_feedback_json(feedback_conv)
+    suggestions = generate_feedback_suggestions(feedback_conv, feedback_json)
+    welcome_message = create_welcome_message(feedback_conv, feedback_json)
+    labels = feedback_case_labels(feedback_conv)
+    models = select_models("feedback_chat", feedback_practice_case(feedback_conv))
+    app = current_app._get_current_object()
+
+    for suggestion in suggestions:
+        history = [
+            {"role": "feedback_assistant", "content": welcome_message},
+            {"role": "user", "content": suggestion},
+        ]
+        api_messages = build_feedback_chat_messages(feedback_conv, history, feedback_json)
+        future = _prefetch_executor.submit(_prefetch_reply, app, feedback_conv.id, api_messages, labels, models)
+        with _suggestion_answers_lock:
+            _suggestion_answers[(feedback_conv.id, suggestion)] = future
+
+    current_app.logger.info(f"🔮 Prefetching {len(suggestions)} suggestion answers for feedback conversation {feedback_conv.id}")
+
+
+def _prefetch_reply(app, feedback_conversation_id, api_messages, labels, models):
+    """Background task: returns the reply, or None so the click falls back to a live call."""
+    with app.app_context():
+        try:
+            return request_feedback_reply(
+                api_messages, route="suggestion_prefetch", labels=labels, policy=BACKGROUND_CHAT_POLICY, models=models
+            )
+        except Exception as e:
+            current_app.logger.warning(f"⚠️ Suggestion prefetch failed for feedback conversation {feedback_conversation_id}: {str(e)}")
+            return None
+
+
+def take_prefetched_answer(feedback_conversation_id, suggestion):
+    """
+    Pop the prefetched answer for a suggestion. Waits briefly for an in-flight
+    prefetch; returns None when nothing usable is cached.
+    """
+    with _suggestion_answers_lock:
+        future = _suggestion_answers.pop((feedback_conversation_id, suggestion), None)
+    if future is None:
+        return None
+
+    wait_seconds = current_app.config.get("SUGGESTION_PREFETCH_WAIT_SECONDS", 20)
+    try:
+        return future.result(timeout=wait_seconds)
+    except FutureTimeoutError:
+        return None
+
+
+async def take_prefetched_answer_async(feedback_conversation_id, suggestion):
+    """Async counterpart of take_prefetched_answer: waits on the prefetch without blocking the event loop."""
+    with _suggestion_answers_lock:
+        future = _suggestion_answers.pop((feedback_conversation_id, suggestion), None)
+    if future is None:
+        return None
+
+    wait_seconds = current_app.config.get("SUGGESTION_PREFETCH_WAIT_SECONDS", 20)
+    try:
+        return await asyncio.wait_for(asyncio.wrap_future(future), timeout=wait_seconds)
+    except asyncio.TimeoutError:
+        return None
+
+
+def discard_prefetched_answers(feedback_conversation_id):
+    """Drop remaining prefetched answers once the conversation has moved on."""
+    with _suggestion_answers_lock:
+        stale_keys = [key for key in list(_suggestion_answers.keys()) if key[0] == feedback_conversation_id]
+        for key in stale_keys:
+            _suggestion_answers.pop(key, None)
+
+
+def feedback_practice_case(feedback_conv):
+    """The practice case behind a feedback conversation, if any."""
+    original_conversation = feedback_conv.original_conversation
+    return original_conversation.practice_case if original_conversation else None
+
+
+def feedback_case_labels(feedback_conv):
+    """Metrics labels for the practice case behind a feedback conversation."""
+    return case_labels(feedback_practice_case(feedback_conv))
+
+
+def parse_feedback_json(feedback_conv):
+    """Return the structured feedback of a feedback conversation, or None for text feedback."""
+    if not feedback_conv.detailed_feedback:
+        return None
+    try:
+        return json.loads(feedback_conv.detailed_feedback)
+    except json.JSONDecodeError:
+        return None
 
 
 def format_transcript_for_context(transcript):
@@ -12,6 +12,9 @@ from app.utils.user_roles import is_user_instructor, get_students_for_instructor
 
 instructors = Blueprint("instructor", __name__)
 
+# Practice case fields returned by /practice-cases unless ?fields= or ?view= asks otherwise
+PRACTICE_CASE_LIST_FIELDS = ("id", "title", "description", "class_id", "published", "created_at")
+
 def format_last_active(timestamp):
     """Formats the datetime object to a relative time."""
     if not timestamp:
@@ -320,7 +323,10 @@ def get_case_analytics_details(case_id):
 @instructors.route("/practice-cases", methods=["GET"])
 @jwt_required()
 def get_practice_cases():
-    """Get practice cases for the instructor's classes, optionally filtered by class."""
+    """
+    Get practice cases for the instructor's classes, optionally filtered by class.
+    Supports ?fields=a,b,c and ?view=summary sparse fieldsets.
+    """
     try:
         current_user_id = get_jwt_identity()
         instructor = User.query.get(current_user_id)
@@ -328,6 +334,12 @@ def get_practice_cases():
         if not instructor or not is_user_instructor(instructor):
             return jsonify({"error": "Unauthorized"}), 403
 
+        try:
+            fields = PracticeCase.fields_from_args(request.args, default=list(PRACTICE_CASE_LIST_FIELDS))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        load_options = PracticeCase.load_options(fields)
+
         # Get optional class filter
         class_id = request.args.get("class_id", type=int)
         
@@ -342,24 +354,13 @@ def get_practice_cases():
             if not instructor_enrollment:
                 return jsonify({"error": "Unauthorized to view this class"}), 403
                 
-            cases = PracticeCase.query.filter_by(class_id=class_id).all()
+            cases = PracticeCase.query.filter_by(class_id=class_id).options(*load_options).all()
         else:
             # All classes the instructor teaches
             class_ids = {e.section.class_id for e in instructor.enrollments if e.role == "instructor"}
-            cases = PracticeCase.query.filter(PracticeCase.class_id.in_(class_ids)).all()
-
-        cases_data = []
-        for case in cases:
-            cases_data.append({
-                "id": case.id,
-                "title": case.title,
-                "description": case.description,
-                "class_id": case.class_id,
-                "published": case.published,
-                "created_at": case.created_at.isoformat() if case.created_at else None
-            })
+            cases = PracticeCase.query.filter(PracticeCase.class_id.in_(class_ids)).options(*load_options).all()
 
-        return jsonify(cases_data), 200
+        return jsonify([case.to_dict(fields) for case in cases]), 200
 
     except Exception as e:
         current_app.logger.error(f"Error fetching practice cases: {str(e)}")
@@ -787,14 +787,21 @@ def get_students():
 @master.route("/lessons", methods=["GET"])
 @master_required
 def get_lessons():
-    """Legacy route for getting lessons."""
+    """Legacy route for getting lessons. Supports ?fields=a,b,c and ?view=summary."""
     class_id = request.args.get("class_id")
     if not class_id:
         return jsonify({"error": "Missing class_id parameter"}), 400
 
     try:
-        lessons = PracticeCase.query.filter_by(class_id=class_id, published=True).all()
-        return jsonify([lesson.to_dict() for lesson in lessons])
+        fields = PracticeCase.fields_from_args(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        lessons = PracticeCase.query.filter_by(class_id=class_id, published=True).options(
+            *PracticeCase.load_options(fields)
+        ).all()
+        return jsonify([lesson.to_dict(fields) for lesson in lessons])
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -3,14 +3,29 @@ from flask_jwt_extended import jwt_required, get_jwt_identity
 from functools import wraps
 from app.models import PracticeCase, Conversation, User, Enrollment, Section, db
 from datetime import datetime, timezone
+from sqlalchemy import case as sql_case, func, insert
+from sqlalchemy.orm import selectinload
 from app.services.image_service import ImageService, ImageGenerationError
-from app.models import PracticeCaseImage 
+from app.services import image_jobs
+from app.services.session_pool import session_pool
+from app.services.library_search import index_case, search as search_library
+from app.services.library_tags import sync_case_tags, release_case_tags, normalize_tag
+from app.services import library_stats
+from app.services.library_stats import mark_library_changed
+from app.services.library_counters import rate_case, record_download, download_folder
+from app.services import library_pagination, library_similarity, library_duplicates
+from app.services.session_payloads import get_compiled_session, invalidate_compiled_session
+from app.models import PracticeCaseImage, LibraryTag
+from app.utils.http_cache import etag_cached, compute_etag, not_modified, with_etag
 from app.utils.user_roles import can_user_modify_case
 import os
 import json
 
 practice_cases = Blueprint('practice_cases', __name__)
 
+# Per-user fields get_cases adds to each case's to_dict()
+LIST_EXTRA_FIELDS = ("accessible", "completed")
+
 # ============================================================================
 # UTILITY FUNCTIONS AND DECORATORS
 # ============================================================================
@@ -74,6 +89,38 @@ def validate_required_fields_for_publishing(data):
         return f"Missing or invalid required fields for publishing: {', '.join(missing_fields)}"
     return None
 
+def practice_cases_version():
+    """
+    Version signal for get_cases: the classes the user sees, their cases' edits,
+    images and availability, and the user's completions.
+    """
+    user = get_current_user()
+    if not user:
+        return None
+
+    class_ids = sorted(get_user_accessible_class_ids(user))
+    cases = db.session.query(
+        func.count(PracticeCase.id),
+        func.max(PracticeCase.updated_at),
+        func.sum(sql_case((PracticeCase.accessible_on <= datetime.now(timezone.utc), 1), else_=0))
+    ).filter(PracticeCase.class_id.in_(class_ids)).one()
+    images = db.session.query(
+        func.count(PracticeCaseImage.id), func.max(PracticeCaseImage.id)
+    ).join(PracticeCase).filter(PracticeCase.class_id.in_(class_ids)).one()
+    completed = db.session.query(func.count(Conversation.id)).filter(
+        Conversation.user_id == user.id,
+        Conversation.completed == True
+    ).scalar()
+
+    return class_ids, user.is_student, user.is_master, tuple(cases), tuple(images), completed
+
+def practice_case_version(case):
+    """Version signal for a single case: its last edit and its images."""
+    images = db.session.query(
+        func.count(PracticeCaseImage.id), func.max(PracticeCaseImage.id)
+    ).filter(PracticeCaseImage.practice_case_id == case.id).one()
+    return case.updated_at, tuple(images)
+
 def handle_db_error(operation_name):
     """Decorator for consistent database error handling."""
     def decorator(func):
@@ -95,6 +142,7 @@ def handle_db_error(operation_name):
 @practice_cases.route('/get_cases', methods=['GET'])
 @jwt_required()
 @handle_db_error("fetch practice cases")
+@etag_cached(practice_cases_version)
 def get_practice_cases():
     """
     Retrieve practice cases visible to the authenticated user.
@@ -102,11 +150,18 @@ def get_practice_cases():
     Query Parameters:
     - class_id (optional): Filter cases for a specific class
     - include_drafts (optional): Include draft cases (instructors only)
+    - fields (optional): Comma-separated fields to return, e.g. id,title,completed
+    - view (optional): "summary" for the compact list representation
     """
     user = get_current_user()
     if not user:
         return jsonify({"error": "User not found"}), 404
 
+    try:
+        fields = PracticeCase.fields_from_args(request.args, extra=LIST_EXTRA_FIELDS)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
     # Get optional filters
     class_id = request.args.get('class_id', type=int)
     include_drafts = request.args.get('include_drafts', 'false').lower() == 'true'
@@ -143,27 +198,37 @@ def get_practice_cases():
         )
     
     practice_cases_query = practice_cases_query.order_by(PracticeCase.created_at.desc())
-    practice_cases_list = practice_cases_query.all()
+    # Load only the requested columns, and every case's images in one extra query
+    practice_cases_list = practice_cases_query.options(
+        *PracticeCase.load_options(fields, also=("accessible_on",))
+    ).all()
+
+    # Cases this user has completed, in one grouped query
+    wants_completed = fields is None or "completed" in fields
+    completed_case_ids = {
+        case_id for (case_id,) in db.session.query(Conversation.practice_case_id).filter(
+            Conversation.user_id == user.id,
+            Conversation.completed == True,
+            Conversation.practice_case_id.in_([case.id for case in practice_cases_list])
+        ).group_by(Conversation.practice_case_id)
+    } if practice_cases_list and wants_completed else set()
 
     # Build response with user-specific data
+    now = datetime.now(timezone.utc)
     response = []
     for case in practice_cases_list:
         # Check visibility for students
         if user.is_student:
-            accessible = case.accessible_on is None or case.accessible_on <= datetime.now(timezone.utc)
+            accessible = case.accessible_on is None or case.accessible_on <= now
         else:
             # Instructors and masters can see all cases
             accessible = True
 
-        case_data = case.to_dict()
-        case_data["accessible"] = accessible
-        
-        # Check if user has completed this case
-        case_data["completed"] = Conversation.query.filter_by(
-            practice_case_id=case.id, 
-            user_id=user.id, 
-            completed=True
-        ).first() is not None
+        case_data = case.to_dict(fields)
+        if fields is None or "accessible" in fields:
+            case_data["accessible"] = accessible
+        if wants_completed:
+            case_data["completed"] = case.id in completed_case_ids
 
         response.append(case_data)
 
@@ -191,7 +256,16 @@ def get_practice_case(case_id):
     if user.is_student and not case.published:
         return jsonify({"error": "Practice case not available"}), 403
 
-    return jsonify(case.to_dict()), 200
+    # A student opening an available case is likely to start speaking soon
+    if user.is_student and (case.accessible_on is None or case.accessible_on <= datetime.now(timezone.utc)):
+        try:
+            session_pool.prewarm(get_compiled_session(case.id, practice_case=case))
+        except Exception as e:
+            current_app.logger.warning(f"Could not pre-warm realtime session for case {case_id}: {str(e)}")
+
+    # Conditional GET after the access checks and pre-warm, before serializing the case
+    etag = compute_etag(practice_case_version(case))
+    return not_modified(etag) or with_etag((jsonify(case.to_dict()), 200), etag)
 
 
 @practice_cases.route('/add_case', methods=['POST'])
@@ -318,6 +392,18 @@ def update_practice_case(case_id):
             else:
                 setattr(case, field, data[field])
 
+    # Library cases can retag themselves; tag counters follow
+    if "library_tags" in data and case.submitted_to_library:
+        tags = data["library_tags"] or []
+        if not isinstance(tags, list):
+            return jsonify({"error": "library_tags must be a list"}), 400
+        case.library_tags = json.dumps(tags)
+        sync_case_tags(case, was_counted=case.library_approved)
+
+    # Language and tag changes on library cases feed the library stats
+    if case.library_approved and ("target_language" in data or "library_tags" in data):
+        mark_library_changed()
+
     # Handle draft and published status
     if "is_draft" in data:
         case.is_draft = bool(data["is_draft"])
@@ -361,7 +447,16 @@ def update_practice_case(case_id):
     # Update the updated_at timestamp
     case.updated_at = datetime.now(timezone.utc)
 
+    # Keep the library search index in step with the case's text
+    if case.submitted_to_library:
+        index_case(case)
+    if case.library_approved and any(field in data for field in library_similarity.TEXT_FIELDS):
+        library_similarity.index_case(case)
+    if case.submitted_to_library and any(field in data for field in library_duplicates.TEXT_FIELDS):
+        library_duplicates.index_case(case)
+
     db.session.commit()
+    invalidate_compiled_session(case_id)
     
     current_app.logger.info(f"Practice case {case_id} updated by user {user.id}")
     return jsonify({"message": "Practice case updated successfully", "case": case.to_dict()}), 200
@@ -416,6 +511,7 @@ def publish_practice_case(case_id):
         case.publish()
         case.updated_at = datetime.now(timezone.utc)
         db.session.commit()
+        invalidate_compiled_session(case_id)
         
         current_app.logger.info(f"Practice case {case_id} published by user {user.id}")
         return jsonify({"message": "Practice case published successfully", "case": case.to_dict()}), 200
@@ -461,6 +557,7 @@ def toggle_publish_practice_case(case_id):
 
     case.updated_at = datetime.now(timezone.utc)
     db.session.commit()
+    invalidate_compiled_session(case_id)
     
     status = "published" if published else "unpublished"
     current_app.logger.info(f"Practice case {case_id} {status} by user {user.id}")
@@ -493,8 +590,17 @@ def delete_practice_case(case_id):
         }), 400
 
     case_title = case.title
+    in_library = case.library_approved
+    release_case_tags(case)
+    if in_library:
+        library_similarity.remove_case(case.id)
+    if case.submitted_to_library:
+        library_duplicates.remove_case(case.id)
     db.session.delete(case)
+    if in_library:
+        mark_library_changed()
     db.session.commit()
+    invalidate_compiled_session(case_id)
     
     current_app.logger.info(f"Practice case '{case_title}' (ID: {case_id}) deleted by user {user.id}")
     return jsonify({"message": "Practice case deleted successfully"}), 200
@@ -550,42 +656,68 @@ def get_case_analytics(case_id):
 # IMAGE ROUTES
 # ============================================================================
 
-@practice_cases.route('/generate_image/<int:case_id>', methods=['POST'])
-@jwt_required()
-@handle_db_error("generate case image")
-def generate_case_image(case_id):
+def get_case_for_image_generation(user, case_id):
     """
-    Generates an image for a practice case using base64 format and saves it.
-    Accepts 'include_person' parameter to determine if avatar should be included.
+    Load a case the user may generate an image for. Returns (case, None) or
+    (None, error response).
     """
-    user = get_current_user()
     if not user:
-        return jsonify({"error": "User not found"}), 404
+        return None, (jsonify({"error": "User not found"}), 404)
 
     case = PracticeCase.query.get(case_id)
     if not case:
-        return jsonify({"error": "Practice case not found"}), 404
+        return None, (jsonify({"error": "Practice case not found"}), 404)
 
     # Authorization check
     if not can_user_modify_case(user, case):
-        return jsonify({"error": "Unauthorized to modify this practice case"}), 403
+        return None, (jsonify({"error": "Unauthorized to modify this practice case"}), 403)
 
     if not case.situation_instructions or not case.behavioral_guidelines:
-        return jsonify({"error": "Case must have situation and behavioral guidelines to generate an image."}), 400
+        return None, (jsonify({"error": "Case must have situation and behavioral guidelines to generate an image."}), 400)
+
+    return case, None
+
+
+@practice_cases.route('/generate_image/<int:case_id>', methods=['POST'])
+@jwt_required()
+@handle_db_error("generate case image")
+def generate_case_image(case_id):
+    """
+    Starts generating an image for a practice case (replacing its current one)
+    in the background and returns the job; poll /image_jobs/<job_id> for the
+    result. Accepts 'include_person' parameter to determine if avatar should be included.
+    """
+    user = get_current_user()
+    case, error = get_case_for_image_generation(user, case_id)
+    if error:
+        return error
 
     # Get include_person parameter from request body
     data = request.get_json() or {}
     include_person = data.get('include_person', False)
 
     try:
-        # Use the method that generates AND saves the image
-        new_image = ImageService.generate_and_save_image(case, include_person=include_person)
-        return jsonify(new_image.to_dict()), 201
-    except (ValueError, ImageGenerationError) as e:
-        return jsonify({"error": str(e)}), 400
-    except Exception as e:
-        current_app.logger.error(f"Unhandled exception during image generation for case {case_id}: {e}")
-        return jsonify({"error": "An unexpected server error occurred."}), 500
+        job, _ = image_jobs.submit(case, user, include_person=include_person)
+    except image_jobs.TooManyImageJobs as e:
+        return jsonify({"error": str(e)}), 429
+
+    return jsonify({"job": job.to_dict()}), 202
+
+
+@practice_cases.route('/image_jobs/<int:job_id>', methods=['GET'])
+@jwt_required()
+@handle_db_error("fetch image job")
+def get_image_job(job_id):
+    """Status of a background image generation; includes the saved image once it has succeeded."""
+    user = get_current_user()
+    if not user:
+        return jsonify({"error": "User not found"}), 404
+
+    job = image_jobs.get_job(job_id, user)
+    if not job:
+        return jsonify({"error": "Image job not found"}), 404
+
+    return jsonify({"job": job.to_dict()}), 200
 
 
 @practice_cases.route('/delete_image/<int:image_id>', methods=['DELETE'])
@@ -614,6 +746,57 @@ def delete_case_image(image_id):
 # GLOBAL LIBRARY ROUTES
 # ============================================================================
 
+def withdraw_from_library(case):
+    """Reset a pending case's library submission (rejections and duplicate merges). Does not commit."""
+    case.submitted_to_library = False
+    case.library_submitted_at = None
+    case.author_name = None
+    case.author_institution = None
+    case.library_tags = None
+    case.updated_at = datetime.now(timezone.utc)
+    sync_case_tags(case, was_counted=False)
+    library_duplicates.remove_case(case.id)
+
+
+# Most library cases one bulk copy request may clone
+MAX_BULK_COPY = 50
+
+
+def copy_library_cases(library_cases, class_id, user):
+    """
+    Copy approved library cases into a class in one transaction: the cases in
+    a batched insert, their images duplicated by server-side S3 copies and
+    inserted in bulk, and a download recorded for each source. Commits;
+    returns the new cases in the order given. Raises ValueError or
+    ImageGenerationError, leaving nothing behind.
+    """
+    new_cases = [case.create_copy_from_library(class_id, user.id) for case in library_cases]
+    db.session.add_all(new_cases)
+    db.session.flush()
+
+    try:
+        image_rows, copied_keys = ImageService.copy_images({
+            new_case.id: list(source.images) for source, new_case in zip(library_cases, new_cases)
+        })
+    except ImageGenerationError:
+        db.session.rollback()
+        raise
+
+    try:
+        if image_rows:
+            db.session.execute(insert(PracticeCaseImage), image_rows)
+        for case in library_cases:
+            record_download(case.id)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        ImageService.delete_objects(copied_keys)
+        raise
+
+    download_folder.schedule(current_app._get_current_object())
+    return new_cases
+
+
 @practice_cases.route('/submit_to_library/<int:case_id>', methods=['POST'])
 @jwt_required()
 @handle_db_error("submit case to library")
@@ -649,9 +832,34 @@ def submit_case_to_library(case_id):
     
     # Submit to library using the model method
     try:
+        was_counted = case.library_approved
         case.submit_to_library(author_name, author_institution or None, tags)
         case.updated_at = datetime.now(timezone.utc)
+
+        # Near-duplicates of a library case wait for an admin instead of being auto-approved
+        duplicate = library_duplicates.index_case(case)
+        if duplicate:
+            case.library_approved = False
+            case.library_approved_at = None
+
+        sync_case_tags(case, was_counted)
+        index_case(case)
+        if case.library_approved:
+            library_similarity.index_case(case)
+        mark_library_changed()
         db.session.commit()
+
+        if duplicate:
+            duplicate_of_id, score = duplicate
+            current_app.logger.info(
+                f"Practice case {case_id} submitted by user {user.id} held for review "
+                f"as a near-duplicate of library case {duplicate_of_id} ({score:.2f})"
+            )
+            return jsonify({
+                "message": "Case is very similar to an existing library case and is waiting for review",
+                "duplicate_of": {"id": duplicate_of_id, "score": score},
+                "case": case.to_dict()
+            }), 200
         
         current_app.logger.info(f"Practice case {case_id} submitted and auto-approved for library by user {user.id}")
         return jsonify({
@@ -667,160 +875,126 @@ def submit_case_to_library(case_id):
 @jwt_required()
 @handle_db_error("fetch library cases")
 def get_library_cases():
-    """Get all approved library cases with filtering and sorting"""
+    """
+    Get all approved library cases with filtering and sorting.
+
+    search is full-text (ranked, prefix-matching, stemmed with the language
+    filter's language); results are ordered by relevance unless sort is given.
+
+    Pages are cursor-based: pass pagination.next_cursor back as cursor for the
+    next page. page still selects numbered pages for older clients. total is
+    cached for up to library_pagination.TOTAL_CACHE_SECONDS.
+    """
     user = get_current_user()
     if not user:
         return jsonify({"error": "User not found"}), 404
 
     # Get query parameters
-    page = request.args.get('page', 1, type=int)
-    per_page = min(request.args.get('per_page', 50, type=int), 100)  # Limit to 100
+    page = request.args.get('page', type=int)
+    cursor = request.args.get('cursor')
+    per_page = max(1, min(request.args.get('per_page', 50, type=int), 100))  # Limit to 100
     language = request.args.get('language', '').strip()
     tag = request.args.get('tag', '').strip()
-    sort_by = request.args.get('sort', 'newest')
     search = request.args.get('search', '').strip()
+    sort_by = request.args.get('sort', 'relevance' if search else 'newest')
     
     # Base query for approved library cases
     query = PracticeCase.query.filter_by(library_approved=True)
     
-    # Apply search filter
+    # Apply full-text search
+    relevance = None
     if search:
-        search_term = f"%{search}%"
-        query = query.filter(
-            db.or_(
-                PracticeCase.title.ilike(search_term),
-                PracticeCase.description.ilike(search_term),
-                PracticeCase.author_name.ilike(search_term),
-                PracticeCase.library_tags.ilike(search_term)
-            )
-        )
+        query, relevance = search_library(query, search, language)
     
     # Apply language filter
     if language:
         query = query.filter(PracticeCase.target_language.ilike(f"%{language}%"))
     
-    # Apply tag filter (simple contains check)
+    # Apply tag filter through the tag index
     if tag:
-        query = query.filter(PracticeCase.library_tags.contains(f'"{tag}"'))
+        query = query.filter(PracticeCase.tags.any(LibraryTag.name == normalize_tag(tag)))
     
-    # Apply sorting
-    if sort_by == 'newest':
-        query = query.order_by(PracticeCase.library_approved_at.desc())
-    elif sort_by == 'oldest':
-        query = query.order_by(PracticeCase.library_approved_at.asc())
-    elif sort_by == 'popular':
-        query = query.order_by(PracticeCase.library_downloads.desc())
-    elif sort_by == 'rating':
-        query = query.order_by(PracticeCase.library_rating.desc().nullslast())
-    elif sort_by == 'title':
-        query = query.order_by(PracticeCase.title.asc())
+    sort_by = library_pagination.resolve_sort(sort_by, relevance is not None)
+    total = library_pagination.cached_total(query, language.lower(), normalize_tag(tag), search.lower())
+    pagination = {"sort": sort_by, "per_page": per_page, "total": total}
+
+    if page is not None and not cursor:
+        # Numbered pages still scan past an OFFSET, but no longer count on every request
+        page = max(page, 1)
+        items = library_pagination.order_query(query, sort_by, relevance).offset(
+            (page - 1) * per_page
+        ).limit(per_page).all()
+        pagination.update({
+            "page": page,
+            "pages": -(-total // per_page),
+            "has_next": page * per_page < total,
+            "has_prev": page > 1,
+        })
     else:
-        # Default to newest
-        query = query.order_by(PracticeCase.library_approved_at.desc())
-    
-    # Paginate results
-    try:
-        pagination = query.paginate(
-            page=page, 
-            per_page=per_page, 
-            error_out=False
-        )
-    except Exception as e:
-        current_app.logger.error(f"Error paginating library cases: {e}")
-        return jsonify({"error": "Invalid pagination parameters"}), 400
+        try:
+            items, next_cursor = library_pagination.paginate(query, sort_by, per_page, cursor, relevance)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        pagination.update({"next_cursor": next_cursor, "has_next": next_cursor is not None})
     
     # Convert to library dict format
     cases = []
-    for case in pagination.items:
+    for case in items:
         library_dict = case.to_library_dict()
         if library_dict:  # Only include if properly formatted
             cases.append(library_dict)
     
-    return jsonify({
-        "cases": cases,
-        "pagination": {
-            "page": page,
-            "pages": pagination.pages,
-            "per_page": per_page,
-            "total": pagination.total,
-            "has_next": pagination.has_next,
-            "has_prev": pagination.has_prev
-        }
-    }), 200
+    return jsonify({"cases": cases, "pagination": pagination}), 200
 
 
 @practice_cases.route('/library/stats', methods=['GET'])
 @jwt_required()
 @handle_db_error("fetch library statistics")
 def get_library_stats():
-    """Get statistics about the library"""
+    """
+    Get statistics about the library from the materialized stats row.
+    computed_at is when they were aggregated; max_staleness_seconds bounds how
+    far behind the latest library change they can be.
+    """
     user = get_current_user()
     if not user:
         return jsonify({"error": "User not found"}), 404
 
     try:
-        # Get total cases and downloads
-        total_cases = PracticeCase.query.filter_by(library_approved=True).count()
-        
-        # Get total downloads (handle None values)
-        downloads_result = db.session.query(
-            db.func.coalesce(db.func.sum(PracticeCase.library_downloads), 0)
-        ).filter_by(library_approved=True).scalar()
-        total_downloads = downloads_result or 0
-        
-        # Get popular languages
-        language_counts = db.session.query(
-            PracticeCase.target_language,
-            db.func.count(PracticeCase.id).label('count')
-        ).filter(
-            PracticeCase.library_approved == True,
-            PracticeCase.target_language.isnot(None),
-            PracticeCase.target_language != ''
-        ).group_by(PracticeCase.target_language).order_by(db.desc('count')).limit(10).all()
-        
-        popular_languages = [lang[0] for lang in language_counts]
-        
-        # Get popular tags (parse JSON tags)
-        import json
-        tag_query = db.session.query(PracticeCase.library_tags).filter(
-            PracticeCase.library_approved == True,
-            PracticeCase.library_tags.isnot(None),
-            PracticeCase.library_tags != ''
-        ).all()
-        
-        all_tags = []
-        for tag_row in tag_query:
-            if tag_row[0]:
-                try:
-                    tags = json.loads(tag_row[0])
-                    if isinstance(tags, list):
-                        all_tags.extend(tags)
-                except (json.JSONDecodeError, TypeError):
-                    # Skip invalid JSON
-                    continue
-        
-        # Count tag frequency
-        tag_counts = {}
-        for tag in all_tags:
-            if tag and isinstance(tag, str):
-                tag_counts[tag] = tag_counts.get(tag, 0) + 1
-        
-        # Get top 20 tags
-        popular_tags = sorted(tag_counts.items(), key=lambda x: x[1], reverse=True)[:20]
-        popular_tags = [tag[0] for tag in popular_tags]
-        
-        return jsonify({
-            "total_cases": total_cases,
-            "total_downloads": total_downloads,
-            "popular_languages": popular_languages,
-            "popular_tags": popular_tags
-        }), 200
+        return jsonify(library_stats.get_library_stats()), 200
         
     except Exception as e:
         current_app.logger.error(f"Error getting library stats: {e}")
         return jsonify({"error": "Failed to fetch library statistics"}), 500
 
 
+@practice_cases.route('/library/<int:case_id>/similar', methods=['GET'])
+@jwt_required()
+@handle_db_error("fetch similar library cases")
+def get_similar_library_cases(case_id):
+    """
+    Library cases most like this one, from the precomputed neighbour lists
+    (flask build-library-neighbors). indexed is false for a case the index
+    does not cover yet.
+    """
+    user = get_current_user()
+    if not user:
+        return jsonify({"error": "User not found"}), 404
+
+    if not PracticeCase.query.filter_by(id=case_id, library_approved=True).first():
+        return jsonify({"error": "Library case not found"}), 404
+
+    limit = max(1, min(request.args.get('limit', library_similarity.TOP_K, type=int), library_similarity.TOP_K))
+    similar = library_similarity.similar_cases(case_id, limit)
+    if similar is None:
+        return jsonify({"cases": [], "indexed": False}), 200
+
+    return jsonify({
+        "cases": [{**case.to_library_dict(), "similarity": score} for case, score in similar],
+        "indexed": True
+    }), 200
+
+
 @practice_cases.route('/copy_from_library/<int:case_id>', methods=['POST'])
 @jwt_required()
 @handle_db_error("copy case from library")
@@ -848,14 +1022,9 @@ def copy_case_from_library(case_id):
         if class_id not in accessible_class_ids:
             return jsonify({"error": "Unauthorized to create cases for this class"}), 403
 
-    # Create copy using the model method
+    # Copy the case and its images; the download is counted when pending downloads are folded
     try:
-        new_case = library_case.create_copy_from_library(class_id, user.id)
-        
-        # Save the new case and update download count
-        db.session.add(new_case)
-        # Note: download count is updated in the model method
-        db.session.commit()
+        new_case, = copy_library_cases([library_case], class_id, user)
         
         current_app.logger.info(f"Library case {case_id} copied by user {user.id} to class {class_id}")
         return jsonify({
@@ -865,16 +1034,74 @@ def copy_case_from_library(case_id):
         
     except ValueError as e:
         return jsonify({"error": str(e)}), 400
+    except ImageGenerationError as e:
+        return jsonify({"error": str(e)}), 502
     except Exception as e:
         current_app.logger.error(f"Error copying library case {case_id}: {e}")
         return jsonify({"error": "Failed to copy case"}), 500
 
 
+@practice_cases.route('/copy_from_library/bulk', methods=['POST'])
+@jwt_required()
+@handle_db_error("bulk copy cases from library")
+def bulk_copy_cases_from_library():
+    """
+    Copy several library cases (with their images) into a class at once.
+    Takes {"case_ids": [...], "class_id": ...}; case IDs that are not approved
+    library cases are returned in missing. All copies succeed or none do.
+    """
+    user = get_current_user()
+    if not user:
+        return jsonify({"error": "User not found"}), 404
+
+    data = request.get_json() or {}
+    case_ids = data.get("case_ids")
+    class_id = data.get("class_id")
+
+    if not isinstance(case_ids, list) or not case_ids or not all(isinstance(case_id, int) for case_id in case_ids):
+        return jsonify({"error": "case_ids must be a non-empty list of case IDs"}), 400
+    case_ids = list(dict.fromkeys(case_ids))
+    if len(case_ids) > MAX_BULK_COPY:
+        return jsonify({"error": f"At most {MAX_BULK_COPY} cases can be copied at once"}), 400
+
+    if class_id and class_id not in get_user_accessible_class_ids(user):
+        return jsonify({"error": "Unauthorized to create cases for this class"}), 403
+
+    found = {
+        case.id: case
+        for case in PracticeCase.query.options(selectinload(PracticeCase.images)).filter(
+            PracticeCase.id.in_(case_ids),
+            PracticeCase.library_approved == True
+        )
+    }
+    library_cases = [found[case_id] for case_id in case_ids if case_id in found]
+    if not library_cases:
+        return jsonify({"error": "Library cases not found"}), 404
+
+    try:
+        new_cases = copy_library_cases(library_cases, class_id, user)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except ImageGenerationError as e:
+        return jsonify({"error": str(e)}), 502
+
+    new_cases = PracticeCase.query.options(selectinload(PracticeCase.images)).populate_existing().filter(
+        PracticeCase.id.in_([case.id for case in new_cases])
+    ).order_by(PracticeCase.id).all()
+
+    current_app.logger.info(f"{len(new_cases)} library cases copied by user {user.id} to class {class_id}")
+    return jsonify({
+        "message": f"Copied {len(new_cases)} cases",
+        "cases": [case.to_dict() for case in new_cases],
+        "missing": [case_id for case_id in case_ids if case_id not in found]
+    }), 201
+
+
 @practice_cases.route('/rate_library_case/<int:case_id>', methods=['POST'])
 @jwt_required()
 @handle_db_error("rate library case")
 def rate_library_case(case_id):
-    """Rate a library case (simplified rating system)"""
+    """Rate a library case (one rating per user; rating again replaces it)"""
     user = get_current_user()
     if not user:
         return jsonify({"error": "User not found"}), 404
@@ -893,24 +1120,15 @@ def rate_library_case(case_id):
     if not rating or not isinstance(rating, (int, float)) or rating < 1 or rating > 5:
         return jsonify({"error": "Rating must be a number between 1 and 5"}), 400
 
-    # Simple average rating calculation (you might want to create a separate ratings table)
-    if case.library_rating is None:
-        case.library_rating = float(rating)
-        case.library_rating_count = 1
-    else:
-        # Calculate new average
-        total_points = case.library_rating * case.library_rating_count
-        case.library_rating_count += 1
-        case.library_rating = (total_points + rating) / case.library_rating_count
-
-    case.updated_at = datetime.now(timezone.utc)
+    # One rating per user; re-rating replaces the earlier one
+    new_rating, rating_count = rate_case(case.id, user.id, rating)
     db.session.commit()
     
     current_app.logger.info(f"User {user.id} rated library case {case_id}: {rating}")
     return jsonify({
         "message": "Rating submitted successfully",
-        "new_rating": case.library_rating,
-        "rating_count": case.library_rating_count
+        "new_rating": new_rating,
+        "rating_count": rating_count
     }), 200
 
 
@@ -936,8 +1154,28 @@ def get_pending_library_cases():
             submitted_to_library=True,
             library_approved=False
         ).order_by(PracticeCase.library_submitted_at.desc()).all()
-        
-        cases = [case.to_dict() for case in pending_cases]
+
+        # Flagged near-duplicates carry the library case they resemble, for merging
+        flags = library_duplicates.duplicate_flags([case.id for case in pending_cases])
+        originals = {
+            original.id: original
+            for original in PracticeCase.query.filter(
+                PracticeCase.id.in_({duplicate_of_id for duplicate_of_id, _ in flags.values()})
+            )
+        } if flags else {}
+
+        cases = []
+        for case in pending_cases:
+            case_dict = case.to_dict()
+            if case.id in flags:
+                duplicate_of_id, score = flags[case.id]
+                original = originals.get(duplicate_of_id)
+                case_dict["duplicate_of"] = {
+                    "id": duplicate_of_id,
+                    "title": original.title if original else None,
+                    "score": score
+                }
+            cases.append(case_dict)
         
         return jsonify({"cases": cases}), 200
         
@@ -971,6 +1209,10 @@ def approve_library_case(case_id):
     try:
         case.approve_for_library(user.id)
         case.updated_at = datetime.now(timezone.utc)
+        sync_case_tags(case, was_counted=False)
+        library_duplicates.clear_duplicate(case.id)
+        library_similarity.index_case(case)
+        mark_library_changed()
         db.session.commit()
         
         current_app.logger.info(f"Library case {case_id} approved by admin user {user.id}")
@@ -1009,12 +1251,7 @@ def reject_library_case(case_id):
     rejection_reason = data.get("reason", "").strip()
 
     # Reset library submission status
-    case.submitted_to_library = False
-    case.library_submitted_at = None
-    case.author_name = None
-    case.author_institution = None
-    case.library_tags = None
-    case.updated_at = datetime.now(timezone.utc)
+    withdraw_from_library(case)
     
     db.session.commit()
     
@@ -1022,4 +1259,64 @@ def reject_library_case(case_id):
     return jsonify({
         "message": "Case rejected and removed from library queue",
         "case": case.to_dict()
-    }), 200
\ No newline at end of file
+    }), 200
+
+@practice_cases.route('/library/admin/merge', methods=['POST'])
+@jwt_required()
+@handle_db_error("merge duplicate library cases")
+def merge_duplicate_library_cases():
+    """
+    Admin endpoint to merge pending near-duplicates into the library cases they
+    were flagged against: their tags are added to the library case and their
+    submissions withdrawn. Takes {"case_ids": [...]}; cases that are not
+    flagged pending duplicates are skipped.
+    """
+    user = get_current_user()
+    if not user:
+        return jsonify({"error": "User not found"}), 404
+
+    if not user.is_master:
+        return jsonify({"error": "Unauthorized - admin access required"}), 403
+
+    case_ids = (request.get_json() or {}).get("case_ids")
+    if not isinstance(case_ids, list) or not all(isinstance(case_id, int) for case_id in case_ids):
+        return jsonify({"error": "case_ids must be a list of case IDs"}), 400
+
+    flags = library_duplicates.duplicate_flags(case_ids)
+    pending = PracticeCase.query.filter(
+        PracticeCase.id.in_(list(flags)),
+        PracticeCase.submitted_to_library == True,
+        PracticeCase.library_approved == False
+    ).all() if flags else []
+    originals = {
+        original.id: original
+        for original in PracticeCase.query.filter(
+            PracticeCase.id.in_({flags[case.id][0] for case in pending}),
+            PracticeCase.library_approved == True
+        )
+    } if pending else {}
+
+    merged = []
+    for case in pending:
+        original = originals.get(flags[case.id][0])
+        if not original:
+            continue
+
+        tags = json.loads(original.library_tags) if original.library_tags else []
+        tags += json.loads(case.library_tags) if case.library_tags else []
+        original.library_tags = json.dumps(list(dict.fromkeys(tags)))
+        sync_case_tags(original, was_counted=True)
+        index_case(original)
+
+        withdraw_from_library(case)
+        merged.append({"id": case.id, "into": original.id})
+
+    if merged:
+        mark_library_changed()
+    db.session.commit()
+
+    current_app.logger.info(f"Admin user {user.id} merged {len(merged)} duplicate library submissions")
+    return jsonify({
+        "merged": merged,
+        "skipped": [case_id for case_id in case_ids if case_id not in {m["id"] for m in merged}]
+    }), 200
@@ -2,12 +2,36 @@ from flask import Blueprint, jsonify, request, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app.models import PracticeCase, Conversation, User, Enrollment, Section, db
 from app.utils.user_roles import is_user_student
+from app.utils.http_cache import etag_cached
+from sqlalchemy import case as sql_case
 from sqlalchemy.sql import func
 
 students = Blueprint("students", __name__)
 
+def student_progress_version():
+    """Version signal for /progress: the student's classes, their cases and the student's conversations."""
+    student = User.query.get(get_jwt_identity())
+    if not student:
+        return None
+
+    class_ids = sorted({e.section.class_id for e in student.enrollments if e.role == "student"})
+    cases = db.session.query(
+        func.count(PracticeCase.id), func.max(PracticeCase.updated_at)
+    ).filter(PracticeCase.class_id.in_(class_ids)).one()
+    conversations = db.session.query(
+        func.count(Conversation.id),
+        func.max(Conversation.id),
+        func.count(Conversation.end_time),
+        func.sum(Conversation.duration),
+        func.sum(sql_case((Conversation.completed == True, 1), else_=0))
+    ).filter(Conversation.user_id == student.id).one()
+
+    return class_ids, tuple(cases), tuple(conversations)
+
+
 @students.route("/progress", methods=["GET"])
 @jwt_required()
+@etag_cached(student_progress_version)
 def get_student_progress():
     """
     Retrieve the student's practice progress, with optional class filtering.
@@ -1,7 +1,11 @@
 from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from app.models import User, SystemFeedback, db
-from datetime import datetime, timezone
+from app.models import User, SystemFeedback, LLMUsage, Institution, db
+from app.services.llm_metrics import registry
+from app.services.voice_service import connection_stats
+from app.services.session_pool import session_pool
+from app.services.session_registry import registry_stats
+from datetime import datetime, timezone, date
 
 system = Blueprint('system', __name__)
 
@@ -82,3 +86,109 @@ def get_feedback():
     except Exception as e:
         current_app.logger.error(f"Error fetching feedback: {str(e)}")
         return jsonify({"error": "Failed to fetch feedback"}), 500
+
+
+
+@system.route('/metrics/llm', methods=['GET'])
+@jwt_required()
+def get_llm_metrics():
+    """Get in-process LLM call metrics for this worker (master only)."""
+    try:
+        user = db.session.get(User, get_jwt_identity())
+        if not user or not user.is_master:
+            return jsonify({"error": "Unauthorized access"}), 403
+
+        return jsonify({
+            **registry.snapshot(),
+            "voice_connections": connection_stats(),
+            "realtime_session_pool": session_pool.stats(),
+            "realtime_sessions": registry_stats(),
+        })
+
+    except Exception as e:
+        current_app.logger.error(f"Error fetching LLM metrics: {str(e)}")
+        return jsonify({"error": "Failed to fetch LLM metrics"}), 500
+
+
+@system.route('/usage', methods=['GET'])
+@jwt_required()
+def get_llm_usage():
+    """
+    Get aggregated LLM usage and cost (master only).
+
+    Query Parameters:
+    - start (optional): First day to include, ISO date (defaults to the first of this month)
+    - end (optional): Last day to include, ISO date (defaults to today)
+    - institution_id (optional): Restrict to one institution
+    - group_by (optional): Comma-separated subset of institution,route,model,day (default: institution)
+    """
+    try:
+        user = db.session.get(User, get_jwt_identity())
+        if not user or not user.is_master:
+            return jsonify({"error": "Unauthorized access"}), 403
+
+        today = datetime.now(timezone.utc).date()
+        try:
+            start = date.fromisoformat(request.args['start']) if request.args.get('start') else today.replace(day=1)
+            end = date.fromisoformat(request.args['end']) if request.args.get('end') else today
+        except ValueError:
+            return jsonify({"error": "Invalid date format. Use YYYY-MM-DD."}), 400
+
+        group_columns = {
+            "institution": LLMUsage.institution_id,
+            "route": LLMUsage.route,
+            "model": LLMUsage.model,
+            "day": LLMUsage.day,
+        }
+        group_by = [g.strip() for g in request.args.get('group_by', 'institution').split(',') if g.strip()]
+        if not group_by or any(g not in group_columns for g in group_by):
+            return jsonify({"error": f"group_by must be a subset of {', '.join(group_columns)}"}), 400
+
+        columns = [group_columns[g] for g in group_by]
+        query = db.session.query(
+            *columns,
+            db.func.sum(LLMUsage.call_count),
+            db.func.sum(LLMUsage.error_count),
+            db.func.sum(LLMUsage.prompt_tokens),
+            db.func.sum(LLMUsage.completion_tokens),
+            db.func.sum(LLMUsage.cached_tokens),
+            db.func.sum(LLMUsage.total_latency_ms),
+            db.func.sum(LLMUsage.cost_usd),
+        ).filter(LLMUsage.day >= start, LLMUsage.day <= end)
+
+        institution_id = request.args.get('institution_id', type=int)
+        if institution_id:
+            query = query.filter(LLMUsage.institution_id == institution_id)
+
+        rows = query.group_by(*columns).order_by(*columns).all()
+        institution_names = dict(db.session.query(Institution.id, Institution.name).all()) if "institution" in group_by else {}
+
+        usage = []
+        for row in rows:
+            keys = dict(zip(group_by, row[:len(group_by)]))
+            calls, errors, prompt_tokens, completion_tokens, cached_tokens, latency_ms, cost = row[len(group_by):]
+            if "day" in keys:
+                keys["day"] = keys["day"].isoformat()
+            if "institution" in keys:
+                keys["institution_name"] = institution_names.get(keys["institution"])
+            usage.append({
+                **keys,
+                "call_count": int(calls or 0),
+                "error_count": int(errors or 0),
+                "prompt_tokens": int(prompt_tokens or 0),
+                "completion_tokens": int(completion_tokens or 0),
+                "cached_tokens": int(cached_tokens or 0),
+                "average_latency_ms": (latency_ms / calls) if calls else None,
+                "cost_usd": round(float(cost or 0), 4),
+            })
+
+        return jsonify({
+            "start": start.isoformat(),
+            "end": end.isoformat(),
+            "group_by": group_by,
+            "usage": usage,
+        })
+
+    except Exception as e:
+        current_app.logger.error(f"Error fetching LLM usage: {str(e)}")
+        return jsonify({"error": "Failed to fetch LLM usage"}), 500
@@ -0,0 +1,198 @@
+# app/services/audio_cache.py
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+import boto3
+from botocore.exceptions import ClientError
+from flask import current_app
+
+from app.services.llm_metrics import registry
+from app.services.voice_service import PREVIEW_MODEL, PREVIEW_FORMAT, get_voice_service
+
+# S3 objects are re-stamped on a hit at most this often, to keep LRU order without a write per hit
+S3_TOUCH_INTERVAL = timedelta(days=1)
+
+
+def audio_cache_key(model, voice, text, audio_format):
+    """Content address of a rendered clip: a hash of everything that determines its bytes."""
+    payload = json.dumps([model, voice, text, audio_format], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class DiskAudioCache:
+    """
+    Audio files on local disk, named by their key. A file's mtime is bumped on
+    every hit, so evicting the oldest mtimes first gives LRU order.
+    """
+
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.audio")
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return data
+
+    def put(self, key, data):
+        # Write to a temp file and rename so readers never see a partial clip
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, self._path(key))
+        self._evict()
+
+    def _evict(self):
+        with self._lock:
+            entries = []
+            for name in os.listdir(self.directory):
+                if not name.endswith(".audio"):
+                    continue
+                try:
+                    stat = os.stat(os.path.join(self.directory, name))
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, name))
+
+            total = sum(size for _, size, _ in entries)
+            for _, size, name in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                    total -= size
+                    registry.increment("voice_preview_cache_evictions_total")
+                except FileNotFoundError:
+                    pass
+
+
+class S3AudioCache:
+    """
+    Audio objects in S3 under a prefix, named by their key. Hits re-stamp the
+    object's LastModified (at most daily), and eviction deletes the oldest
+    objects once the prefix exceeds max_bytes.
+    """
+
+    def __init__(self, bucket, prefix, max_bytes):
+        self.bucket = bucket
+        self.prefix = prefix.rstrip("/") + "/"
+        self.max_bytes = max_bytes
+        self.client = boto3.client(
+            "s3",
+            aws_access_key_id=os.getenv("AWS_ACCESS_KEY_ID"),
+            aws_secret_access_key=os.getenv("AWS_SECRET_ACCESS_KEY"),
+            region_name=os.getenv("AWS_REGION", "us-east-1"),
+        )
+
+    def _object_key(self, key):
+        return f"{self.prefix}{key}"
+
+    def get(self, key):
+        try:
+            response = self.client.get_object(Bucket=self.bucket, Key=self._object_key(key))
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("NoSuchKey", "404"):
+                return None
+            raise
+        data = response["Body"].read()
+        if datetime.now(timezone.utc) - response["LastModified"] > S3_TOUCH_INTERVAL:
+            self.client.copy_object(
+                Bucket=self.bucket,
+                Key=self._object_key(key),
+                CopySource={"Bucket": self.bucket, "Key": self._object_key(key)},
+                MetadataDirective="REPLACE",
+                ContentType=response.get("ContentType", "application/octet-stream"),
+            )
+        return data
+
+    def put(self, key, data):
+        self.client.put_object(Bucket=self.bucket, Key=self._object_key(key), Body=data, ContentType="audio/mpeg")
+        self._evict()
+
+    def _evict(self):
+        objects = []
+        paginator = self.client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=self.prefix):
+            objects.extend(page.get("Contents", []))
+
+        total = sum(obj["Size"] for obj in objects)
+        for obj in sorted(objects, key=lambda o: o["LastModified"]):
+            if total <= self.max_bytes:
+                break
+            self.client.delete_object(Bucket=self.bucket, Key=obj["Key"])
+            total -= obj["Size"]
+            registry.increment("voice_preview_cache_evictions_total")
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_audio_cache():
+    """The configured preview cache backend (VOICE_PREVIEW_CACHE_BACKEND: disk or s3)."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            config = current_app.config
+            max_bytes = config.get("VOICE_PREVIEW_CACHE_MAX_BYTES", 50 * 1024 * 1024)
+            if config.get("VOICE_PREVIEW_CACHE_BACKEND") == "s3":
+                _cache = S3AudioCache(os.getenv("AWS_S3_BUCKET_NAME"), "voice-previews", max_bytes)
+            else:
+                directory = config.get("VOICE_PREVIEW_CACHE_DIR") or os.path.join(current_app.instance_path, "voice_previews")
+                _cache = DiskAudioCache(directory, max_bytes)
+        return _cache
+
+
+def preview_cache_key(voice, text):
+    return audio_cache_key(PREVIEW_MODEL, voice, text, PREVIEW_FORMAT)
+
+
+def get_or_render_preview(voice, text, force=False):
+    """
+    Return (key, audio) for a voice preview, rendering and storing it on a miss.
+    audio is None if rendering failed. Cache errors never block a preview.
+    """
+    key = preview_cache_key(voice, text)
+    cache = get_audio_cache()
+
+    if not force:
+        try:
+            audio = cache.get(key)
+        except Exception as e:
+            current_app.logger.warning(f"Voice preview cache read failed: {e}")
+            audio = None
+        if audio is not None:
+            registry.increment("voice_preview_cache_requests_total", result="hit")
+            return key, audio
+
+    registry.increment("voice_preview_cache_requests_total", result="miss")
+    started = time.perf_counter()
+    audio = get_voice_service().generate_preview(voice, text)
+    if audio is None:
+        return key, None
+    current_app.logger.info(f"Rendered voice preview {voice} in {time.perf_counter() - started:.2f}s")
+
+    try:
+        cache.put(key, audio)
+    except Exception as e:
+        current_app.logger.warning(f"Voice preview cache write failed: {e}")
+    return key, audio
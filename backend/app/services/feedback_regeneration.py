@@ -0,0 +1,271 @@
+# app/services/feedback_regeneration.py
+
+import asyncio
+import json
+import os
+import random
+from datetime import datetime, timezone
+from itertools import islice
+
+from flask import current_app
+from openai import AsyncOpenAI
+from sqlalchemy import exists
+from sqlalchemy.orm import Session, joinedload, selectinload
+
+from app.models import db, Conversation, PracticeCase, FeedbackConversation
+from app.services.feedback_service import (
+    FEEDBACK_MODEL,
+    build_feedback_messages,
+    parse_feedback_response,
+    generate_text_summary_from_json,
+)
+from app.services.llm_metrics import track_llm_call, flush_usage
+
+
+class RetryBudget:
+    """Run-wide cap on retries so a provider outage cannot turn into an unbounded retry storm."""
+
+    def __init__(self, total: int):
+        self.remaining = total
+
+    def take(self) -> bool:
+        if self.remaining <= 0:
+            return False
+        self.remaining -= 1
+        return True
+
+
+class FeedbackRegenerator:
+    """
+    Re-runs feedback generation over historical conversations and stores the
+    results as new FeedbackConversation rows tagged with a feedback_version.
+
+    Conversations are streamed from the database with yield_per and processed in
+    chunks: each chunk is sent to the model concurrently (bounded by a semaphore)
+    and written in its own transaction, so an interrupted run can be resumed by
+    skipping conversations that already have a row for the version.
+    """
+
+    def __init__(self, feedback_version: str, model: str = FEEDBACK_MODEL, concurrency: int = 8,
+                 max_attempts: int = 3, retry_budget: int = 100, chunk_size: int = 100):
+        self.feedback_version = feedback_version
+        self.model = model
+        self.concurrency = max(1, concurrency)
+        self.max_attempts = max(1, max_attempts)
+        self.retry_budget = RetryBudget(retry_budget)
+        self.chunk_size = max(1, chunk_size)
+        self.stats = {"generated": 0, "fallback": 0, "failed": 0, "skipped": 0}
+
+    @property
+    def version_labels(self):
+        """All feedback_version values a run with this version can write."""
+        return [self.feedback_version, f"{self.feedback_version}_extracted", f"{self.feedback_version}_fallback"]
+
+    def select_conversations(self, class_id=None, case_id=None, since=None, until=None, resume=True, limit=None):
+        """Stream completed conversations matching the filters, oldest first."""
+        query = Conversation.query.join(PracticeCase).filter(
+            Conversation.completed == True,
+            PracticeCase.feedback_prompt.isnot(None),
+            PracticeCase.feedback_prompt != ""
+        )
+
+        if class_id:
+            query = query.filter(PracticeCase.class_id == class_id)
+        if case_id:
+            query = query.filter(Conversation.practice_case_id == case_id)
+        if since:
+            query = query.filter(Conversation.start_time >= since)
+        if until:
+            query = query.filter(Conversation.start_time < until)
+        if resume:
+            query = query.filter(~exists().where(
+                FeedbackConversation.original_conversation_id == Conversation.id,
+                FeedbackConversation.feedback_version.in_(self.version_labels)
+            ))
+
+        query = query.options(
+            joinedload(Conversation.practice_case),
+            selectinload(Conversation.messages)
+        ).order_by(Conversation.id.asc())
+
+        if limit:
+            query = query.limit(limit)
+
+        return query.yield_per(self.chunk_size)
+
+    def iter_requests(self, conversations):
+        """Turn conversations into provider-neutral chat completion requests."""
+        for conversation in conversations:
+            compiled_messages = conversation.get_messages_history()
+            if not compiled_messages:
+                self.stats["skipped"] += 1
+                continue
+
+            yield {
+                "custom_id": f"conversation-{conversation.id}",
+                "conversation_id": conversation.id,
+                "user_id": conversation.user_id,
+                "messages": build_feedback_messages(conversation.practice_case, compiled_messages),
+            }
+
+    # ------------------------------------------------------------------
+    # Online mode
+    # ------------------------------------------------------------------
+
+    def run(self, conversations):
+        """Generate and store feedback for the given conversations, chunk by chunk."""
+        requests_iter = self.iter_requests(conversations)
+        while True:
+            chunk = list(islice(requests_iter, self.chunk_size))
+            if not chunk:
+                break
+
+            results = asyncio.run(self._generate_chunk(chunk))
+            self.write_results(
+                (item["conversation_id"], item["user_id"], content)
+                for item, content in results
+                if content is not None
+            )
+            current_app.logger.info(f"🔁 Regenerated feedback chunk ending at conversation {chunk[-1]['conversation_id']}: {self.stats}")
+
+        flush_usage()
+        return self.stats
+
+    async def _generate_chunk(self, chunk):
+        api_key = os.getenv("OPENAI_API_KEY")
+        client = AsyncOpenAI(api_key=api_key, max_retries=0)
+        semaphore = asyncio.Semaphore(self.concurrency)
+        try:
+            return await asyncio.gather(*[self._generate_one(client, semaphore, item) for item in chunk])
+        finally:
+            await client.close()
+
+    async def _generate_one(self, client, semaphore, item):
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                async with semaphore:
+                    with track_llm_call("feedback_regeneration", self.model) as llm_call:
+                        response = await client.chat.completions.create(model=self.model, messages=item["messages"])
+                        llm_call.record_usage(response)
+                return item, response.choices[0].message.content
+            except Exception as e:
+                if attempt >= self.max_attempts or not self.retry_budget.take():
+                    current_app.logger.error(f"❌ Feedback regeneration failed for conversation {item['conversation_id']}: {str(e)}")
+                    self.stats["failed"] += 1
+                    return item, None
+                await asyncio.sleep(min(30, 2 ** attempt) * random.uniform(0.5, 1.0))
+
+    def write_results(self, results):
+        """
+        Store (conversation_id, user_id, raw_response) results as versioned
+        FeedbackConversation rows. Uses its own session so writes never disturb
+        the streaming read cursor.
+        """
+        with Session(db.engine) as writer:
+            for conversation_id, user_id, raw_text in results:
+                feedback_json, feedback_text, feedback_version = parse_feedback_response(
+                    raw_text, version=self.feedback_version
+                )
+
+                if feedback_json is None:
+                    summary_text = feedback_text
+                    detailed_feedback = feedback_text
+                    feedback_version = f"{self.feedback_version}_fallback"
+                    self.stats["fallback"] += 1
+                else:
+                    summary_text = generate_text_summary_from_json(feedback_json)
+                    detailed_feedback = json.dumps(feedback_json)
+                    self.stats["generated"] += 1
+
+                writer.add(FeedbackConversation(
+                    original_conversation_id=conversation_id,
+                    user_id=user_id,
+                    summary_feedback=summary_text,
+                    detailed_feedback=detailed_feedback,
+                    start_time=datetime.now(timezone.utc),
+                    model=self.model,
+                    feedback_version=feedback_version
+                ))
+            writer.commit()
+
+    # ------------------------------------------------------------------
+    # Batch mode
+    # ------------------------------------------------------------------
+
+    def export_batch(self, conversations, path):
+        """
+        Write one JSONL request per conversation. The request bodies are plain chat
+        completion payloads, so the file can be submitted to any batch API that
+        accepts them (the method/url fields match the OpenAI Batch API).
+        """
+        count = 0
+        with open(path, "w", encoding="utf-8") as f:
+            for item in self.iter_requests(conversations):
+                f.write(json.dumps({
+                    "custom_id": item["custom_id"],
+                    "method": "POST",
+                    "url": "/v1/chat/completions",
+                    "body": {"model": self.model, "messages": item["messages"]},
+                }) + "\n")
+                count += 1
+        return count
+
+    def import_batch(self, path, resume=True):
+        """
+        Read a JSONL results file and store the feedback. Each line needs a
+        custom_id and either a top-level "content" or an OpenAI-style
+        response.body.choices[0].message.content.
+        """
+        with open(path, "r", encoding="utf-8") as f:
+            while True:
+                lines = [line for line in islice(f, self.chunk_size) if line.strip()]
+                if not lines:
+                    break
+
+                contents = {}
+                for line in lines:
+                    conversation_id, content = self._parse_result_line(json.loads(line))
+                    if conversation_id is None or content is None:
+                        self.stats["failed"] += 1
+                        continue
+                    contents[conversation_id] = content
+
+                owners = dict(
+                    db.session.query(Conversation.id, Conversation.user_id)
+                    .filter(Conversation.id.in_(contents.keys()))
+                    .all()
+                )
+                if resume and owners:
+                    done = {
+                        row[0] for row in db.session.query(FeedbackConversation.original_conversation_id).filter(
+                            FeedbackConversation.original_conversation_id.in_(owners.keys()),
+                            FeedbackConversation.feedback_version.in_(self.version_labels)
+                        )
+                    }
+                    self.stats["skipped"] += len(done)
+                    owners = {cid: uid for cid, uid in owners.items() if cid not in done}
+
+                self.write_results(
+                    (conversation_id, user_id, contents[conversation_id])
+                    for conversation_id, user_id in owners.items()
+                )
+
+        return self.stats
+
+    @staticmethod
+    def _parse_result_line(result):
+        custom_id = result.get("custom_id", "")
+        if not custom_id.startswith("conversation-"):
+            return None, None
+        conversation_id = int(custom_id.split("-", 1)[1])
+
+        if result.get("content") is not None:
+            return conversation_id, result["content"]
+
+        try:
+            body = result["response"]["body"]
+            return conversation_id, body["choices"][0]["message"]["content"]
+        except (KeyError, IndexError, TypeError):
+            return conversation_id, None
@@ -0,0 +1,174 @@
+# app/services/feedback_service.py
+
+import json
+import re
+from flask import current_app
+
+# Default model for offline feedback regeneration (live calls are routed by
+# app.services.model_router) and the version recorded on FeedbackConversation rows
+FEEDBACK_MODEL = "gpt-4o"
+FEEDBACK_VERSION = "json_v1"
+
+
+def build_feedback_prompt(practice_case) -> str:
+    """Build the system prompt asking for structured JSON feedback for a practice case."""
+    feedback_prompt = practice_case.feedback_prompt
+
+    # Create enhanced prompt for structured JSON feedback
+    json_feedback_prompt = f"""
+            {feedback_prompt}
+            
+            CRITICAL INSTRUCTIONS FOR RESPONSE FORMAT:
+            You must respond with ONLY a valid JSON object. No explanatory text, no markdown formatting, no backticks - just pure JSON.
+
+            IMPORTANT PEDAGOGICAL REQUIREMENTS:
+            1. **LANGUAGE**: Provide ALL feedback in English only, regardless of the target language being practiced. This reduces cognitive load for language learners.
+            
+            2. **PROFICIENCY-LEVEL AWARENESS**: The student's proficiency level is: {practice_case.proficiency_level}
+               - Tailor your feedback complexity and expectations to this proficiency level
+               - For beginners: Focus on basic communication success, simple corrections
+               - For intermediate: Balance communication effectiveness with accuracy improvements  
+               - For advanced: Include more nuanced feedback on style, register, and cultural appropriateness
+               - Always reference this proficiency level when setting expectations
+            
+            3. **PRAGMATIC FOCUS**: Prioritize communication effectiveness over linguistic perfection
+               - Emphasize whether the student successfully conveyed their intended meaning
+               - Focus on communication breakdowns only when they actually impeded understanding
+               - Celebrate successful meaning-making even if grammar/vocabulary isn't perfect
+               - Remember: comprehensibility and communicative competence come before accuracy
+
+            4. **STUDENT-FOCUSED LANGUAGE**: Address the student directly using "you" and "your" throughout, not "the student" or "they"
+
+            Use this EXACT structure:
+            {{
+                "summary": {{
+                    "strengths": ["2-3 overall communication successes from your conversation"],
+                    "areas_for_improvement": ["2-3 pragmatic areas for you to focus on next"]
+                }},
+                "detailed_feedback": {{
+                    "sections": [
+                        {{
+                            "area": "Area Name (exactly as specified in the 'Areas to evaluate' feedback areas above)",
+                            "strengths": ["specific communicative successes with examples from your conversation", "another success that helped you get your message across"],
+                            "areas_for_improvement": ["pragmatic improvement areas appropriate for {practice_case.proficiency_level} level", "communication aspects to work on"],
+                            "tips": ["actionable suggestions appropriate for your proficiency level", "practical communication strategies for you"]
+                        }}
+                    ]
+                }},
+                "encouragement": "A brief, motivational closing message directly to you about your communication progress"
+            }}
+
+            IMPORTANT RULES:
+            1. Create a detailed_feedback section for EACH feedback area mentioned above that applies to this conversation
+            2. Each section must have the exact area name as specified in the instructions above
+            3. Include 2-3 items in each array (strengths, areas_for_improvement, tips)
+            4. Reference specific examples from the conversation transcript when possible
+            5. If an area doesn't apply to this conversation, skip that section entirely
+            6. Your response must be valid JSON that can be parsed by json.loads()
+            7. ALL feedback must be in English only
+            8. Adjust feedback complexity and expectations to match the {practice_case.proficiency_level} proficiency level
+            9. Focus on pragmatic communication success over linguistic perfection
+            10. Be encouraging and constructive - highlight communicative achievements
+
+            DO NOT include any text outside the JSON structure. Start your response with {{ and end with }}.
+            """
+    return json_feedback_prompt
+
+
+def build_feedback_messages(practice_case, compiled_messages) -> list:
+    """Build the chat completion messages for generating feedback on a transcript."""
+    return [
+        {"role": "system", "content": build_feedback_prompt(practice_case)},
+        {"role": "user", "content": "\n".join([f"{msg['role']}: {msg['content']}" for msg in compiled_messages])},
+    ]
+
+
+def clean_feedback_text(feedback_text: str) -> str:
+    """Strip markdown fences and repair common formatting problems in a raw feedback response."""
+    feedback_text = feedback_text.strip()
+
+    # Clean up any potential markdown formatting
+    if feedback_text.startswith("```json"):
+        feedback_text = feedback_text.replace("```json", "").replace("```", "").strip()
+    elif feedback_text.startswith("```"):
+        feedback_text = feedback_text.replace("```", "").strip()
+    
+    # Fix common JSON formatting issues
+    feedback_text = feedback_text.replace("areas*for*improvement", "areas_for_improvement")
+    feedback_text = feedback_text.replace("*", "_")  # Replace any remaining asterisks with underscores
+    
+    # Ensure proper JSON closure if missing
+    if not feedback_text.endswith('}'):
+        # Count opening and closing braces to determine what's missing
+        open_braces = feedback_text.count('{')
+        close_braces = feedback_text.count('}')
+        missing_braces = open_braces - close_braces
+        feedback_text += '}' * missing_braces
+
+    return feedback_text
+
+
+def parse_feedback_response(raw_text: str, version: str = FEEDBACK_VERSION):
+    """
+    Parse a raw feedback response.
+
+    Returns a tuple of (feedback_json, feedback_text, feedback_version). feedback_json
+    is None when no JSON could be recovered; feedback_text is then the cleaned text
+    to store in fallback mode.
+    """
+    feedback_text = clean_feedback_text(raw_text)
+    current_app.logger.info(f"🧹 Cleaned feedback text: {feedback_text[:200]}...")
+
+    try:
+        feedback_json = json.loads(feedback_text)
+        current_app.logger.info(f"✅ Successfully parsed JSON feedback")
+        current_app.logger.info(f"📊 JSON structure: summary={bool(feedback_json.get('summary'))}, sections={len(feedback_json.get('detailed_feedback', {}).get('sections', []))}")
+        return feedback_json, feedback_text, version
+    except json.JSONDecodeError as json_error:
+        current_app.logger.error(f"❌ Failed to parse JSON feedback: {str(json_error)}")
+        current_app.logger.error(f"🔍 Problematic text: {feedback_text}")
+
+    # Try to extract JSON from within the text if it's embedded
+    json_match = re.search(r'\{.*\}', feedback_text, re.DOTALL)
+    if json_match:
+        try:
+            current_app.logger.info(f"🔧 Attempting to parse extracted JSON...")
+            feedback_json = json.loads(json_match.group(0))
+            current_app.logger.info(f"✅ Successfully parsed extracted JSON")
+            return feedback_json, feedback_text, f"{version}_extracted"
+        except json.JSONDecodeError:
+            current_app.logger.error(f"❌ Even extracted JSON failed to parse")
+
+    return None, feedback_text, None
+
+
+def generate_text_summary_from_json(feedback_json):
+    """
+    Convert structured JSON feedback to a readable text summary for backward compatibility.
+    """
+    try:
+        summary_parts = []
+        
+        # Add strengths
+        if feedback_json.get("summary", {}).get("strengths"):
+            summary_parts.append("**Strengths:**")
+            for strength in feedback_json["summary"]["strengths"]:
+                summary_parts.append(f"• {strength}")
+            summary_parts.append("")
+        
+        # Add areas for improvement
+        if feedback_json.get("summary", {}).get("areas_for_improvement"):
+            summary_parts.append("**Areas for Improvement:**")
+            for area in feedback_json["summary"]["areas_for_improvement"]:
+                summary_parts.append(f"• {area}")
+            summary_parts.append("")
+        
+        # Add encouragement
+        if feedback_json.get("encouragement"):
+            summary_parts.append(feedback_json["encouragement"])
+        
+        return "\n".join(summary_parts)
+        
+    except Exception as e:
+        current_app.logger.error(f"Error generating text summary: {str(e)}")
+        return "Feedback generated successfully."
@@ -0,0 +1,79 @@
+# app/services/image_derivatives.py
+
+"""
+Responsive derivatives of case images.
+
+Every generated image is also encoded at DERIVATIVE_WIDTHS in WebP and, when
+this Pillow build can write it, AVIF, plus a tiny blurred WebP placeholder
+that is inlined as a data URI. ImageService stores everything under keys
+derived from the source image's content hash, so objects never change once
+written and are served with an immutable Cache-Control.
+"""
+
+import base64
+import hashlib
+import io
+
+from PIL import Image, ImageFilter, features
+
+DERIVATIVE_WIDTHS = (320, 640, 1024)
+PLACEHOLDER_WIDTH = 16
+
+# format -> (file extension, MIME type, Pillow save options)
+FORMATS = {
+    "avif": ("avif", "image/avif", {"quality": 50, "speed": 6}),
+    "webp": ("webp", "image/webp", {"quality": 80, "method": 4}),
+}
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+def content_hash(image_data: bytes) -> str:
+    """SHA-256 of an image's bytes; the key under which it and its derivatives are stored."""
+    return hashlib.sha256(image_data).hexdigest()
+
+
+def available_formats():
+    """Derivative formats this Pillow build can encode, smallest first."""
+    return [name for name in FORMATS if name == "webp" or features.check("avif")]
+
+
+def _resized(image, width):
+    if image.width <= width:
+        return image
+    return image.resize((width, round(image.height * width / image.width)), Image.LANCZOS)
+
+
+def _encode(image, format_name):
+    buffer = io.BytesIO()
+    image.save(buffer, format=format_name.upper(), **FORMATS[format_name][2])
+    return buffer.getvalue()
+
+
+def build_derivatives(image_data: bytes):
+    """
+    Encode an image's derivatives. Returns (derivatives, placeholder):
+    derivatives is a list of {"width", "format", "content_type", "extension",
+    "data"}, and placeholder a base64 data URI of a blurred thumbnail.
+    Widths above the source's own width are skipped.
+    """
+    with Image.open(io.BytesIO(image_data)) as source:
+        image = source.convert("RGBA" if source.mode in ("RGBA", "LA", "P") else "RGB")
+
+    derivatives = []
+    widths = sorted({min(width, image.width) for width in DERIVATIVE_WIDTHS})
+    for width in widths:
+        resized = _resized(image, width)
+        for format_name in available_formats():
+            extension, content_type, _ = FORMATS[format_name]
+            derivatives.append({
+                "width": width,
+                "format": format_name,
+                "content_type": content_type,
+                "extension": extension,
+                "data": _encode(resized, format_name),
+            })
+
+    thumbnail = _resized(image, PLACEHOLDER_WIDTH).filter(ImageFilter.GaussianBlur(1))
+    placeholder = "data:image/webp;base64," + base64.b64encode(_encode(thumbnail, "webp")).decode()
+    return derivatives, placeholder
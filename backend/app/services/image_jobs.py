@@ -0,0 +1,164 @@
+# app/services/image_jobs.py
+
+"""
+Background jobs for case image generation.
+
+submit() records an ImageJob and hands it to a bounded thread pool, so the
+request returns at once and a 20-second image call never holds a web worker;
+clients poll GET /practice_cases/image_jobs/<id>, which reads the row. Jobs
+run ImageService.generate_and_save_image, so a case's existing image is still
+replaced rather than added to.
+
+A case has at most one active job (submitting again returns it) and a user at
+most IMAGE_JOBS_PER_USER. A job left behind by a process that died is failed
+so it stops counting against the limits: a running job STALE_JOB_SECONDS after
+it started, a queued one (which may just be waiting behind a busy pool) after
+STALE_QUEUED_JOB_SECONDS. Workers only claim queued jobs and only finish
+running ones, so a job failed as stale stays failed.
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+from flask import current_app
+from sqlalchemy.exc import IntegrityError
+
+from app.models import db, ImageJob, PracticeCase
+from app.services.image_service import ImageService, ImageGenerationError
+
+STALE_JOB_SECONDS = 600
+STALE_QUEUED_JOB_SECONDS = 3600
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+class TooManyImageJobs(Exception):
+    """The user already has IMAGE_JOBS_PER_USER image jobs queued or running."""
+    pass
+
+
+def _get_executor(app):
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=app.config.get("IMAGE_JOB_WORKERS", 4),
+                thread_name_prefix="image-jobs"
+            )
+        return _executor
+
+
+def _expire_stale(*conditions):
+    now = datetime.now(timezone.utc)
+    ImageJob.query.filter(
+        db.or_(
+            db.and_(ImageJob.status == ImageJob.RUNNING,
+                    ImageJob.started_at < now - timedelta(seconds=STALE_JOB_SECONDS)),
+            db.and_(ImageJob.status == ImageJob.QUEUED,
+                    ImageJob.created_at < now - timedelta(seconds=STALE_QUEUED_JOB_SECONDS)),
+        ),
+        db.or_(*conditions)
+    ).update({
+        ImageJob.status: ImageJob.FAILED,
+        ImageJob.error: "Image generation did not finish. Please try again.",
+        ImageJob.finished_at: now
+    }, synchronize_session=False)
+
+
+def _active_job(case_id):
+    return ImageJob.query.filter(
+        ImageJob.practice_case_id == case_id,
+        ImageJob.status.in_(ImageJob.ACTIVE_STATUSES)
+    ).first()
+
+
+def submit(case, user, include_person=False):
+    """
+    Queue image generation for a case. Returns (job, created); created is
+    False when the case already had an active job, which is returned instead.
+    Raises TooManyImageJobs if the user is at their limit. Commits.
+    """
+    _expire_stale(ImageJob.practice_case_id == case.id, ImageJob.user_id == user.id)
+
+    existing = _active_job(case.id)
+    if existing:
+        db.session.commit()
+        return existing, False
+
+    limit = current_app.config.get("IMAGE_JOBS_PER_USER", 2)
+    active = ImageJob.query.filter(
+        ImageJob.user_id == user.id,
+        ImageJob.status.in_(ImageJob.ACTIVE_STATUSES)
+    ).count()
+    if active >= limit:
+        db.session.commit()
+        raise TooManyImageJobs(f"You already have {active} images generating. Please wait for one to finish.")
+
+    job = ImageJob(practice_case_id=case.id, user_id=user.id, include_person=bool(include_person))
+    try:
+        # The partial unique index allows one active job per case
+        with db.session.begin_nested():
+            db.session.add(job)
+    except IntegrityError:
+        db.session.commit()
+        return _active_job(case.id), False
+    db.session.commit()
+
+    app = current_app._get_current_object()
+    _get_executor(app).submit(_run, app, job.id)
+    return job, True
+
+
+def _finish(job_id, status, image_id=None, error=None):
+    """Record a running job's outcome. Returns False if it was failed as stale meanwhile."""
+    finished = ImageJob.query.filter_by(id=job_id, status=ImageJob.RUNNING).update({
+        ImageJob.status: status,
+        ImageJob.image_id: image_id,
+        ImageJob.error: error,
+        ImageJob.finished_at: datetime.now(timezone.utc)
+    }, synchronize_session=False)
+    db.session.commit()
+    return bool(finished)
+
+
+def _run(app, job_id):
+    with app.app_context():
+        claimed = ImageJob.query.filter_by(id=job_id, status=ImageJob.QUEUED).update({
+            ImageJob.status: ImageJob.RUNNING,
+            ImageJob.started_at: datetime.now(timezone.utc)
+        }, synchronize_session=False)
+        db.session.commit()
+        if not claimed:
+            return
+
+        job = db.session.get(ImageJob, job_id)
+        case = db.session.get(PracticeCase, job.practice_case_id)
+        try:
+            if case is None:
+                raise ValueError("Practice case no longer exists")
+            image = ImageService.generate_and_save_image(case, include_person=job.include_person)
+            if _finish(job_id, ImageJob.SUCCEEDED, image_id=image.id):
+                current_app.logger.info(f"🖼️ Image job {job_id} finished for case {job.practice_case_id}")
+            else:
+                current_app.logger.warning(f"⚠️ Image job {job_id} finished after it was failed as stale")
+        except (ValueError, ImageGenerationError) as e:
+            db.session.rollback()
+            _finish(job_id, ImageJob.FAILED, error=str(e))
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.error(f"❌ Image job {job_id} failed: {str(e)}")
+            _finish(job_id, ImageJob.FAILED, error="An unexpected error occurred while creating the image.")
+
+
+def get_job(job_id, user):
+    """A job the user submitted (any job for masters), failing it first if it went stale; None otherwise."""
+    job = db.session.get(ImageJob, job_id)
+    if job is None or (job.user_id != user.id and not user.is_master):
+        return None
+    if job.status in ImageJob.ACTIVE_STATUSES:
+        _expire_stale(ImageJob.id == job_id)
+        db.session.commit()
+        db.session.refresh(job)
+    return job
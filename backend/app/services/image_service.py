@@ -5,13 +5,21 @@ import openai
 import base64
 import time
 import boto3
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
 from botocore.exceptions import ClientError, NoCredentialsError
 from flask import current_app
 from app.models import db, PracticeCase, PracticeCaseImage
 from app.utils.user_roles import can_user_modify_case
+from app.services.llm_metrics import track_llm_call
+from app.services.llm_transport import resilient_call, CircuitOpenError, IMAGE_POLICY
+from app.services.image_derivatives import build_derivatives, content_hash, IMMUTABLE_CACHE_CONTROL
 
-# Initialize OpenAI client
-client = openai.OpenAI()
+# Initialize OpenAI client; retries are handled by the transport policy
+client = openai.OpenAI(timeout=IMAGE_POLICY.timeout, max_retries=0)
+
+# S3 writes run in parallel when images are duplicated for copied cases or derivatives are uploaded
+COPY_CONCURRENCY = 8
 
 class ImageGenerationError(Exception):
     """Custom exception for image generation failures."""
@@ -130,8 +138,40 @@ class ImageService:
             return ImageService._construct_scene_prompt(case)
 
     @classmethod
-    def _upload_to_s3(cls, image_data: bytes, case_id: int) -> str:
-        """Upload image to S3 and return public URL."""
+    def _upload_derivatives(cls, s3_client, bucket_name: str, image_data: bytes, digest: str):
+        """
+        Encode and upload an image's responsive derivatives under its content
+        hash. Returns (variants, placeholder) for PracticeCaseImage; both are
+        empty if the image could not be encoded.
+        """
+        try:
+            derivatives, placeholder = build_derivatives(image_data)
+        except Exception as e:
+            current_app.logger.warning(f"Could not build derivatives for image {digest}: {e}")
+            return [], None
+
+        def upload(derivative):
+            key = f"practice-cases/{digest}/{derivative['width']}.{derivative['extension']}"
+            s3_client.put_object(
+                Bucket=bucket_name,
+                Key=key,
+                Body=derivative["data"],
+                ContentType=derivative["content_type"],
+                CacheControl=IMMUTABLE_CACHE_CONTROL
+            )
+            return {"url": cls._public_url(bucket_name, key), "width": derivative["width"], "format": derivative["format"]}
+
+        with ThreadPoolExecutor(max_workers=COPY_CONCURRENCY) as executor:
+            variants = list(executor.map(upload, derivatives))
+        return variants, placeholder
+
+    @classmethod
+    def _upload_to_s3(cls, image_data: bytes, case_id: int) -> dict:
+        """
+        Upload an image and its derivatives to S3 under content-hash keys (so
+        they never change and can be cached as immutable). Returns the
+        PracticeCaseImage fields describing them.
+        """
         try:
             s3_client = cls._get_s3_client()
             bucket_name = os.getenv('AWS_S3_BUCKET_NAME')
@@ -139,11 +179,11 @@ class ImageService:
             if not bucket_name:
                 raise ValueError("AWS_S3_BUCKET_NAME environment variable not set")
             
-            # Create unique filename
-            timestamp = int(time.time())
-            filename = f"practice-cases/case_{case_id}_{timestamp}.png"
+            # Content-addressed filename
+            digest = content_hash(image_data)
+            filename = f"practice-cases/{digest}.png"
             
-            current_app.logger.info(f"Uploading image to S3: {bucket_name}/{filename}")
+            current_app.logger.info(f"Uploading image for case {case_id} to S3: {bucket_name}/{filename}")
             
             # Upload to S3 (removed ACL since bucket doesn't support it)
             s3_client.put_object(
@@ -151,15 +191,14 @@ class ImageService:
                 Key=filename,
                 Body=image_data,
                 ContentType='image/png',
-                CacheControl='max-age=31536000'  # Cache for 1 year
+                CacheControl=IMMUTABLE_CACHE_CONTROL
             )
             
-            # Generate public URL with correct region
-            region = os.getenv('AWS_REGION', 'us-east-2')  # Default to us-east-2
-            public_url = f"https://{bucket_name}.s3.{region}.amazonaws.com/{filename}"
+            public_url = cls._public_url(bucket_name, filename)
+            variants, placeholder = cls._upload_derivatives(s3_client, bucket_name, image_data, digest)
             
-            current_app.logger.info(f"Successfully uploaded image to S3: {public_url}")
-            return public_url
+            current_app.logger.info(f"Successfully uploaded image to S3: {public_url} ({len(variants)} derivatives)")
+            return {"image_url": public_url, "content_hash": digest, "variants": variants, "placeholder": placeholder}
             
         except ClientError as e:
             error_code = e.response['Error']['Code']
@@ -175,6 +214,19 @@ class ImageService:
             current_app.logger.error(f"Unexpected error uploading to S3: {e}")
             raise ImageGenerationError("Failed to upload image to cloud storage") from e
 
+    @staticmethod
+    def _public_url(bucket_name: str, key: str) -> str:
+        """Public URL of an object in the images bucket."""
+        region = os.getenv('AWS_REGION', 'us-east-2')  # Default to us-east-2
+        return f"https://{bucket_name}.s3.{region}.amazonaws.com/{key}"
+
+    @staticmethod
+    def _s3_key(image_url: str):
+        """Object key of an S3 image URL, or None if the URL is not an S3 one."""
+        if '.amazonaws.com/' in image_url:
+            return image_url.split('.amazonaws.com/')[-1]
+        return None
+
     @classmethod
     def _delete_from_s3(cls, image_url: str) -> None:
         """Helper method to delete an image from S3."""
@@ -183,9 +235,8 @@ class ImageService:
             bucket_name = os.getenv('AWS_S3_BUCKET_NAME')
             
             # Extract key from URL
-            if '.amazonaws.com/' in image_url:
-                key = image_url.split('.amazonaws.com/')[-1]
-                
+            key = cls._s3_key(image_url)
+            if key:
                 current_app.logger.info(f"Deleting S3 object: {bucket_name}/{key}")
                 s3_client.delete_object(Bucket=bucket_name, Key=key)
                 current_app.logger.info(f"Successfully deleted image from S3: {key}")
@@ -196,6 +247,17 @@ class ImageService:
             current_app.logger.error(f"Failed to delete image from S3 {image_url}: {e}")
             # Don't raise exception - continue with the operation even if S3 deletion fails
 
+    @classmethod
+    def _release_objects(cls, image_url: str, digest, variants) -> None:
+        """
+        Delete an image's S3 objects after its row was replaced or removed,
+        keeping any still used by another row (copied cases share derivatives).
+        """
+        if not PracticeCaseImage.query.filter_by(image_url=image_url).first():
+            cls._delete_from_s3(image_url)
+        if variants and not (digest and PracticeCaseImage.query.filter_by(content_hash=digest).first()):
+            cls.delete_objects([key for key in (cls._s3_key(variant["url"]) for variant in variants) if key])
+
     @classmethod
     def generate_and_save_image(cls, case: PracticeCase, include_person: bool = False) -> PracticeCaseImage:
         """Generate image using base64 response format and upload to S3. Replaces existing image if one exists."""
@@ -205,60 +267,164 @@ class ImageService:
             current_app.logger.info(f"Generating {'character' if include_person else 'scene'} image for case {case.id} using base64 format")
             current_app.logger.debug(f"Generated prompt: {prompt[:200]}...")  # Log first 200 chars of prompt
             
-            # Check if there's already an image for this case
-            existing_image = PracticeCaseImage.query.filter_by(practice_case_id=case.id).first()
-            if existing_image:
-                current_app.logger.info(f"Found existing image {existing_image.id} for case {case.id}, will replace it")
-            
             # Generate image with base64 response
-            response = client.images.generate(
-                model="gpt-image-1",
-                prompt=prompt,
-                size="1024x1024",
-            )
+            with track_llm_call("image_generation", "gpt-image-1", practice_case=case) as llm_call:
+                response = resilient_call("images.generate", lambda: client.images.generate(
+                    model="gpt-image-1",
+                    prompt=prompt,
+                    size="1024x1024",
+                ), IMAGE_POLICY)
+                llm_call.record_usage(response)
+
+            return cls._store_image(case, prompt, response)
+
+        except Exception as e:
+            raise cls._generation_error(e) from e
+
+    @classmethod
+    def _store_image(cls, case: PracticeCase, prompt: str, response) -> PracticeCaseImage:
+        """Upload a generated image to S3 and record it, replacing the case's existing image."""
+        # Get base64 data and decode
+        image_b64 = response.data[0].b64_json
+        image_data = base64.b64decode(image_b64)
+        current_app.logger.info("Successfully received base64 image data from OpenAI")
+
+        # Check if there's already an image for this case
+        existing_image = PracticeCaseImage.query.filter_by(practice_case_id=case.id).first()
+        if existing_image:
+            current_app.logger.info(f"Found existing image {existing_image.id} for case {case.id}, will replace it")
+
+        # Upload new image (and its derivatives) to S3
+        uploaded = cls._upload_to_s3(image_data, case.id)
+
+        if existing_image:
+            old_objects = (existing_image.image_url, existing_image.content_hash, existing_image.variants)
+
+            # Update existing record
+            for name, value in uploaded.items():
+                setattr(existing_image, name, value)
+            existing_image.prompt_text = prompt
+            db.session.commit()
+
+            # Delete the old image's objects now that nothing points at them
+            cls._release_objects(*old_objects)
             
-            # Get base64 data and decode
-            image_b64 = response.data[0].b64_json
-            image_data = base64.b64decode(image_b64)
-            current_app.logger.info("Successfully received base64 image data from OpenAI")
+            current_app.logger.info(f"Successfully updated existing image record with ID: {existing_image.id}")
+            return existing_image
+        else:
+            # Create new database record
+            new_image = PracticeCaseImage(
+                practice_case_id=case.id,
+                prompt_text=prompt,
+                **uploaded
+            )
+            db.session.add(new_image)
+            db.session.commit()
             
-            # Upload new image to S3
-            public_url = cls._upload_to_s3(image_data, case.id)
+            current_app.logger.info(f"Successfully created new image record with ID: {new_image.id}")
+            return new_image
 
-            if existing_image:
-                # Delete old image from S3 before updating the record
-                cls._delete_from_s3(existing_image.image_url)
-                
-                # Update existing record
-                existing_image.image_url = public_url
-                existing_image.prompt_text = prompt
-                db.session.commit()
-                
-                current_app.logger.info(f"Successfully updated existing image record with ID: {existing_image.id}")
-                return existing_image
-            else:
-                # Create new database record
-                new_image = PracticeCaseImage(
-                    practice_case_id=case.id,
-                    image_url=public_url,
-                    prompt_text=prompt
-                )
-                db.session.add(new_image)
-                db.session.commit()
-                
-                current_app.logger.info(f"Successfully created new image record with ID: {new_image.id}")
-                return new_image
-            
-        except openai.APIError as e:
+    @staticmethod
+    def _generation_error(e: Exception) -> ImageGenerationError:
+        """Map a failure while generating or storing an image to the error shown to the user."""
+        if isinstance(e, CircuitOpenError):
+            current_app.logger.warning(f"Image generation skipped: {e}")
+            return ImageGenerationError("The image provider is temporarily unavailable. Please try again shortly.")
+        if isinstance(e, openai.APIError):
             current_app.logger.error(f"OpenAI API error during image generation: {e}")
             error_message = "Unknown error"
             if hasattr(e, 'body') and e.body:
                 error_message = e.body.get('message', 'Unknown error')
-            raise ImageGenerationError(f"The image provider returned an error: {error_message}") from e
+            return ImageGenerationError(f"The image provider returned an error: {error_message}")
+        current_app.logger.error(f"An unexpected error occurred in image generation: {e}")
+        db.session.rollback()
+        return ImageGenerationError("An unexpected error occurred while creating the image.")
+
+    @classmethod
+    def copy_images(cls, images_by_case: dict):
+        """
+        Duplicate existing images for newly copied cases with server-side S3
+        copies: nothing is downloaded, re-uploaded or generated. images_by_case
+        maps a new case id to the images to copy for it. Returns (rows, keys):
+        practice_case_images rows to insert, in source order and keeping the
+        sources' created_at so each copy's latest image is the source's latest,
+        and the keys of the objects
+        created (for delete_objects if the insert fails). If any copy fails the
+        others are removed and ImageGenerationError is raised.
+        """
+        jobs = [(case_id, n, image) for case_id, images in images_by_case.items() for n, image in enumerate(images)]
+        if not jobs:
+            return [], []
+
+        s3_client = bucket_name = None
+        if any(cls._s3_key(image.image_url) for _, _, image in jobs):
+            s3_client = cls._get_s3_client()
+            bucket_name = os.getenv('AWS_S3_BUCKET_NAME')
+            if not bucket_name:
+                raise ImageGenerationError("Cloud storage bucket not configured")
+        timestamp = int(time.time())
+        now = datetime.now(timezone.utc)
+
+        def copy(case_id, n, image):
+            # Derivatives are content-addressed and immutable, so copies share them
+            row = {
+                "practice_case_id": case_id,
+                "image_url": image.image_url,
+                "prompt_text": image.prompt_text,
+                "content_hash": image.content_hash,
+                "variants": image.variants,
+                "placeholder": image.placeholder,
+                "created_at": image.created_at or now,
+            }
+            source_key = cls._s3_key(image.image_url)
+            if source_key is None:
+                # Not an object we store, so the copy can share the URL
+                return row, None
+            key = f"practice-cases/case_{case_id}_{timestamp}_{n}.png"
+            s3_client.copy_object(
+                Bucket=bucket_name,
+                Key=key,
+                CopySource={"Bucket": bucket_name, "Key": source_key},
+                MetadataDirective='COPY'
+            )
+            return {**row, "image_url": cls._public_url(bucket_name, key)}, key
+
+        rows, keys, failures = [], [], []
+        with ThreadPoolExecutor(max_workers=min(COPY_CONCURRENCY, len(jobs))) as executor:
+            futures = [executor.submit(copy, *job) for job in jobs]
+            for future in futures:
+                try:
+                    row, key = future.result()
+                except Exception as e:
+                    failures.append(e)
+                    continue
+                rows.append(row)
+                if key:
+                    keys.append(key)
+
+        if failures:
+            current_app.logger.error(f"Failed to copy {len(failures)} of {len(jobs)} images in S3: {failures[0]}")
+            cls.delete_objects(keys)
+            raise ImageGenerationError("Failed to copy images in cloud storage") from failures[0]
+
+        current_app.logger.info(f"Copied {len(keys)} images in S3 for {len(images_by_case)} cases")
+        return rows, keys
+
+    @classmethod
+    def delete_objects(cls, keys) -> None:
+        """Delete S3 objects by key, e.g. copies whose database rows were not saved."""
+        if not keys:
+            return
+        try:
+            s3_client = cls._get_s3_client()
+            bucket_name = os.getenv('AWS_S3_BUCKET_NAME')
+            for start in range(0, len(keys), 1000):  # delete_objects takes up to 1000 keys
+                s3_client.delete_objects(
+                    Bucket=bucket_name,
+                    Delete={"Objects": [{"Key": key} for key in keys[start:start + 1000]], "Quiet": True}
+                )
         except Exception as e:
-            current_app.logger.error(f"An unexpected error occurred in image generation: {e}")
-            db.session.rollback()
-            raise ImageGenerationError("An unexpected error occurred while creating the image.") from e
+            current_app.logger.error(f"Failed to remove {len(keys)} images from S3: {e}")
 
     @classmethod
     def delete_image_and_file(cls, image_id: int, user) -> None:
@@ -271,20 +437,43 @@ class ImageService:
         if not can_user_modify_case(user, image.practice_case):
             raise PermissionError("User is not authorized to delete this image.")
         
-        # Extract S3 key from URL
-        image_url = image.image_url
+        # Keep what identifies the S3 objects
+        objects = (image.image_url, image.content_hash, image.variants)
         
         # Delete database record first
         db.session.delete(image)
         db.session.commit()
         
-        # Delete from S3
+        # Delete from S3 (objects shared with copies stay)
         try:
-            cls._delete_from_s3(image_url)
+            cls._release_objects(*objects)
         except Exception as e:
             # Log error but don't fail the request since DB record is already gone
             current_app.logger.error(f"Failed to delete image from S3 during deletion: {e}")
 
+    @classmethod
+    def add_derivatives(cls, image: PracticeCaseImage) -> bool:
+        """
+        Build derivatives for an image stored before they existed, from its
+        S3 original. Returns whether any were added. Does not commit.
+        """
+        key = cls._s3_key(image.image_url)
+        if not key:
+            return False
+
+        s3_client = cls._get_s3_client()
+        bucket_name = os.getenv('AWS_S3_BUCKET_NAME')
+        image_data = s3_client.get_object(Bucket=bucket_name, Key=key)["Body"].read()
+
+        digest = content_hash(image_data)
+        variants, placeholder = cls._upload_derivatives(s3_client, bucket_name, image_data, digest)
+        if not variants:
+            return False
+        image.content_hash = digest
+        image.variants = variants
+        image.placeholder = placeholder
+        return True
+
     # Test method to verify S3 connection
     @classmethod
     def test_s3_connection(cls) -> dict:
@@ -0,0 +1,155 @@
+# app/services/library_counters.py
+
+import atexit
+import threading
+from collections import Counter
+
+from flask import current_app
+from sqlalchemy import delete, func
+from sqlalchemy.exc import IntegrityError
+
+from app.models import db, PracticeCase, LibraryRating, LibraryDownload
+from app.services import library_stats
+
+# How often pending download rows are folded into the counters
+DOWNLOAD_FOLD_INTERVAL_SECONDS = 60
+
+
+def rate_case(case_id, user_id, rating):
+    """
+    Record a user's rating of a library case (replacing their earlier one) and
+    move the case's average and count in the same UPDATE, computed from the
+    row's current values in SQL, so concurrent raters cannot lose each other's
+    votes. Returns (library_rating, library_rating_count). Does not commit.
+    """
+    rating = float(rating)
+    existing = LibraryRating.query.filter_by(
+        practice_case_id=case_id, user_id=user_id
+    ).with_for_update().first()
+
+    previous = None
+    if existing:
+        previous = existing.rating
+        existing.rating = rating
+    else:
+        try:
+            # A double submit races on the (case, user) unique constraint
+            with db.session.begin_nested():
+                db.session.add(LibraryRating(practice_case_id=case_id, user_id=user_id, rating=rating))
+        except IntegrityError:
+            existing = LibraryRating.query.filter_by(
+                practice_case_id=case_id, user_id=user_id
+            ).with_for_update().one()
+            previous = existing.rating
+            existing.rating = rating
+
+    # Bulk updates would fire updated_at's onupdate; a rating is not an edit of
+    # the case, so keep its ETags and compiled sessions valid
+    count = func.coalesce(PracticeCase.library_rating_count, 0)
+    total = func.coalesce(PracticeCase.library_rating, 0.0) * count
+    if previous is None:
+        values = {
+            PracticeCase.library_rating: (total + rating) / (count + 1),
+            PracticeCase.library_rating_count: count + 1,
+        }
+    else:
+        values = {PracticeCase.library_rating: (total - previous + rating) / func.nullif(count, 0)}
+    values[PracticeCase.updated_at] = PracticeCase.updated_at
+
+    PracticeCase.query.filter_by(id=case_id).update(values, synchronize_session=False)
+    return db.session.query(PracticeCase.library_rating, PracticeCase.library_rating_count).filter_by(id=case_id).one()
+
+
+def record_download(case_id):
+    """Queue one download of a library case for the next fold. Insert only; does not commit."""
+    db.session.add(LibraryDownload(practice_case_id=case_id))
+
+
+def fold_downloads():
+    """
+    Move pending download rows into PracticeCase.library_downloads and the
+    library stats. Rows are claimed with DELETE ... RETURNING, so concurrent
+    folds never count a row twice. Commits; returns the number folded.
+    """
+    claimed = db.session.execute(
+        delete(LibraryDownload).returning(LibraryDownload.practice_case_id)
+    ).scalars().all()
+    if not claimed:
+        db.session.commit()
+        return 0
+
+    for case_id, count in Counter(claimed).items():
+        PracticeCase.query.filter_by(id=case_id).update(
+            {
+                PracticeCase.library_downloads: func.coalesce(PracticeCase.library_downloads, 0) + count,
+                PracticeCase.updated_at: PracticeCase.updated_at,
+            },
+            synchronize_session=False
+        )
+    library_stats.record_downloads(len(claimed))
+    db.session.commit()
+    return len(claimed)
+
+
+class DownloadFolder:
+    """
+    Runs fold_downloads() in the background. The first copy after a fold starts
+    a timer, so pending rows are folded within one interval even if no further
+    copy arrives, and a fold still pending at shutdown runs before the process
+    exits. Rows left behind by a killed worker are picked up by the next fold
+    anywhere, or by `flask fold-library-downloads` from a scheduler.
+    """
+
+    def __init__(self, interval=DOWNLOAD_FOLD_INTERVAL_SECONDS):
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._timer = None
+        self._app = None
+        self._exit_hook = False
+
+    def schedule(self, app):
+        """Fold within one interval unless a fold is already scheduled. Call after a copy commits."""
+        with self._lock:
+            self._app = app
+            if not self._exit_hook:
+                atexit.register(self.flush)
+                self._exit_hook = True
+            if self._timer is not None:
+                return
+            self._timer = threading.Timer(self.interval, self._fold_scheduled)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def flush(self):
+        """Run a scheduled fold now instead of waiting for its timer."""
+        with self._lock:
+            timer, self._timer = self._timer, None
+        if timer is not None:
+            timer.cancel()
+            self._fold_in_app_context(self._app)
+
+    def cancel(self):
+        """Drop a scheduled fold; its rows stay queued for the next one."""
+        with self._lock:
+            timer, self._timer = self._timer, None
+        if timer is not None:
+            timer.cancel()
+
+    def _fold_scheduled(self):
+        with self._lock:
+            # Copies committed while this fold runs schedule the next one
+            self._timer = None
+        self._fold_in_app_context(self._app)
+
+    def _fold_in_app_context(self, app):
+        with app.app_context():
+            try:
+                folded = fold_downloads()
+                if folded:
+                    current_app.logger.info(f"📥 Folded {folded} library downloads")
+            except Exception as e:
+                db.session.rollback()
+                current_app.logger.error(f"❌ Failed to fold library downloads: {str(e)}")
+
+
+download_folder = DownloadFolder()
@@ -0,0 +1,158 @@
+# app/services/library_duplicates.py
+
+"""
+Near-duplicate detection for library submissions.
+
+Each submitted case gets a MinHash signature over word 3-shingles of its text
+(NUM_PERM hash functions), split into BANDS bands of ROWS values. Every band
+is hashed into library_lsh_buckets, so a new submission's candidates are the
+cases sharing a bucket with it: an indexed lookup on BANDS keys instead of a
+comparison against the whole library. Candidates whose signatures agree on at
+least DUPLICATE_THRESHOLD of their values (the estimated Jaccard similarity
+of the shingle sets) are near-duplicates. With 16 bands of 8 rows, pairs
+around 0.7 similar become candidates about half the time and pairs at 0.8 or
+more almost always do.
+"""
+
+import re
+import struct
+import zlib
+from hashlib import blake2b
+
+import numpy as np
+from sqlalchemy import tuple_
+
+from app.models import db, PracticeCase, LibraryCaseSignature, LibraryLSHBucket
+
+NUM_PERM = 128
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+SHINGLE_SIZE = 3
+DUPLICATE_THRESHOLD = 0.8
+TEXT_FIELDS = ("title", "description", "situation_instructions", "curricular_goals", "behavioral_guidelines")
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64(0xFFFFFFFF)
+
+# Fixed seed: signatures are stored, so every process must use the same permutations.
+# a, b < 2**32 keep a * h + b (h a 32-bit hash) inside uint64.
+_rng = np.random.RandomState(20251110)
+_A = _rng.randint(1, 1 << 32, size=NUM_PERM, dtype=np.uint64)
+_B = _rng.randint(0, 1 << 32, size=NUM_PERM, dtype=np.uint64)
+
+
+def _shingles(case):
+    text = " ".join(getattr(case, field) or "" for field in TEXT_FIELDS)
+    tokens = re.findall(r"\w+", text.lower())
+    if len(tokens) <= SHINGLE_SIZE:
+        return {" ".join(tokens)} if tokens else set()
+    return {" ".join(tokens[i:i + SHINGLE_SIZE]) for i in range(len(tokens) - SHINGLE_SIZE + 1)}
+
+
+def minhash(case):
+    """MinHash signature (NUM_PERM ints) of a case's text, or None if it has no text."""
+    shingles = _shingles(case)
+    if not shingles:
+        return None
+    hashes = np.array([zlib.crc32(shingle.encode()) for shingle in shingles], dtype=np.uint64)
+    permuted = ((np.outer(hashes, _A) + _B) % _MERSENNE_PRIME) & _MAX_HASH
+    return permuted.min(axis=0).astype(np.int64).tolist()
+
+
+def band_keys(signature):
+    """(band, bucket) pairs for a signature; bucket is a signed 64-bit hash of the band's values."""
+    keys = []
+    for band in range(BANDS):
+        rows = struct.pack(f"<{ROWS}I", *signature[band * ROWS:(band + 1) * ROWS])
+        keys.append((band, int.from_bytes(blake2b(rows, digest_size=8).digest(), "little", signed=True)))
+    return keys
+
+
+def similarity(signature, other):
+    """Estimated Jaccard similarity of two signatures' shingle sets."""
+    return float(np.mean(np.asarray(signature) == np.asarray(other)))
+
+
+def find_duplicates(case_id, signature, threshold=DUPLICATE_THRESHOLD):
+    """
+    [(case_id, score), ...] of approved library cases (other than case_id)
+    whose signatures share an LSH bucket with signature and estimate at least
+    threshold similarity, most similar first.
+    """
+    candidate_ids = db.session.query(LibraryLSHBucket.practice_case_id).filter(
+        tuple_(LibraryLSHBucket.band, LibraryLSHBucket.bucket).in_(band_keys(signature)),
+        LibraryLSHBucket.practice_case_id != case_id
+    ).distinct()
+
+    candidates = db.session.query(LibraryCaseSignature.practice_case_id, LibraryCaseSignature.signature).join(
+        PracticeCase, PracticeCase.id == LibraryCaseSignature.practice_case_id
+    ).filter(
+        LibraryCaseSignature.practice_case_id.in_(candidate_ids),
+        PracticeCase.library_approved == True
+    ).all()
+
+    scored = [(other_id, similarity(signature, other)) for other_id, other in candidates]
+    return sorted(
+        [(other_id, score) for other_id, score in scored if score >= threshold],
+        key=lambda pair: (-pair[1], pair[0])
+    )
+
+
+def index_case(case):
+    """
+    Store a library case's signature and buckets (replacing earlier ones) and
+    record the closest near-duplicate among approved library cases. Returns
+    (duplicate_of_id, score), or None if there is none. Does not commit.
+    """
+    db.session.flush()
+    signature = minhash(case)
+    if signature is None:
+        remove_case(case.id)
+        return None
+
+    duplicates = find_duplicates(case.id, signature)
+    duplicate_of_id, score = duplicates[0] if duplicates else (None, None)
+
+    entry = db.session.get(LibraryCaseSignature, case.id)
+    if entry is None:
+        entry = LibraryCaseSignature(practice_case_id=case.id)
+        db.session.add(entry)
+    entry.signature = signature
+    entry.duplicate_of_id = duplicate_of_id
+    entry.duplicate_score = score
+
+    LibraryLSHBucket.query.filter_by(practice_case_id=case.id).delete(synchronize_session=False)
+    db.session.add_all(
+        LibraryLSHBucket(band=band, bucket=bucket, practice_case_id=case.id)
+        for band, bucket in band_keys(signature)
+    )
+    return (duplicate_of_id, score) if duplicate_of_id else None
+
+
+def clear_duplicate(case_id):
+    """Forget a case's near-duplicate flag, e.g. once an admin approves it anyway. Does not commit."""
+    LibraryCaseSignature.query.filter_by(practice_case_id=case_id).update(
+        {LibraryCaseSignature.duplicate_of_id: None, LibraryCaseSignature.duplicate_score: None},
+        synchronize_session=False
+    )
+
+
+def remove_case(case_id):
+    """Drop a case's signature and buckets when it leaves the library. Does not commit."""
+    LibraryLSHBucket.query.filter_by(practice_case_id=case_id).delete(synchronize_session=False)
+    LibraryCaseSignature.query.filter_by(practice_case_id=case_id).delete(synchronize_session=False)
+
+
+def duplicate_flags(case_ids):
+    """{case_id: (duplicate_of_id, score)} for the flagged cases among case_ids."""
+    if not case_ids:
+        return {}
+    rows = db.session.query(
+        LibraryCaseSignature.practice_case_id,
+        LibraryCaseSignature.duplicate_of_id,
+        LibraryCaseSignature.duplicate_score
+    ).filter(
+        LibraryCaseSignature.practice_case_id.in_(case_ids),
+        LibraryCaseSignature.duplicate_of_id.isnot(None)
+    ).all()
+    return {case_id: (duplicate_of_id, score) for case_id, duplicate_of_id, score in rows}
@@ -0,0 +1,132 @@
+# app/services/library_pagination.py
+
+"""
+Cursor pagination and cached totals for browsing the case library.
+
+Every sort orders by a key and then by id, and a page continues from the last
+row's (key, id) instead of skipping an OFFSET, so each page is a range scan
+over the matching composite index on practice_cases (see
+PracticeCase.__table_args__). Relevance (full-text search) ordering has no
+index to scan; its cursor carries the offset instead, which stays cheap
+because search has already narrowed the rows.
+
+Totals are counted once per filter combination and reused for
+TOTAL_CACHE_SECONDS rather than counted on every page.
+"""
+
+import base64
+import binascii
+import json
+import threading
+from collections import namedtuple
+from datetime import datetime
+
+from cachetools import TTLCache
+from sqlalchemy import func, tuple_
+
+from app.models import PracticeCase
+
+# How long a filtered library total is reused before it is counted again
+TOTAL_CACHE_SECONDS = 60
+
+# key: the ORDER BY expression (matching an index); value: reads it from a loaded case
+SortKey = namedtuple("SortKey", ["key", "descending", "value"])
+
+SORT_KEYS = {
+    "newest": SortKey(PracticeCase.library_approved_at, True, lambda case: case.library_approved_at),
+    "oldest": SortKey(PracticeCase.library_approved_at, False, lambda case: case.library_approved_at),
+    "popular": SortKey(func.coalesce(PracticeCase.library_downloads, 0), True,
+                       lambda case: case.library_downloads or 0),
+    "rating": SortKey(func.coalesce(PracticeCase.library_rating, 0.0), True,
+                      lambda case: case.library_rating or 0.0),
+    "title": SortKey(func.coalesce(PracticeCase.title, ''), False, lambda case: case.title or ''),
+}
+SORT_ALIASES = {"downloads": "popular"}
+DEFAULT_SORT = "newest"
+RELEVANCE = "relevance"
+
+_totals = TTLCache(maxsize=512, ttl=TOTAL_CACHE_SECONDS)
+_lock = threading.Lock()
+
+
+def resolve_sort(sort, has_relevance):
+    """The sort to use for a requested one: aliases resolved, unknown sorts (or relevance without a search) -> newest."""
+    sort = SORT_ALIASES.get(sort, sort)
+    if sort == RELEVANCE:
+        return RELEVANCE if has_relevance else DEFAULT_SORT
+    return sort if sort in SORT_KEYS else DEFAULT_SORT
+
+
+def order_query(query, sort, relevance=None):
+    """Apply a sort's ordering (always ending in id, so the order is total)."""
+    if sort == RELEVANCE:
+        return query.order_by(relevance, PracticeCase.id.desc())
+    sort_key = SORT_KEYS[sort]
+    if sort_key.descending:
+        return query.order_by(sort_key.key.desc(), PracticeCase.id.desc())
+    return query.order_by(sort_key.key.asc(), PracticeCase.id.asc())
+
+
+def encode_cursor(sort, value, case_id=None):
+    """Opaque cursor for the row after (value, case_id) in sort order."""
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    raw = json.dumps([sort, value, case_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor, sort):
+    """(value, case_id) from a cursor; ValueError if it is malformed or was issued for another sort."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        cursor_sort, value, case_id = json.loads(raw)
+        if sort in ("newest", "oldest"):
+            value = datetime.fromisoformat(value)
+    except (binascii.Error, ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+    if cursor_sort != sort:
+        raise ValueError("Cursor was issued for a different sort")
+    return value, case_id
+
+
+def paginate(query, sort, per_page, cursor=None, relevance=None):
+    """
+    One page of a filtered library query in sort order, starting after cursor
+    (or at the beginning). Returns (cases, next_cursor); next_cursor is None on
+    the last page. Raises ValueError for an invalid cursor.
+    """
+    if sort == RELEVANCE:
+        offset = 0
+        if cursor:
+            offset, _ = decode_cursor(cursor, sort)
+            if not isinstance(offset, int) or offset < 0:
+                raise ValueError("Invalid cursor")
+        rows = order_query(query, sort, relevance).offset(offset).limit(per_page + 1).all()
+        next_cursor = encode_cursor(sort, offset + per_page) if len(rows) > per_page else None
+        return rows[:per_page], next_cursor
+
+    sort_key = SORT_KEYS[sort]
+    if cursor:
+        value, case_id = decode_cursor(cursor, sort)
+        position = tuple_(sort_key.key, PracticeCase.id)
+        if sort_key.descending:
+            query = query.filter(position < tuple_(value, case_id))
+        else:
+            query = query.filter(position > tuple_(value, case_id))
+
+    rows = order_query(query, sort).limit(per_page + 1).all()
+    if len(rows) <= per_page:
+        return rows, None
+    last = rows[per_page - 1]
+    return rows[:per_page], encode_cursor(sort, sort_key.value(last), last.id)
+
+
+def cached_total(query, *filters):
+    """Number of rows a filtered library query matches, counted at most once per TOTAL_CACHE_SECONDS per filters."""
+    with _lock:
+        total = _totals.get(filters)
+    if total is None:
+        total = query.order_by(None).count()
+        with _lock:
+            _totals[filters] = total
+    return total
@@ -0,0 +1,182 @@
+# app/services/library_search.py
+
+"""
+Full-text search over the global case library.
+
+On Postgres each case keeps a weighted tsvector in practice_cases.search_vector
+(GIN-indexed): title, then tags and author, then description, then situation
+instructions. Text is stemmed with the case's target language and also kept
+unstemmed ('simple'), so words in either language and any prefix still match.
+Local SQLite databases use an FTS5 table, practice_cases_fts, instead.
+
+index_case() refreshes one case and must be called whenever searchable text
+changes; search() applies a query to a PracticeCase query.
+"""
+
+import json
+import re
+
+from sqlalchemy import Float, Integer, func, text
+
+from app.models import db, PracticeCase
+
+# Target language (as entered on the case) -> Postgres text search configuration
+LANGUAGE_CONFIGS = {
+    "danish": "danish",
+    "dutch": "dutch",
+    "english": "english",
+    "finnish": "finnish",
+    "french": "french",
+    "german": "german",
+    "hungarian": "hungarian",
+    "italian": "italian",
+    "norwegian": "norwegian",
+    "portuguese": "portuguese",
+    "romanian": "romanian",
+    "russian": "russian",
+    "spanish": "spanish",
+    "swedish": "swedish",
+    "turkish": "turkish",
+}
+DEFAULT_CONFIG = "english"
+
+# Cap on search terms, so a pasted paragraph does not build a huge tsquery
+MAX_TERMS = 8
+
+SQLITE_TABLE = "practice_cases_fts"
+
+
+def text_search_config(language):
+    """Stemming configuration for a target language; unknown languages stem as English."""
+    return LANGUAGE_CONFIGS.get((language or "").strip().lower(), DEFAULT_CONFIG)
+
+
+def _dialect():
+    return db.session.get_bind().dialect.name
+
+
+def _terms(search):
+    """Lowercased word tokens; anything else (tsquery/FTS5 operators included) is dropped."""
+    return re.findall(r"\w+", (search or "").lower())[:MAX_TERMS]
+
+
+def _tags_text(case):
+    try:
+        return " ".join(json.loads(case.library_tags)) if case.library_tags else ""
+    except (TypeError, ValueError):
+        return case.library_tags or ""
+
+
+def _weighted(expression, weight):
+    return (
+        f"setweight(to_tsvector(CAST(:config AS regconfig), {expression}), '{weight}') || "
+        f"setweight(to_tsvector('simple', {expression}), '{weight}')"
+    )
+
+
+POSTGRES_INDEX_SQL = f"""
+    UPDATE practice_cases SET search_vector =
+        {_weighted("coalesce(title, '')", "A")} ||
+        {_weighted(":tags", "B")} ||
+        {_weighted("coalesce(author_name, '')", "B")} ||
+        {_weighted("coalesce(description, '')", "C")} ||
+        {_weighted("coalesce(situation_instructions, '')", "D")}
+    WHERE id = :id
+"""
+
+
+def ensure_sqlite_index():
+    """Create the FTS5 table on first use and fill it from existing library cases."""
+    exists = db.session.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"), {"name": SQLITE_TABLE}
+    ).first()
+    if exists:
+        return
+
+    db.session.execute(text(
+        f"CREATE VIRTUAL TABLE {SQLITE_TABLE} USING fts5("
+        "title, tags, author, description, situation, tokenize = 'porter unicode61 remove_diacritics 2')"
+    ))
+    for case in PracticeCase.query.filter(PracticeCase.submitted_to_library == True):
+        _index_sqlite(case)
+
+
+def _index_sqlite(case):
+    db.session.execute(text(f"DELETE FROM {SQLITE_TABLE} WHERE rowid = :id"), {"id": case.id})
+    db.session.execute(
+        text(
+            f"INSERT INTO {SQLITE_TABLE} (rowid, title, tags, author, description, situation) "
+            "VALUES (:id, :title, :tags, :author, :description, :situation)"
+        ),
+        {
+            "id": case.id,
+            "title": case.title or "",
+            "tags": _tags_text(case),
+            "author": case.author_name or "",
+            "description": case.description or "",
+            "situation": case.situation_instructions or "",
+        }
+    )
+
+
+def index_case(case):
+    """Refresh a case's search entry from its current (flushed or pending) values. Does not commit."""
+    db.session.flush()
+    dialect = _dialect()
+    if dialect == "postgresql":
+        db.session.execute(text(POSTGRES_INDEX_SQL), {
+            "id": case.id,
+            "config": text_search_config(case.target_language),
+            "tags": _tags_text(case),
+        })
+    elif dialect == "sqlite":
+        ensure_sqlite_index()
+        _index_sqlite(case)
+
+
+def search(query, search_text, language=None):
+    """
+    Restrict a PracticeCase query to cases matching every word of search_text
+    (each as a prefix, stemmed with language's configuration as well as
+    unstemmed). Returns (query, relevance ordering clause); the ordering is None
+    if there was nothing to search for.
+    """
+    terms = _terms(search_text)
+    if not terms:
+        return query, None
+
+    dialect = _dialect()
+    if dialect == "postgresql":
+        config = text_search_config(language)
+        ts_query = None
+        for term in terms:
+            prefix = f"{term}:*"
+            term_query = func.to_tsquery(config, prefix).op("||")(func.to_tsquery("simple", prefix))
+            ts_query = term_query if ts_query is None else ts_query.op("&&")(term_query)
+        query = query.filter(PracticeCase.search_vector.op("@@")(ts_query))
+        return query, func.ts_rank_cd(PracticeCase.search_vector, ts_query).desc()
+
+    if dialect == "sqlite":
+        ensure_sqlite_index()
+        # Column weights follow the Postgres ranking: title, tags, author, description, situation
+        matches = text(
+            f"SELECT rowid AS case_id, bm25({SQLITE_TABLE}, 10.0, 5.0, 5.0, 2.0, 1.0) AS score "
+            f"FROM {SQLITE_TABLE} WHERE {SQLITE_TABLE} MATCH :match"
+        ).bindparams(match=" ".join(f'"{term}"*' for term in terms)).columns(
+            case_id=Integer, score=Float
+        ).subquery()
+        query = query.join(matches, matches.c.case_id == PracticeCase.id)
+        # bm25() is lower for better matches
+        return query, matches.c.score.asc()
+
+    # Other databases: plain substring matching, unranked
+    for term in terms:
+        pattern = f"%{term}%"
+        query = query.filter(db.or_(
+            PracticeCase.title.ilike(pattern),
+            PracticeCase.description.ilike(pattern),
+            PracticeCase.situation_instructions.ilike(pattern),
+            PracticeCase.author_name.ilike(pattern),
+            PracticeCase.library_tags.ilike(pattern)
+        ))
+    return query, None
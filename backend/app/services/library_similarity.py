@@ -0,0 +1,207 @@
+# app/services/library_similarity.py
+
+"""
+"Cases like this one" for the global library.
+
+build_index() (the build-library-neighbors CLI job) fits TF-IDF over the
+title, description, situation and curricular goals of every approved library
+case, as a SciPy sparse matrix, and stores each case's vector and its top-k
+cosine neighbours in library_case_vectors; the vocabulary and IDF go in the
+library_vector_model row.
+
+Between rebuilds, index_case() vectorizes a newly approved or edited case
+against the stored vocabulary, scores it against the stored vectors, and
+splices it into the neighbour lists it now belongs in, so approvals cost one
+sparse matrix-vector product rather than a refit. Terms first seen after the
+last build are ignored until the next one.
+"""
+
+import re
+from collections import Counter
+from datetime import datetime, timezone
+
+import numpy as np
+from scipy import sparse
+from sqlalchemy.orm import load_only
+
+from app.models import db, PracticeCase, LibraryVectorModel, LibraryCaseVector
+
+TOP_K = 10
+MAX_FEATURES = 20000
+TEXT_FIELDS = ("title", "description", "situation_instructions", "curricular_goals")
+
+# Rows of the similarity matrix computed at once during a build (each a dense row of length N)
+BUILD_CHUNK_ROWS = 256
+
+
+def _term_counts(case):
+    text = " ".join(getattr(case, field) or "" for field in TEXT_FIELDS)
+    return Counter(token for token in re.findall(r"\w+", text.lower()) if len(token) > 1 and not token.isdigit())
+
+
+def _vectorize(counts_list, vocabulary, idf):
+    """L2-normalized sublinear TF-IDF rows (CSR) for term counts over a fixed vocabulary."""
+    rows, cols, values = [], [], []
+    for row, counts in enumerate(counts_list):
+        for term, count in counts.items():
+            col = vocabulary.get(term)
+            if col is not None:
+                rows.append(row)
+                cols.append(col)
+                values.append((1.0 + np.log(count)) * idf[col])
+
+    matrix = sparse.csr_matrix((values, (rows, cols)), shape=(len(counts_list), len(idf)), dtype=np.float64)
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1.0
+    return sparse.csr_matrix(matrix.multiply((1.0 / norms)[:, np.newaxis]))
+
+
+def _stored_vector(row_vector):
+    row_vector = row_vector.tocoo()
+    return {"indices": row_vector.col.tolist(), "weights": np.round(row_vector.data, 6).tolist()}
+
+
+def _stack(vectors, width):
+    """CSR matrix from stored vectors, one row each."""
+    indptr, indices, weights = [0], [], []
+    for vector in vectors:
+        indices.extend(vector["indices"])
+        weights.extend(vector["weights"])
+        indptr.append(len(indices))
+    return sparse.csr_matrix((weights, indices, indptr), shape=(len(vectors), width), dtype=np.float64)
+
+
+def _top_neighbors(case_ids, scores, top_k):
+    """[[case_id, score], ...] for the best top_k positive scores, best first."""
+    if len(scores) > top_k:
+        candidates = np.argpartition(-scores, top_k)[:top_k]
+    else:
+        candidates = np.arange(len(scores))
+    ranked = sorted(candidates, key=lambda i: (-scores[i], case_ids[i]))
+    return [[case_ids[i], round(float(scores[i]), 6)] for i in ranked if scores[i] > 0]
+
+
+def _approved_cases():
+    return PracticeCase.query.filter(PracticeCase.library_approved == True).options(
+        load_only(PracticeCase.id, *(getattr(PracticeCase, field) for field in TEXT_FIELDS))
+    ).order_by(PracticeCase.id).all()
+
+
+def build_index(top_k=TOP_K):
+    """
+    Refit TF-IDF over all approved library cases and rewrite every vector and
+    neighbour list. Commits; returns the number of cases indexed.
+    """
+    cases = _approved_cases()
+    counts_list = [_term_counts(case) for case in cases]
+
+    document_frequency = Counter()
+    for counts in counts_list:
+        document_frequency.update(counts.keys())
+    terms = sorted(document_frequency, key=lambda term: (-document_frequency[term], term))[:MAX_FEATURES]
+    vocabulary = {term: col for col, term in enumerate(terms)}
+    df = np.array([document_frequency[term] for term in terms], dtype=np.float64)
+    idf = np.log((1.0 + len(cases)) / (1.0 + df)) + 1.0
+
+    matrix = _vectorize(counts_list, vocabulary, idf)
+    case_ids = [case.id for case in cases]
+
+    LibraryCaseVector.query.delete(synchronize_session=False)
+    transposed = matrix.T.tocsc()
+    for start in range(0, len(cases), BUILD_CHUNK_ROWS):
+        block = (matrix[start:start + BUILD_CHUNK_ROWS] @ transposed).toarray()
+        for offset, scores in enumerate(block):
+            row = start + offset
+            scores[row] = 0.0  # a case is not its own neighbour
+            db.session.add(LibraryCaseVector(
+                practice_case_id=case_ids[row],
+                vector=_stored_vector(matrix[row]),
+                neighbors=_top_neighbors(case_ids, scores, top_k),
+            ))
+
+    model = db.session.get(LibraryVectorModel, LibraryVectorModel.SINGLETON_ID)
+    if model is None:
+        model = LibraryVectorModel(id=LibraryVectorModel.SINGLETON_ID)
+        db.session.add(model)
+    model.vocabulary = vocabulary
+    model.idf = np.round(idf, 6).tolist()
+    model.top_k = top_k
+    model.case_count = len(cases)
+    model.built_at = datetime.now(timezone.utc)
+
+    db.session.commit()
+    return len(cases)
+
+
+def _locked_model():
+    # Serializes incremental updates, which rewrite other cases' neighbour lists
+    return LibraryVectorModel.query.filter_by(id=LibraryVectorModel.SINGLETON_ID).with_for_update().first()
+
+
+def _splice(neighbors, case_id, score, top_k):
+    """A neighbour list with case_id dropped and, if it now ranks, re-inserted at score."""
+    kept = [entry for entry in neighbors if entry[0] != case_id]
+    if score > 0:
+        kept.append([case_id, round(float(score), 6)])
+        kept.sort(key=lambda entry: (-entry[1], entry[0]))
+    return kept[:top_k]
+
+
+def index_case(case):
+    """
+    Vectorize one approved library case against the stored vocabulary, store
+    its neighbours, and splice it into the other cases' lists. Does nothing
+    before the first build. Does not commit.
+    """
+    model = _locked_model()
+    if model is None:
+        return
+
+    db.session.flush()
+    idf = np.asarray(model.idf, dtype=np.float64)
+    vector = _vectorize([_term_counts(case)], model.vocabulary, idf)
+
+    others = LibraryCaseVector.query.filter(LibraryCaseVector.practice_case_id != case.id).all()
+    scores = np.zeros(len(others))
+    if others:
+        scores = np.asarray((_stack([other.vector for other in others], len(idf)) @ vector.T).todense()).ravel()
+
+    for other, score in zip(others, scores):
+        spliced = _splice(other.neighbors or [], case.id, score, model.top_k)
+        if spliced != other.neighbors:
+            other.neighbors = spliced
+
+    entry = db.session.get(LibraryCaseVector, case.id)
+    if entry is None:
+        entry = LibraryCaseVector(practice_case_id=case.id)
+        db.session.add(entry)
+    entry.vector = _stored_vector(vector)
+    entry.neighbors = _top_neighbors([other.practice_case_id for other in others], scores, model.top_k)
+
+
+def remove_case(case_id):
+    """Drop a case from the index and from other cases' neighbour lists (they refill on the next build). Does not commit."""
+    if _locked_model() is None:
+        return
+    for other in LibraryCaseVector.query.filter(LibraryCaseVector.practice_case_id != case_id).all():
+        spliced = _splice(other.neighbors or [], case_id, 0.0, len(other.neighbors or []))
+        if spliced != other.neighbors:
+            other.neighbors = spliced
+    LibraryCaseVector.query.filter_by(practice_case_id=case_id).delete(synchronize_session=False)
+
+
+def similar_cases(case_id, limit=TOP_K):
+    """[(case, score), ...] from the stored neighbour list of a case, best first; None if it is not indexed."""
+    entry = db.session.get(LibraryCaseVector, case_id)
+    if entry is None:
+        return None
+
+    neighbors = (entry.neighbors or [])[:limit]
+    cases = {
+        case.id: case
+        for case in PracticeCase.query.filter(
+            PracticeCase.id.in_([neighbor_id for neighbor_id, _ in neighbors]),
+            PracticeCase.library_approved == True
+        )
+    }
+    return [(cases[neighbor_id], score) for neighbor_id, score in neighbors if neighbor_id in cases]
@@ -0,0 +1,180 @@
+# app/services/library_stats.py
+
+"""
+Materialized library statistics (the library_stats row).
+
+Library writes call mark_library_changed(); the row is recomputed once the
+request's transaction has committed, in a short transaction of its own, so
+writes never wait on the stats row. Recomputes are ordered by when they
+started, so a slow one cannot overwrite a newer result. Changes made outside
+those write paths are caught when the row is older than
+LIBRARY_STATS_MAX_AGE_SECONDS.
+"""
+
+import threading
+from datetime import datetime, timedelta, timezone
+
+from cachetools import TTLCache
+from flask import current_app, g, has_app_context
+from sqlalchemy import event
+from sqlalchemy.exc import IntegrityError
+
+from app.models import db, PracticeCase, LibraryStats
+from app.services.library_tags import popular_tags
+
+# Each worker serves its snapshot this long, so a refresh made by another
+# worker is visible within it
+STATS_CACHE_SECONDS = 30
+
+_cache = TTLCache(maxsize=1, ttl=STATS_CACHE_SECONDS)
+_lock = threading.Lock()
+
+# Session.info keys
+_LISTENING = "library_stats_listening"
+_CHANGED = "library_stats_changed"
+
+
+def compute_library_stats():
+    """Aggregate the library statistics from the approved cases."""
+    approved = PracticeCase.library_approved == True
+
+    total_cases, total_downloads = db.session.query(
+        db.func.count(PracticeCase.id),
+        db.func.coalesce(db.func.sum(PracticeCase.library_downloads), 0)
+    ).filter(approved).one()
+
+    language_counts = db.session.query(
+        PracticeCase.target_language,
+        db.func.count(PracticeCase.id).label('count')
+    ).filter(
+        approved,
+        PracticeCase.target_language.isnot(None),
+        PracticeCase.target_language != ''
+    ).group_by(PracticeCase.target_language).order_by(db.desc('count')).limit(10).all()
+
+    return {
+        "total_cases": total_cases,
+        "total_downloads": int(total_downloads or 0),
+        "popular_languages": [language for language, _ in language_counts],
+        "popular_tags": [tag.name for tag in popular_tags(20)],
+    }
+
+
+def _stats_row():
+    stats = db.session.get(LibraryStats, LibraryStats.SINGLETON_ID)
+    if stats is not None:
+        return stats
+    try:
+        # Another worker may create the row at the same time
+        with db.session.begin_nested():
+            stats = LibraryStats(id=LibraryStats.SINGLETON_ID)
+            db.session.add(stats)
+        return stats
+    except IntegrityError:
+        return db.session.get(LibraryStats, LibraryStats.SINGLETON_ID)
+
+
+def refresh_library_stats():
+    """
+    Recompute the stats row, unless a recompute that started later has
+    already written it. The row is only locked for the final update. Does not
+    commit; returns the row.
+    """
+    started = datetime.now(timezone.utc)
+    values = compute_library_stats()
+
+    stats = _stats_row()
+    db.session.flush()
+    LibraryStats.query.filter(
+        LibraryStats.id == LibraryStats.SINGLETON_ID,
+        db.or_(LibraryStats.computed_at.is_(None), LibraryStats.computed_at < started)
+    ).update(
+        {**{getattr(LibraryStats, name): value for name, value in values.items()}, LibraryStats.computed_at: started},
+        synchronize_session=False
+    )
+    db.session.expire(stats)
+    _clear_cache_on_commit()
+    return stats
+
+
+def record_downloads(count):
+    """Add folded library downloads to the stats row in place, without recomputing. Does not commit."""
+    LibraryStats.query.filter_by(id=LibraryStats.SINGLETON_ID).update(
+        {LibraryStats.total_downloads: LibraryStats.total_downloads + count},
+        synchronize_session=False
+    )
+    _clear_cache_on_commit()
+
+
+def mark_library_changed():
+    """
+    Have the stats recomputed after the current transaction commits. Call from
+    the write paths that change the library (submit, approve, delete, edits
+    to library cases). Does not commit.
+    """
+    _clear_cache_on_commit()
+    db.session().info[_CHANGED] = True
+
+
+def _clear_cache_on_commit():
+    session = db.session()
+    if not session.info.get(_LISTENING):
+        session.info[_LISTENING] = True
+        event.listen(session, "after_commit", _after_commit)
+        event.listen(session, "after_rollback", _after_rollback)
+
+
+def _after_commit(session):
+    # Clearing any earlier would let a concurrent reader cache the old values again
+    with _lock:
+        _cache.clear()
+    if session.info.pop(_CHANGED, False) and has_app_context():
+        g.library_stats_changed = True
+
+
+def _after_rollback(session):
+    session.info.pop(_CHANGED, None)
+
+
+def _refresh_after_request(response):
+    if g.pop("library_stats_changed", False):
+        try:
+            refresh_library_stats()
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.warning(f"⚠️ Could not refresh library stats: {str(e)}")
+    return response
+
+
+def init_app(app):
+    app.after_request(_refresh_after_request)
+
+
+def get_library_stats():
+    """
+    The library statistics for /library/stats, from this worker's snapshot or
+    the stats row. The row is recomputed (and committed) if it is missing or
+    older than LIBRARY_STATS_MAX_AGE_SECONDS, which catches changes made
+    outside the write paths that refresh it; max_staleness_seconds reports
+    that bound plus this worker's cache.
+    """
+    with _lock:
+        snapshot = _cache.get("stats")
+    if snapshot is not None:
+        return snapshot
+
+    stats = db.session.get(LibraryStats, LibraryStats.SINGLETON_ID)
+    computed_at = stats.computed_at if stats else None
+    if computed_at is not None and computed_at.tzinfo is None:
+        computed_at = computed_at.replace(tzinfo=timezone.utc)
+
+    max_age_seconds = current_app.config.get("LIBRARY_STATS_MAX_AGE_SECONDS", 900)
+    if computed_at is None or datetime.now(timezone.utc) - computed_at > timedelta(seconds=max_age_seconds):
+        stats = refresh_library_stats()
+        db.session.commit()
+
+    snapshot = {**stats.to_dict(), "max_staleness_seconds": max_age_seconds + STATS_CACHE_SECONDS}
+    with _lock:
+        _cache["stats"] = snapshot
+    return snapshot
@@ -0,0 +1,83 @@
+# app/services/library_tags.py
+
+import json
+
+from sqlalchemy.exc import IntegrityError
+
+from app.models import db, LibraryTag
+
+# Longest tag kept (matches LibraryTag.name)
+MAX_TAG_LENGTH = 100
+
+
+def normalize_tag(tag):
+    """Trimmed, lowercased tag, or None if it is not a usable tag."""
+    if not isinstance(tag, str):
+        return None
+    tag = tag.strip().lower()[:MAX_TAG_LENGTH]
+    return tag or None
+
+
+def parse_tags(library_tags):
+    """Normalized, de-duplicated tags from a case's JSON-encoded library_tags, in order."""
+    try:
+        tags = json.loads(library_tags) if library_tags else []
+    except (TypeError, ValueError):
+        return []
+    if not isinstance(tags, list):
+        return []
+    return list(dict.fromkeys(filter(None, map(normalize_tag, tags))))
+
+
+def _get_or_create(name):
+    tag = LibraryTag.query.filter_by(name=name).first()
+    if tag:
+        return tag
+    try:
+        # A concurrent submit may create the same tag; the savepoint keeps our transaction usable
+        with db.session.begin_nested():
+            tag = LibraryTag(name=name, case_count=0)
+            db.session.add(tag)
+        return tag
+    except IntegrityError:
+        return LibraryTag.query.filter_by(name=name).one()
+
+
+def _adjust_counts(tag_ids, delta):
+    if tag_ids:
+        LibraryTag.query.filter(LibraryTag.id.in_(tag_ids)).update(
+            {LibraryTag.case_count: LibraryTag.case_count + delta},
+            synchronize_session=False
+        )
+
+
+def sync_case_tags(case, was_counted):
+    """
+    Point a case's tag associations at its current library_tags, and move the
+    tag counters by the difference. A case counts toward its tags while it is
+    an approved library case; was_counted says whether it did before this
+    change (i.e. it was approved). Counters are updated in place, so
+    concurrent requests cannot lose increments. Does not commit.
+    """
+    old_tags = list(case.tags)
+    new_tags = [_get_or_create(name) for name in parse_tags(case.library_tags)]
+    case.tags = new_tags
+
+    old_counted = {tag.id for tag in old_tags} if was_counted else set()
+    new_counted = {tag.id for tag in new_tags} if case.library_approved else set()
+    _adjust_counts(new_counted - old_counted, 1)
+    _adjust_counts(old_counted - new_counted, -1)
+
+
+def release_case_tags(case):
+    """Drop a case's tag associations and its share of the counters, e.g. before deleting it. Does not commit."""
+    if case.library_approved:
+        _adjust_counts([tag.id for tag in case.tags], -1)
+    case.tags = []
+
+
+def popular_tags(limit=20):
+    """Most used tags among approved library cases, from the counters."""
+    return LibraryTag.query.filter(LibraryTag.case_count > 0).order_by(
+        LibraryTag.case_count.desc(), LibraryTag.name
+    ).limit(limit).all()
@@ -0,0 +1,331 @@
+# app/services/llm_metrics.py
+
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+
+from cachetools import TTLCache
+from flask import current_app, has_app_context
+from sqlalchemy.orm import Session
+
+from app.models import db, Class, LLMUsage
+
+# USD per 1M tokens: (input, cached input, output). Models missing here are
+# still tracked, just without a cost estimate.
+MODEL_PRICING = {
+    "gpt-4o": (2.50, 1.25, 10.00),
+    "gpt-4o-mini": (0.15, 0.075, 0.60),
+    "gpt-4.1": (2.00, 0.50, 8.00),
+    "gpt-4.1-mini": (0.40, 0.10, 1.60),
+    "gpt-image-1": (5.00, 1.25, 40.00),
+}
+
+# Histogram bucket upper bounds, in seconds
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2, 3, 5, 8, 13, 20, 30, 60, 120, float("inf"))
+
+# How long a class's institution is remembered for cost attribution
+INSTITUTION_CACHE_SECONDS = 300
+
+# Aggregated usage is written to the database at most this often per process
+USAGE_FLUSH_INTERVAL_SECONDS = 30
+
+
+class Histogram:
+    """Fixed-bucket histogram with count and sum, cheap enough to update on every call."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.count += 1
+        self.sum += value
+        for i, upper in enumerate(self.buckets):
+            if value <= upper:
+                self.counts[i] += 1
+                break
+
+    def percentile(self, q: float):
+        """Estimate a percentile by linear interpolation inside the matching bucket."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        lower = 0.0
+        for upper, bucket_count in zip(self.buckets, self.counts):
+            if bucket_count and seen + bucket_count >= rank:
+                if upper == float("inf"):
+                    return lower
+                return lower + (upper - lower) * ((rank - seen) / bucket_count)
+            seen += bucket_count
+            lower = upper if upper != float("inf") else lower
+        return lower
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "mean": self.sum / self.count if self.count else None,
+            "p50": self.percentile(0.50),
+            "p95": self.percentile(0.95),
+            "p99": self.percentile(0.99),
+        }
+
+
+class MetricsRegistry:
+    """
+    In-process registry of counters and histograms keyed by metric name and a
+    sorted tuple of labels. Values are per process; the usage table is the
+    cross-process source of truth for reporting.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+
+    @staticmethod
+    def _key(name, labels):
+        return name, tuple(sorted((labels or {}).items()))
+
+    def increment(self, name, value=1, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(value)
+
+    def counter_value(self, name, **labels):
+        with self._lock:
+            return self._counters.get(self._key(name, labels), 0)
+
+    def histogram_summary(self, name, **labels):
+        """Return count/mean/percentiles for one histogram, or None if it has no samples."""
+        with self._lock:
+            histogram = self._histograms.get(self._key(name, labels))
+            return histogram.to_dict() if histogram else None
+
+    def snapshot(self):
+        """Return all metrics as JSON-serializable dicts."""
+        with self._lock:
+            counters = [
+                {"name": name, "labels": dict(labels), "value": value}
+                for (name, labels), value in sorted(self._counters.items())
+            ]
+            histograms = [
+                {"name": name, "labels": dict(labels), **histogram.to_dict()}
+                for (name, labels), histogram in sorted(self._histograms.items())
+            ]
+        return {"counters": counters, "histograms": histograms}
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+
+registry = MetricsRegistry()
+
+
+def estimate_cost(model, prompt_tokens=0, completion_tokens=0, cached_tokens=0):
+    """Estimate the USD cost of a call from its token counts."""
+    pricing = MODEL_PRICING.get(model)
+    if not pricing:
+        return 0.0
+    input_price, cached_price, output_price = pricing
+    uncached_tokens = max(0, prompt_tokens - cached_tokens)
+    return (uncached_tokens * input_price + cached_tokens * cached_price + completion_tokens * output_price) / 1_000_000
+
+
+class LLMCall:
+    """Mutable record for one upstream call, filled in by the call site."""
+
+    def __init__(self, route, model, case_id=None, institution_id=None):
+        self.route = route
+        self.model = model
+        self.case_id = case_id
+        self.institution_id = institution_id
+        self.latency = None
+        self.time_to_first_token = None
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cached_tokens = 0
+        self.error = None
+
+    def record_usage(self, response):
+        """Copy token counts from an OpenAI response (chat completions or images)."""
+        usage = getattr(response, "usage", None)
+        if usage is None:
+            return
+        self.prompt_tokens = getattr(usage, "prompt_tokens", None) or getattr(usage, "input_tokens", None) or 0
+        self.completion_tokens = getattr(usage, "completion_tokens", None) or getattr(usage, "output_tokens", None) or 0
+        details = getattr(usage, "prompt_tokens_details", None) or getattr(usage, "input_tokens_details", None)
+        self.cached_tokens = getattr(details, "cached_tokens", None) or 0
+
+    def record_response_time(self, response):
+        """Use the time until response headers arrived (requests' elapsed) as time to first token."""
+        elapsed = getattr(response, "elapsed", None)
+        if isinstance(elapsed, timedelta):
+            self.time_to_first_token = elapsed.total_seconds()
+
+    @property
+    def cost(self):
+        return estimate_cost(self.model, self.prompt_tokens, self.completion_tokens, self.cached_tokens)
+
+
+_institution_by_class = TTLCache(maxsize=4096, ttl=INSTITUTION_CACHE_SECONDS)
+_institution_by_class_lock = threading.Lock()
+_MISSING = object()
+
+
+def case_labels(practice_case):
+    """Return the case_id/institution_id labels for a practice case (or empty labels)."""
+    if practice_case is None:
+        return {}
+    class_id = practice_case.class_id
+    with _institution_by_class_lock:
+        institution_id = _institution_by_class.get(class_id, _MISSING)
+    if institution_id is _MISSING:
+        institution_id = db.session.query(Class.institution_id).filter(Class.id == class_id).scalar()
+        with _institution_by_class_lock:
+            _institution_by_class[class_id] = institution_id
+    return {"case_id": practice_case.id, "institution_id": institution_id}
+
+
+@contextmanager
+def track_llm_call(route, model, practice_case=None, case_id=None, institution_id=None):
+    """
+    Time an upstream model call and record latency, tokens and cost.
+
+    Usage:
+        with track_llm_call("end_conversation", "gpt-4o", practice_case=case) as call:
+            response = client.chat.completions.create(...)
+            call.record_usage(response)
+    """
+    labels = case_labels(practice_case) if practice_case is not None else {}
+    call = LLMCall(
+        route,
+        model,
+        case_id=labels.get("case_id", case_id),
+        institution_id=labels.get("institution_id", institution_id),
+    )
+    started = time.perf_counter()
+    try:
+        yield call
+    except Exception as e:
+        call.error = type(e).__name__
+        raise
+    finally:
+        call.latency = time.perf_counter() - started
+        _record(call)
+
+
+def _record(call):
+    labels = {"route": call.route, "model": call.model}
+    registry.increment("llm_calls_total", **labels)
+    registry.observe("llm_latency_seconds", call.latency, **labels)
+    registry.observe("llm_model_latency_seconds", call.latency, model=call.model)
+    if call.time_to_first_token is not None:
+        registry.observe("llm_time_to_first_token_seconds", call.time_to_first_token, **labels)
+    if call.error:
+        registry.increment("llm_errors_total", **labels, error=call.error)
+    registry.increment("llm_prompt_tokens_total", call.prompt_tokens, **labels)
+    registry.increment("llm_completion_tokens_total", call.completion_tokens, **labels)
+    registry.increment("llm_cached_tokens_total", call.cached_tokens, **labels)
+
+    usage_buffer.add(call)
+
+    if has_app_context():
+        current_app.logger.info(
+            f"📈 LLM call route={call.route} model={call.model} case={call.case_id} "
+            f"institution={call.institution_id} latency={call.latency:.3f}s "
+            f"tokens={call.prompt_tokens}/{call.completion_tokens} cached={call.cached_tokens} "
+            f"cost=${call.cost:.5f}{' error=' + call.error if call.error else ''}"
+        )
+        usage_buffer.maybe_flush(current_app._get_current_object())
+
+
+class UsageBuffer:
+    """
+    Accumulates per (day, institution, route, model) usage deltas in memory and
+    folds them into the llm_usage table in the background, so call sites never
+    wait on a database write.
+    """
+
+    def __init__(self, flush_interval=USAGE_FLUSH_INTERVAL_SECONDS):
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._last_flush = time.monotonic()
+        self._flushing = False
+
+    def add(self, call):
+        key = (datetime.now(timezone.utc).date(), call.institution_id, call.route, call.model)
+        with self._lock:
+            totals = self._pending.setdefault(key, {
+                "call_count": 0, "error_count": 0, "prompt_tokens": 0, "completion_tokens": 0,
+                "cached_tokens": 0, "total_latency_ms": 0, "cost_usd": 0.0,
+            })
+            totals["call_count"] += 1
+            totals["error_count"] += 1 if call.error else 0
+            totals["prompt_tokens"] += call.prompt_tokens
+            totals["completion_tokens"] += call.completion_tokens
+            totals["cached_tokens"] += call.cached_tokens
+            totals["total_latency_ms"] += int(call.latency * 1000)
+            totals["cost_usd"] += call.cost
+
+    def maybe_flush(self, app):
+        with self._lock:
+            due = time.monotonic() - self._last_flush >= self.flush_interval
+            if not due or self._flushing or not self._pending:
+                return
+            self._flushing = True
+        threading.Thread(target=self._flush_in_app_context, args=(app,), daemon=True).start()
+
+    def _flush_in_app_context(self, app):
+        with app.app_context():
+            try:
+                self.flush()
+            except Exception as e:
+                current_app.logger.error(f"❌ Failed to flush LLM usage: {str(e)}")
+            finally:
+                with self._lock:
+                    self._flushing = False
+
+    def flush(self):
+        """Write pending usage to the database. Needs an app context."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._last_flush = time.monotonic()
+        if not pending:
+            return
+
+        try:
+            with Session(db.engine) as session:
+                for (day, institution_id, route, model), totals in pending.items():
+                    LLMUsage.add_usage(session, day, institution_id, route, model, totals)
+                session.commit()
+        except Exception:
+            # Put the deltas back so the next flush retries them
+            with self._lock:
+                for key, totals in pending.items():
+                    current = self._pending.setdefault(key, dict.fromkeys(totals, 0))
+                    for field, value in totals.items():
+                        current[field] += value
+            raise
+
+
+usage_buffer = UsageBuffer()
+
+
+def flush_usage():
+    """Flush buffered usage immediately (e.g. at the end of a CLI run)."""
+    usage_buffer.flush()
@@ -0,0 +1,357 @@
+# app/services/llm_transport.py
+
+import asyncio
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait, TimeoutError as FutureTimeoutError
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+
+import httpx
+import openai
+import requests
+
+from app.services.llm_metrics import registry
+
+# Status codes worth retrying: request timeout, conflict, rate limit and server errors
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+
+# Swapped out in tests so retry delays can be asserted without sleeping
+_sleep = time.sleep
+_async_sleep = asyncio.sleep
+
+
+class CircuitOpenError(Exception):
+    """Raised without calling upstream while an endpoint's circuit breaker is open."""
+
+    def __init__(self, endpoint, retry_after):
+        self.endpoint = endpoint
+        self.retry_after = retry_after
+        super().__init__(f"{endpoint} is temporarily unavailable; retry in {retry_after:.0f}s")
+
+
+class TransportPolicy:
+    """
+    How a class of upstream calls is retried and bounded.
+
+    - timeout: per-attempt timeout in seconds, passed to the HTTP client
+    - max_attempts: total attempts including the first one
+    - base_delay/max_delay: bounds of the jittered exponential backoff
+    - max_retry_after: a Retry-After longer than this fails fast instead of
+      holding a worker
+    - hedge_after: if set, a second identical request is started when the
+      first has not finished after this many seconds; the first success wins
+    """
+
+    def __init__(self, timeout=30.0, max_attempts=3, base_delay=0.5, max_delay=8.0,
+                 max_retry_after=20.0, hedge_after=None):
+        self.timeout = timeout
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_retry_after = max_retry_after
+        self.hedge_after = hedge_after
+
+    def backoff(self, attempt):
+        """Full-jitter exponential backoff for the given (1-based) failed attempt."""
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** (attempt - 1))))
+
+
+def _hedge_delay_from_env():
+    value = float(os.getenv("LLM_CHAT_HEDGE_AFTER_SECONDS", "6"))
+    return value if value > 0 else None
+
+
+# Structured feedback at the end of a conversation: slow, not retried aggressively
+FEEDBACK_POLICY = TransportPolicy(timeout=90.0, max_attempts=3)
+# Interactive dialogic chat: short calls where tail latency matters, hedged
+CHAT_POLICY = TransportPolicy(timeout=20.0, max_attempts=2, max_retry_after=5.0, hedge_after=_hedge_delay_from_env())
+# Background work (e.g. suggestion prefetch): never hedged
+BACKGROUND_CHAT_POLICY = TransportPolicy(timeout=60.0, max_attempts=3)
+IMAGE_POLICY = TransportPolicy(timeout=120.0, max_attempts=2)
+REALTIME_SESSION_POLICY = TransportPolicy(timeout=10.0, max_attempts=3, max_retry_after=5.0)
+TTS_POLICY = TransportPolicy(timeout=20.0, max_attempts=2, max_retry_after=5.0)
+
+
+_async_openai_client = None
+
+
+def get_async_openai_client():
+    """
+    Process-wide AsyncOpenAI client for the ASGI routes, so concurrent calls
+    share one keep-alive pool. SDK retries are off; use
+    with_options(timeout=policy.timeout) and resilient_call_async per call.
+    """
+    global _async_openai_client
+    if _async_openai_client is None:
+        _async_openai_client = openai.AsyncOpenAI(max_retries=0)
+    return _async_openai_client
+
+
+class CircuitBreaker:
+    """
+    Per-endpoint breaker. After failure_threshold consecutive retryable failures
+    the circuit opens and calls fail fast for reset_timeout seconds; then a
+    single trial call is let through (half-open) and its outcome decides whether
+    the circuit closes again.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name, failure_threshold=5, reset_timeout=30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                self._trial_in_flight = False
+            if self.state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def retry_after(self):
+        with self._lock:
+            if self.opened_at is None:
+                return 0.0
+            return max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at))
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self.opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    registry.increment("llm_circuit_opened_total", endpoint=self.name)
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+                self._trial_in_flight = False
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(endpoint):
+    """Return the process-wide circuit breaker for an endpoint."""
+    with _breakers_lock:
+        breaker = _breakers.get(endpoint)
+        if breaker is None:
+            breaker = _breakers[endpoint] = CircuitBreaker(
+                endpoint,
+                failure_threshold=int(os.getenv("LLM_CIRCUIT_FAILURE_THRESHOLD", "5")),
+                reset_timeout=float(os.getenv("LLM_CIRCUIT_RESET_SECONDS", "30")),
+            )
+        return breaker
+
+
+def reset_breakers():
+    """Forget every circuit breaker (and so any open circuit). For tests and process restarts."""
+    with _breakers_lock:
+        _breakers.clear()
+
+
+def _status_and_headers(exc):
+    """Extract the HTTP status code and headers from OpenAI SDK, requests or httpx errors."""
+    if isinstance(exc, openai.APIStatusError):
+        return exc.status_code, exc.response.headers
+    if isinstance(exc, (requests.HTTPError, httpx.HTTPStatusError)) and exc.response is not None:
+        return exc.response.status_code, exc.response.headers
+    return None, None
+
+
+def is_retryable(exc):
+    """Whether an exception is a transient upstream failure."""
+    if isinstance(exc, (openai.APITimeoutError, openai.APIConnectionError)):
+        return True
+    if isinstance(exc, (requests.Timeout, requests.ConnectionError)):
+        return True
+    if isinstance(exc, (httpx.TimeoutException, httpx.TransportError)):
+        return True
+    status, _ = _status_and_headers(exc)
+    return status in RETRYABLE_STATUS_CODES
+
+
+def retry_after_seconds(exc):
+    """
+    Parse the server's requested delay from retry-after-ms or Retry-After
+    (delta-seconds or HTTP-date). Returns None when absent or unparseable.
+    """
+    _, headers = _status_and_headers(exc)
+    if not headers:
+        return None
+
+    retry_after_ms = headers.get("retry-after-ms")
+    if retry_after_ms:
+        try:
+            return max(0.0, float(retry_after_ms) / 1000)
+        except ValueError:
+            pass
+
+    retry_after = headers.get("retry-after")
+    if not retry_after:
+        return None
+    try:
+        return max(0.0, float(retry_after))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(retry_after)
+        return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
+_hedge_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="llm-hedge")
+
+
+def _call_hedged(endpoint, fn, hedge_after):
+    """Run fn; if it is still running after hedge_after seconds, race a second copy."""
+    first = _hedge_executor.submit(fn)
+    try:
+        return first.result(timeout=hedge_after)
+    except FutureTimeoutError:
+        pass
+
+    registry.increment("llm_hedged_requests_total", endpoint=endpoint)
+    pending = {first, _hedge_executor.submit(fn)}
+    error = None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                return future.result()
+            error = future.exception()
+    raise error
+
+
+def resilient_call(endpoint, fn, policy):
+    """
+    Call fn() under the transport policy for an endpoint.
+
+    Transient failures (timeouts, connection errors, 408/409/429/5xx) are retried
+    with jittered exponential backoff, waiting at least as long as the server's
+    Retry-After. Every transient failure counts against the endpoint's circuit
+    breaker; while it is open, CircuitOpenError is raised without calling upstream.
+    Non-retryable errors (e.g. 400) propagate immediately.
+    """
+    breaker = get_breaker(endpoint)
+    attempt = 0
+    while True:
+        attempt += 1
+        if not breaker.allow():
+            registry.increment("llm_circuit_rejected_total", endpoint=endpoint)
+            raise CircuitOpenError(endpoint, breaker.retry_after())
+
+        try:
+            if policy.hedge_after:
+                result = _call_hedged(endpoint, fn, policy.hedge_after)
+            else:
+                result = fn()
+        except Exception as e:
+            delay = _retry_delay(endpoint, breaker, policy, attempt, e)
+            if delay is None:
+                raise
+            _sleep(delay)
+            continue
+
+        breaker.record_success()
+        return result
+
+
+def _retry_delay(endpoint, breaker, policy, attempt, exc):
+    """
+    Record a failed attempt on the breaker and return how long to wait before
+    retrying, or None if the error should propagate.
+    """
+    if not is_retryable(exc):
+        # The provider answered; a bad request says nothing about its health
+        breaker.record_success()
+        return None
+
+    breaker.record_failure()
+    if attempt >= policy.max_attempts:
+        return None
+
+    delay = policy.backoff(attempt)
+    server_delay = retry_after_seconds(exc)
+    if server_delay is not None:
+        if server_delay > policy.max_retry_after:
+            return None
+        delay = max(delay, server_delay)
+
+    registry.increment("llm_retries_total", endpoint=endpoint)
+    return delay
+
+
+async def _call_hedged_async(endpoint, fn, hedge_after):
+    """Async counterpart of _call_hedged: race a second fn() if the first is slow."""
+    first = asyncio.ensure_future(fn())
+    done, _ = await asyncio.wait({first}, timeout=hedge_after)
+    if done:
+        return first.result()
+
+    registry.increment("llm_hedged_requests_total", endpoint=endpoint)
+    pending = {first, asyncio.ensure_future(fn())}
+    error = None
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+                error = task.exception()
+        raise error
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+async def resilient_call_async(endpoint, fn, policy):
+    """
+    Async counterpart of resilient_call for the ASGI routes: fn() returns an
+    awaitable, and backoff waits yield to the event loop instead of holding a
+    worker. Shares circuit breakers and metrics with the sync path.
+    """
+    breaker = get_breaker(endpoint)
+    attempt = 0
+    while True:
+        attempt += 1
+        if not breaker.allow():
+            registry.increment("llm_circuit_rejected_total", endpoint=endpoint)
+            raise CircuitOpenError(endpoint, breaker.retry_after())
+
+        try:
+            if policy.hedge_after:
+                result = await _call_hedged_async(endpoint, fn, policy.hedge_after)
+            else:
+                result = await fn()
+        except Exception as e:
+            delay = _retry_delay(endpoint, breaker, policy, attempt, e)
+            if delay is None:
+                raise
+            await _async_sleep(delay)
+            continue
+
+        breaker.record_success()
+        return result
@@ -0,0 +1,106 @@
+# app/services/model_router.py
+
+import functools
+
+from flask import current_app, has_app_context
+
+from app.services.llm_metrics import registry, track_llm_call
+from app.services.llm_transport import resilient_call, resilient_call_async
+
+# Call types and their (primary, fallback) models when nothing is configured.
+# Structured end-of-conversation feedback keeps the larger model; short
+# coaching replies default to the smaller, faster one.
+DEFAULT_ROUTES = {
+    "feedback": ("gpt-4o", "gpt-4o-mini"),
+    "feedback_chat": ("gpt-4o-mini", "gpt-4o"),
+}
+
+# App config keys overriding the defaults, per call type
+CONFIG_KEYS = {
+    "feedback": ("FEEDBACK_MODEL", "FEEDBACK_FALLBACK_MODEL"),
+    "feedback_chat": ("FEEDBACK_CHAT_MODEL", "FEEDBACK_CHAT_FALLBACK_MODEL"),
+}
+
+
+def select_models(call_type, practice_case=None):
+    """
+    Return the ordered models to try for a call type: the primary model and,
+    if different, its fallback.
+
+    Resolution order, most specific first:
+    - practice_case.feedback_config["models"][call_type], either a model name
+      or {"primary": ..., "fallback": ...}
+    - app config (FEEDBACK_MODEL / FEEDBACK_FALLBACK_MODEL, FEEDBACK_CHAT_MODEL / ...)
+    - DEFAULT_ROUTES
+    """
+    primary, fallback = DEFAULT_ROUTES[call_type]
+
+    if has_app_context():
+        primary_key, fallback_key = CONFIG_KEYS[call_type]
+        primary = current_app.config.get(primary_key) or primary
+        fallback = current_app.config.get(fallback_key) or fallback
+
+    case_models = ((getattr(practice_case, "feedback_config", None) or {}).get("models") or {}).get(call_type)
+    if isinstance(case_models, str):
+        primary = case_models
+    elif isinstance(case_models, dict):
+        primary = case_models.get("primary") or primary
+        fallback = case_models.get("fallback", fallback)
+
+    return [primary] if not fallback or fallback == primary else [primary, fallback]
+
+
+def routed_completion(call_type, route, create, policy, practice_case=None, labels=None, models=None):
+    """
+    Run a chat completion for a call type, falling back to the secondary model
+    if the primary one times out or errors after its retries.
+
+    create(model) performs the upstream call and returns the response. Each
+    model has its own circuit breaker, so an outage of one model does not block
+    the fallback. models may be resolved up front with select_models (e.g.
+    before handing work to a background thread). Returns (response, model_used).
+    """
+    models = models or select_models(call_type, practice_case)
+    labels = labels or {}
+
+    for index, model in enumerate(models):
+        try:
+            with track_llm_call(route, model, practice_case=practice_case, **labels) as llm_call:
+                response = resilient_call(f"chat.completions:{model}", functools.partial(create, model), policy)
+                llm_call.record_usage(response)
+            return response, model
+        except Exception as e:
+            if index == len(models) - 1:
+                raise
+            registry.increment("llm_model_fallbacks_total", call_type=call_type, model=model)
+            if has_app_context():
+                current_app.logger.warning(
+                    f"⚠️ {call_type} call on {model} failed ({type(e).__name__}: {str(e)}); "
+                    f"falling back to {models[index + 1]}"
+                )
+
+
+async def routed_completion_async(call_type, route, create, policy, practice_case=None, labels=None, models=None):
+    """
+    Async counterpart of routed_completion for the ASGI routes: create(model)
+    returns an awaitable (e.g. an AsyncOpenAI call). Same fallback, breakers
+    and metrics. Returns (response, model_used).
+    """
+    models = models or select_models(call_type, practice_case)
+    labels = labels or {}
+
+    for index, model in enumerate(models):
+        try:
+            with track_llm_call(route, model, practice_case=practice_case, **labels) as llm_call:
+                response = await resilient_call_async(f"chat.completions:{model}", functools.partial(create, model), policy)
+                llm_call.record_usage(response)
+            return response, model
+        except Exception as e:
+            if index == len(models) - 1:
+                raise
+            registry.increment("llm_model_fallbacks_total", call_type=call_type, model=model)
+            if has_app_context():
+                current_app.logger.warning(
+                    f"⚠️ {call_type} call on {model} failed ({type(e).__name__}: {str(e)}); "
+                    f"falling back to {models[index + 1]}"
+                )
@@ -0,0 +1,104 @@
+# app/services/session_payloads.py
+
+import copy
+import hashlib
+import json
+import threading
+
+from cachetools import TTLCache
+
+from app.models import db, PracticeCase
+from app.services.llm_metrics import case_labels
+from app.services.voice_service import build_session_payload, clamp_speed
+
+# Speech rate the student client derives from PracticeCase.speaking_speed
+SPEAKING_SPEED_RATES = {"slow": 0.9, "normal": 1.0, "fast": 1.25}
+
+# Entries are checked against the case's updated_at on every read; the TTL
+# only bounds how long entries for unused cases stay in memory
+COMPILED_SESSION_TTL_SECONDS = 300
+
+
+class CompiledSession:
+    """
+    Everything needed to mint a realtime session for a practice case, built
+    once from the case row: the request payload (without speed), the speed the
+    student client will ask for, metrics labels, and a signature identifying
+    this exact configuration.
+    """
+
+    def __init__(self, practice_case):
+        self.case_id = practice_case.id
+        self.updated_at = practice_case.updated_at
+        self.published = practice_case.published
+        self.accessible_on = practice_case.accessible_on
+        self.has_prompt = bool(practice_case.system_prompt)
+        self.max_time = practice_case.max_time
+        self.payload = build_session_payload(
+            practice_case.system_prompt,
+            voice=practice_case.voice,
+            language_code=practice_case.language_code,
+        )
+        self.default_speed = SPEAKING_SPEED_RATES.get(practice_case.speaking_speed or "normal", 1.0)
+        self.labels = case_labels(practice_case)
+        self.signature = hashlib.sha256(
+            json.dumps(self.payload, sort_keys=True, ensure_ascii=False).encode("utf-8")
+        ).hexdigest()
+
+    def build(self, speed=None, instructions=None):
+        """A fresh copy of the payload with the (clamped) speed applied."""
+        payload = copy.deepcopy(self.payload)
+        if instructions is not None:
+            payload["instructions"] = instructions
+        speed = clamp_speed(speed)
+        if speed is not None:
+            payload["speed"] = speed
+        return payload
+
+
+_compiled = TTLCache(maxsize=1024, ttl=COMPILED_SESSION_TTL_SECONDS)
+_compiled_lock = threading.Lock()
+
+
+def get_compiled_session(case_id, practice_case=None):
+    """
+    Return the CompiledSession for a case, or None if the case does not exist.
+
+    A cached entry is only served while it matches the case's current
+    updated_at, so an edit handled by another worker is picked up at once.
+    Pass practice_case when the row is already loaded; otherwise the check
+    costs one scalar query.
+    """
+    with _compiled_lock:
+        compiled = _compiled.get(case_id)
+
+    if compiled:
+        if practice_case is not None:
+            updated_at = practice_case.updated_at
+        else:
+            updated_at = db.session.query(PracticeCase.updated_at).filter(PracticeCase.id == case_id).scalar()
+        if compiled.updated_at == updated_at:
+            return compiled
+
+    if practice_case is None:
+        practice_case = db.session.get(PracticeCase, case_id)
+        if practice_case is None:
+            invalidate_compiled_session(case_id)
+            return None
+
+    compiled = CompiledSession(practice_case)
+    with _compiled_lock:
+        _compiled[case_id] = compiled
+    return compiled
+
+
+def invalidate_compiled_session(case_id):
+    """Drop a case's compiled payload after it was edited, published or deleted."""
+    with _compiled_lock:
+        _compiled.pop(case_id, None)
+
+
+def reset_compiled_sessions():
+    """Forget every compiled payload. For tests."""
+    with _compiled_lock:
+        _compiled.clear()
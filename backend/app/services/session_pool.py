@@ -0,0 +1,214 @@
+# app/services/session_pool.py
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from flask import current_app
+
+from app.models import db, PracticeCase
+from app.services.llm_metrics import registry
+from app.services.session_payloads import get_compiled_session
+from app.services.voice_service import get_voice_service, clamp_speed
+
+
+class RealtimeSessionPool:
+    """
+    Small per-case pools of pre-minted realtime sessions.
+
+    Realtime client secrets are short-lived (about a minute), so sessions are
+    only minted for cases someone showed interest in recently: a student
+    opening the case page, a /session request, or the case becoming accessible.
+    Pools are refilled in the background while interest lasts; sessions whose
+    secret is about to expire, or that were minted from an older version of
+    the case, are reaped and never handed out.
+
+    Pools are per process, so every worker that saw the interest mints its own
+    sessions and most expire unused. Interest therefore lasts about one secret
+    lifetime, and the pool is off unless REALTIME_SESSION_POOL_ENABLED is set.
+    """
+
+    def __init__(self, target_size=1, min_remaining_seconds=15, interest_seconds=60, tick_seconds=10):
+        self.target_size = target_size
+        self.min_remaining_seconds = min_remaining_seconds
+        self.interest_seconds = interest_seconds
+        self.tick_seconds = tick_seconds
+        self._lock = threading.Lock()
+        self._pools = {}        # (case_id, speed) -> [(compiled signature, session_data)]
+        self._interest = {}     # (case_id, speed) -> monotonic time of last interest
+        self._refilling = set()
+        self._executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="session-pool")
+        self._app = None
+        self._last_accessible_check = None
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    def take(self, compiled, speed=None):
+        """
+        Pop a valid pre-minted session for a CompiledSession, or None on a miss.
+        Either way the pool is topped up in the background.
+        """
+        if not self._enabled():
+            return None
+
+        key = self._key(compiled.case_id, speed)
+        signature = compiled.signature
+        session_data = None
+        with self._lock:
+            entries = self._pools.get(key, [])
+            while entries:
+                entry_signature, candidate = entries.pop(0)
+                if entry_signature == signature and self._is_fresh(candidate):
+                    session_data = candidate
+                    break
+                registry.increment("realtime_session_pool_reaped_total")
+
+        registry.increment("realtime_session_pool_requests_total", result="hit" if session_data else "miss")
+        self._watch(key)
+        return session_data
+
+    def prewarm(self, compiled, speed=None):
+        """
+        Mark interest in a case (as a CompiledSession) and mint sessions for it
+        in the background, at the speed the student client will ask for unless
+        one is given.
+        """
+        if not self._enabled():
+            return
+        self._watch(self._key(compiled.case_id, speed if speed is not None else compiled.default_speed))
+
+    def reap(self):
+        """Drop sessions about to expire and forget cases nobody is looking at."""
+        now = time.monotonic()
+        reaped = 0
+        with self._lock:
+            for key in list(self._pools):
+                fresh = [entry for entry in self._pools[key] if self._is_fresh(entry[1])]
+                reaped += len(self._pools[key]) - len(fresh)
+                self._pools[key] = fresh
+            for key, last_seen in list(self._interest.items()):
+                if now - last_seen > self.interest_seconds:
+                    del self._interest[key]
+                    if not self._pools.get(key):
+                        self._pools.pop(key, None)
+        if reaped:
+            registry.increment("realtime_session_pool_reaped_total", reaped)
+        return reaped
+
+    def stats(self):
+        hits = registry.counter_value("realtime_session_pool_requests_total", result="hit")
+        misses = registry.counter_value("realtime_session_pool_requests_total", result="miss")
+        with self._lock:
+            pooled = sum(len(entries) for entries in self._pools.values())
+            watched = len(self._interest)
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / (hits + misses) if hits + misses else None,
+            "pooled_sessions": pooled,
+            "watched_cases": watched,
+            "reaped": registry.counter_value("realtime_session_pool_reaped_total"),
+        }
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _key(case_id, speed):
+        speed = clamp_speed(speed)
+        return case_id, round(speed, 2) if speed is not None else None
+
+    def _enabled(self):
+        return current_app.config.get("REALTIME_SESSION_POOL_ENABLED", False)
+
+    def _watch(self, key):
+        """Record interest in a pool and refill it in the background unless already refilling."""
+        with self._lock:
+            self._interest[key] = time.monotonic()
+            if key in self._refilling:
+                return
+            self._refilling.add(key)
+
+        self._ensure_started()
+        self._executor.submit(self._refill, key)
+
+    def _is_fresh(self, session_data):
+        return session_data["expires_at"] - time.time() > self.min_remaining_seconds
+
+    def _ensure_started(self):
+        """Start the background reaper on first use, bound to the current app."""
+        with self._lock:
+            if self._app is not None:
+                return
+            self._app = current_app._get_current_object()
+            self._last_accessible_check = datetime.now(timezone.utc)
+        threading.Thread(target=self._tick_forever, name="session-pool-reaper", daemon=True).start()
+
+    def _tick_forever(self):
+        while True:
+            time.sleep(self.tick_seconds)
+            with self._app.app_context():
+                try:
+                    self.reap()
+                    self._prewarm_newly_accessible()
+                    self._refill_watched()
+                except Exception as e:
+                    current_app.logger.error(f"❌ Realtime session pool tick failed: {str(e)}")
+                finally:
+                    db.session.remove()
+
+    def _prewarm_newly_accessible(self):
+        """Pre-warm published cases whose accessible_on passed since the last tick."""
+        now = datetime.now(timezone.utc)
+        since, self._last_accessible_check = self._last_accessible_check, now
+        cases = PracticeCase.query.filter(
+            PracticeCase.published == True,
+            PracticeCase.accessible_on > since,
+            PracticeCase.accessible_on <= now,
+        ).all()
+        for case in cases:
+            self.prewarm(get_compiled_session(case.id, practice_case=case))
+
+    def _refill_watched(self):
+        """Keep pools topped up for cases with recent interest, as secrets expire."""
+        with self._lock:
+            keys = [key for key in self._interest if key not in self._refilling]
+            self._refilling.update(keys)
+        for key in keys:
+            self._executor.submit(self._refill, key)
+
+    def _refill(self, key):
+        case_id, speed = key
+        try:
+            with self._app.app_context():
+                try:
+                    compiled = get_compiled_session(case_id)
+                    if not compiled or not compiled.has_prompt:
+                        return
+
+                    with self._lock:
+                        entries = [entry for entry in self._pools.get(key, [])
+                                   if entry[0] == compiled.signature and self._is_fresh(entry[1])]
+                        self._pools[key] = entries
+                        target_size = current_app.config.get("REALTIME_SESSION_POOL_SIZE", self.target_size)
+                        missing = target_size - len(entries)
+
+                    for _ in range(max(0, missing)):
+                        session_data = get_voice_service().start_session(compiled.build(speed), **compiled.labels)
+                        with self._lock:
+                            self._pools.setdefault(key, []).append((compiled.signature, session_data))
+                        registry.increment("realtime_session_pool_minted_total")
+                except Exception as e:
+                    current_app.logger.warning(f"⚠️ Failed to pre-warm realtime session for case {case_id}: {str(e)}")
+                finally:
+                    db.session.remove()
+        finally:
+            with self._lock:
+                self._refilling.discard(key)
+
+
+session_pool = RealtimeSessionPool()
@@ -0,0 +1,221 @@
+# app/services/session_registry.py
+
+from datetime import datetime, timedelta, timezone
+
+from flask import current_app
+from sqlalchemy import func
+
+from app.models import db, Institution, RealtimeSession
+from app.services.llm_metrics import registry
+
+# Seconds a queued client waits between polls, and how long an unpolled ticket keeps its place
+QUEUE_POLL_SECONDS = 3
+QUEUE_POLL_TIMEOUT = timedelta(seconds=30)
+
+# A slot lease outlives the case's max_time by this much, for reconnects and wrap-up
+LEASE_GRACE_SECONDS = 120
+
+# Session length assumed for wait estimates until an institution has finished sessions
+DEFAULT_SESSION_SECONDS = 300
+
+
+class Admission:
+    """
+    Outcome of admit(): an active slot, or a place in the institution's queue.
+    Plain values are kept so reading them never reloads the committed row.
+    """
+
+    def __init__(self, entry, admitted, position=None, eta_seconds=None):
+        self.entry = entry
+        self.admitted = admitted
+        self.ticket = entry.id
+        self.position = position
+        self.eta_seconds = eta_seconds
+
+    def to_dict(self):
+        return {
+            "status": RealtimeSession.ACTIVE if self.admitted else RealtimeSession.QUEUED,
+            "ticket": self.ticket,
+            "position": self.position,
+            "eta_seconds": self.eta_seconds,
+            "poll_after_seconds": QUEUE_POLL_SECONDS,
+        }
+
+
+def session_limit(institution_id):
+    """Concurrent session cap for an institution; 0 means unlimited."""
+    config = current_app.config
+    limits = config.get("REALTIME_SESSION_LIMITS") or {}
+    return int(limits.get(str(institution_id), config.get("REALTIME_SESSION_LIMIT", 0)))
+
+
+def _institution_filter(institution_id):
+    if institution_id is None:
+        return RealtimeSession.institution_id.is_(None)
+    return RealtimeSession.institution_id == institution_id
+
+
+def _lease_seconds(max_time):
+    ceiling = current_app.config.get("REALTIME_SESSION_MAX_SECONDS", 1800)
+    if not max_time:
+        return ceiling
+    return min(max_time + LEASE_GRACE_SECONDS, ceiling)
+
+
+def reap_expired(institution_id=None, now=None):
+    """
+    Mark active sessions whose lease ran out as expired, and queued tickets
+    nobody polled recently as abandoned. Scoped to one institution if given.
+    Does not commit; returns the number of rows reaped.
+    """
+    now = now or datetime.now(timezone.utc)
+
+    def scoped(status):
+        query = RealtimeSession.query.filter(RealtimeSession.status == status)
+        if institution_id is not None:
+            query = query.filter(_institution_filter(institution_id))
+        return query
+
+    expired = scoped(RealtimeSession.ACTIVE).filter(RealtimeSession.expires_at < now).update(
+        {RealtimeSession.status: RealtimeSession.EXPIRED, RealtimeSession.ended_at: now},
+        synchronize_session=False
+    )
+    abandoned = scoped(RealtimeSession.QUEUED).filter(RealtimeSession.last_polled_at < now - QUEUE_POLL_TIMEOUT).update(
+        {RealtimeSession.status: RealtimeSession.ABANDONED, RealtimeSession.ended_at: now},
+        synchronize_session=False
+    )
+    if expired:
+        registry.increment("realtime_sessions_reaped_total", expired, status=RealtimeSession.EXPIRED)
+    if abandoned:
+        registry.increment("realtime_sessions_reaped_total", abandoned, status=RealtimeSession.ABANDONED)
+    return expired + abandoned
+
+
+def estimate_wait(institution_id, position, limit):
+    """Seconds until the given queue position is served, from recent session lengths."""
+    recent = db.session.query(RealtimeSession.admitted_at, RealtimeSession.ended_at).filter(
+        _institution_filter(institution_id),
+        RealtimeSession.status == RealtimeSession.ENDED,
+        RealtimeSession.admitted_at.isnot(None),
+    ).order_by(RealtimeSession.ended_at.desc()).limit(50).all()
+
+    durations = [(ended - admitted).total_seconds() for admitted, ended in recent if ended and ended > admitted]
+    mean_duration = sum(durations) / len(durations) if durations else DEFAULT_SESSION_SECONDS
+    # Slots free up at roughly limit / mean_duration per second
+    return int(round(position * mean_duration / limit))
+
+
+def admit(user_id, institution_id, practice_case_id=None, max_time=None, ticket=None):
+    """
+    Take a realtime session slot for an institution, or wait in line for one.
+
+    Waiting requests are served first come, first served: a request is only
+    admitted while more slots are free than tickets queued ahead of it, so new
+    arrivals cannot overtake the queue. Pass the ticket from a queued response
+    to keep the place in line; a lost or abandoned ticket rejoins at the back.
+    Admission is serialized per institution by locking its row. Commits.
+    """
+    now = datetime.now(timezone.utc)
+    if institution_id is not None:
+        db.session.query(Institution.id).filter(Institution.id == institution_id).with_for_update().first()
+    reap_expired(institution_id, now)
+
+    entry = None
+    if ticket is not None:
+        entry = RealtimeSession.query.filter_by(id=ticket, user_id=user_id, status=RealtimeSession.QUEUED).first()
+
+    in_line = RealtimeSession.query.filter(_institution_filter(institution_id), RealtimeSession.status == RealtimeSession.QUEUED)
+    if entry is not None:
+        in_line = in_line.filter(RealtimeSession.id < entry.id)
+    ahead = in_line.count()
+
+    limit = session_limit(institution_id)
+    active = RealtimeSession.query.filter(
+        _institution_filter(institution_id), RealtimeSession.status == RealtimeSession.ACTIVE
+    ).count()
+
+    if entry is None:
+        entry = RealtimeSession(
+            institution_id=institution_id,
+            user_id=user_id,
+            practice_case_id=practice_case_id,
+            queued_at=now
+        )
+        db.session.add(entry)
+
+    position = eta_seconds = None
+    admitted = not limit or ahead < limit - active
+    if admitted:
+        entry.status = RealtimeSession.ACTIVE
+        entry.admitted_at = now
+        entry.expires_at = now + timedelta(seconds=_lease_seconds(max_time))
+        registry.increment("realtime_sessions_admitted_total", queued="true" if ticket is not None else "false")
+    else:
+        entry.status = RealtimeSession.QUEUED
+        entry.last_polled_at = now
+        position = ahead + 1
+        eta_seconds = estimate_wait(institution_id, position, limit)
+        if ticket is None:
+            registry.increment("realtime_sessions_queued_total")
+
+    db.session.flush()
+    admission = Admission(entry, admitted, position, eta_seconds)
+    db.session.commit()
+    return admission
+
+
+def activate(entry, session_data, conversation_id=None):
+    """Record the minted upstream session (and its conversation) on an admitted slot. Commits."""
+    entry.session_id = session_data.get("session_id")
+    if conversation_id is not None:
+        entry.conversation_id = conversation_id
+    db.session.commit()
+
+
+def release(entry, status=RealtimeSession.FAILED):
+    """Give an admitted slot back, e.g. when minting the session failed. Commits."""
+    entry.status = status
+    entry.ended_at = datetime.now(timezone.utc)
+    db.session.commit()
+
+
+def link_conversation_sessions(conversation):
+    """
+    Attach the student's active slots for the conversation's case that were
+    minted without a conversation id (the legacy /session route) to the
+    conversation, so ending it frees them. Does not commit.
+    """
+    return RealtimeSession.query.filter(
+        RealtimeSession.user_id == conversation.user_id,
+        RealtimeSession.practice_case_id == conversation.practice_case_id,
+        RealtimeSession.conversation_id.is_(None),
+        RealtimeSession.status == RealtimeSession.ACTIVE
+    ).update({RealtimeSession.conversation_id: conversation.id}, synchronize_session=False)
+
+
+def end_conversation_sessions(conversation_id):
+    """Free the slots held by a conversation's realtime sessions. Does not commit."""
+    return RealtimeSession.query.filter(
+        RealtimeSession.conversation_id == conversation_id,
+        RealtimeSession.status == RealtimeSession.ACTIVE
+    ).update(
+        {RealtimeSession.status: RealtimeSession.ENDED, RealtimeSession.ended_at: datetime.now(timezone.utc)},
+        synchronize_session=False
+    )
+
+
+def registry_stats():
+    """Active and queued session counts per institution."""
+    rows = db.session.query(
+        RealtimeSession.institution_id, RealtimeSession.status, func.count(RealtimeSession.id)
+    ).filter(
+        RealtimeSession.status.in_([RealtimeSession.ACTIVE, RealtimeSession.QUEUED])
+    ).group_by(RealtimeSession.institution_id, RealtimeSession.status).all()
+
+    stats = {}
+    for institution_id, status, count in rows:
+        entry = stats.setdefault(str(institution_id), {
+            "active": 0, "queued": 0, "limit": session_limit(institution_id)
+        })
+        entry[status] = count
+    return stats
@@ -1,8 +1,144 @@
 from flask import current_app
+import httpx
 import requests
 import os
-from datetime import datetime
-from app.models import PracticeCase, db
+import threading
+import time
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.util.retry import Retry
+from app.services.llm_metrics import track_llm_call, registry
+from app.services.llm_transport import resilient_call, resilient_call_async, REALTIME_SESSION_POLICY, TTS_POLICY
+
+# Voices offered in the case editor (served by /api/chatbot/voice/options)
+VOICE_OPTIONS = [
+    {"id": "alloy", "name": "Alloy", "description": "Neutral, balanced tone"},
+    {"id": "ash", "name": "Ash", "description": "Warm, friendly voice"},
+    {"id": "ballad", "name": "Ballad", "description": "Calm, soothing tone"},
+    {"id": "coral", "name": "Coral", "description": "Bright, energetic voice"},
+    {"id": "echo", "name": "Echo", "description": "Clear, professional tone"},
+    {"id": "sage", "name": "Sage", "description": "Wise, measured voice"},
+    {"id": "shimmer", "name": "Shimmer", "description": "Light, pleasant tone"},
+    {"id": "verse", "name": "Verse", "description": "Expressive, dynamic voice"}
+]
+DEFAULT_VOICE = "verse"
+
+# Voice previews: TTS model, output format and the sentence the instructor UI plays
+PREVIEW_MODEL = "gpt-4o-mini-tts"
+PREVIEW_FORMAT = "mp3"
+DEFAULT_PREVIEW_TEXT = (
+    "Hello! I'm here to help you practice your conversation skills. "
+    "Let's have a great learning session together."
+)
+
+# Realtime session settings shared by every practice case
+REALTIME_MODEL = "gpt-realtime"
+TRANSCRIPTION_MODEL = "whisper-1"
+DEFAULT_LANGUAGE_CODE = "en"
+TURN_DETECTION = {
+    "type": "server_vad",
+    "threshold": 0.75,
+    "prefix_padding_ms": 500,
+    "silence_duration_ms": 1000
+}
+
+
+def clamp_speed(speed):
+    """Clamp a TTS speed to the range the realtime API accepts, or None if not numeric."""
+    if isinstance(speed, bool) or not isinstance(speed, (int, float)):
+        return None
+    return max(0.25, min(1.5, float(speed)))
+
+
+def build_session_payload(instructions, voice=None, language_code=None, speed=None):
+    """The request body for POST /realtime/sessions."""
+    payload = {
+        # You can use the stable alias:
+        "model": REALTIME_MODEL,
+        "voice": voice or DEFAULT_VOICE,
+        "instructions": instructions,
+        "input_audio_transcription": {
+            "model": TRANSCRIPTION_MODEL,
+            "language": language_code or DEFAULT_LANGUAGE_CODE
+        },
+        "turn_detection": dict(TURN_DETECTION)
+    }
+
+    # include speed if provided
+    speed = clamp_speed(speed)
+    if speed is not None:
+        payload["speed"] = speed
+    return payload
+
+
+# Seconds allowed to establish a connection (TCP + TLS); read timeouts come from the transport policies
+CONNECT_TIMEOUT = 3.05
+
+# Set by _TimedHTTPSConnection.connect in the calling thread, so a request can
+# tell whether it opened a new connection or reused a pooled one
+_connect_state = threading.local()
+
+
+class _TimedConnectMixin:
+    """Records how long connect() (TCP, plus TLS for HTTPS) took."""
+
+    def connect(self):
+        started = time.perf_counter()
+        super().connect()
+        _connect_state.seconds = time.perf_counter() - started
+
+
+class _TimedHTTPConnection(_TimedConnectMixin, HTTPConnection):
+    pass
+
+
+class _TimedHTTPSConnection(_TimedConnectMixin, HTTPSConnection):
+    pass
+
+
+class _TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _TimedHTTPConnection
+
+
+class _TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _TimedHTTPSConnection
+
+
+class PooledAdapter(HTTPAdapter):
+    """HTTPAdapter whose pools time new connections."""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _TimedHTTPConnectionPool,
+            "https": _TimedHTTPSConnectionPool,
+        }
+
+
+def connection_stats():
+    """
+    Per-route connection reuse for voice API calls in this worker: how many
+    requests reused a pooled connection, the mean handshake time of the ones
+    that did not, and the handshake time saved by reuse (estimated from it).
+    """
+    stats = {}
+    for counter in registry.snapshot()["counters"]:
+        if counter["name"] not in ("voice_http_connections_reused_total", "voice_http_connections_opened_total"):
+            continue
+        route = counter["labels"]["route"]
+        entry = stats.setdefault(route, {"reused": 0, "opened": 0})
+        entry["reused" if counter["name"].endswith("reused_total") else "opened"] = counter["value"]
+
+    for route, entry in stats.items():
+        connect = registry.histogram_summary("voice_http_connect_seconds", route=route)
+        mean_connect = connect["mean"] if connect else None
+        total = entry["reused"] + entry["opened"]
+        entry["reuse_rate"] = entry["reused"] / total if total else None
+        entry["mean_connect_seconds"] = mean_connect
+        entry["estimated_saved_seconds"] = entry["reused"] * mean_connect if mean_connect else None
+    return stats
+
 
 class VoiceService:
     def __init__(self):
@@ -19,6 +155,42 @@ class VoiceService:
             "OpenAI-Beta": "realtime=v1", # TODO: Is this still needed?
         }
 
+        # One keep-alive session per process so "start speaking" does not pay a
+        # TLS handshake. The adapter never retries: the transport policy owns
+        # the single retry budget, so one call cannot multiply its attempts.
+        pool_size = int(os.getenv("VOICE_HTTP_POOL_SIZE", "20"))
+        adapter = PooledAdapter(
+            pool_connections=2,
+            pool_maxsize=pool_size,
+            max_retries=Retry(total=0, raise_on_status=False)
+        )
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        # Keep-alive pool for the ASGI routes, created on first use inside the event loop
+        self.pool_size = pool_size
+        self._async_client = None
+
+    def _request(self, route, method, url, read_timeout, **kwargs):
+        """
+        Send a request over the pooled session, raise for error statuses, and
+        record whether it reused a connection.
+        """
+        _connect_state.seconds = None
+        response = self.session.request(method, url, timeout=(CONNECT_TIMEOUT, read_timeout), **kwargs)
+
+        connect_seconds = _connect_state.seconds
+        if connect_seconds is None:
+            registry.increment("voice_http_connections_reused_total", route=route)
+        else:
+            registry.increment("voice_http_connections_opened_total", route=route)
+            registry.observe("voice_http_connect_seconds", connect_seconds, route=route)
+
+        response.raise_for_status()
+        return response
+
     def generate_preview(self, voice_id: str, text: str):
         """
         Generates a one-off audio preview using OpenAI's standard TTS API.
@@ -49,16 +221,19 @@ class VoiceService:
                 )
 
             payload = {
-                "model": "gpt-4o-mini-tts",  # Use the standard, fast TTS model
+                "model": PREVIEW_MODEL,  # Use the standard, fast TTS model
                 "voice": voice_id,
                 "input": text,
-                "response_format": "mp3",
+                "response_format": PREVIEW_FORMAT,
             }
             
-            response = requests.post(tts_url, headers=self.headers, json=payload, timeout=20)
-            
-            # Raise an HTTPError for bad responses (e.g., 400 for an invalid voice)
-            response.raise_for_status() 
+            def post_preview():
+                # Raises an HTTPError for bad responses (e.g., 400 for an invalid voice)
+                return self._request("voice_preview", "POST", tts_url, TTS_POLICY.timeout, json=payload)
+
+            with track_llm_call("voice_preview", payload["model"]) as llm_call:
+                response = resilient_call("audio.speech", post_preview, TTS_POLICY)
+                llm_call.record_response_time(response)
             
             return response.content
 
@@ -71,83 +246,98 @@ class VoiceService:
             return None
 
     def create_session(self, prompt_text, practice_case_id=None, speed: float | None = None):  # ← add speed
+        """
+        Mint a realtime session for prompt_text. With a practice_case_id the
+        case's compiled voice and language settings are used (see
+        app.services.session_payloads); otherwise the defaults.
+        """
+        from app.services.session_payloads import get_compiled_session
+
+        compiled = get_compiled_session(practice_case_id) if practice_case_id else None
+        if compiled:
+            return self.start_session(compiled.build(speed, instructions=prompt_text), **compiled.labels)
+        return self.start_session(build_session_payload(prompt_text, speed=speed))
+
+    def start_session(self, payload, case_id=None, institution_id=None):
+        """
+        Mint a realtime session from a ready-made payload (see build_session_payload).
+        case_id/institution_id are metrics labels only; nothing is read from the database.
+        """
         try:
-            voice = "verse"
-            language_code = "en"
-
-            if practice_case_id:
-                try:
-                    practice_case = PracticeCase.query.get(practice_case_id)
-                    if practice_case:
-                        voice = practice_case.voice or voice
-                        language_code = practice_case.language_code or language_code
-                        current_app.logger.info(
-                            f"Using voice={voice}, language_code={language_code} from practice case {practice_case_id}"
-                        )
-                except Exception as e:
-                    current_app.logger.error(f"Error fetching practice case settings: {str(e)}")
+            def post_session():
+                return self._request(
+                    "realtime_session",
+                    "POST",
+                    f"{self.api_base}/realtime/sessions",
+                    REALTIME_SESSION_POLICY.timeout,
+                    json=payload,
+                )
 
-            payload = {
-                # You can use the stable alias:
-                "model": "gpt-realtime",
-                "voice": voice,
-                "instructions": prompt_text,
-                "input_audio_transcription": {
-                    "model": "whisper-1",
-                    "language": language_code
-                },
-                "turn_detection": {
-                    "type": "server_vad",
-                    "threshold": 0.75,
-                    "prefix_padding_ms": 500,
-                    "silence_duration_ms": 1000
-                }
-            }
+            with track_llm_call("realtime_session", payload["model"], case_id=case_id, institution_id=institution_id) as llm_call:
+                response = resilient_call("realtime.sessions", post_session, REALTIME_SESSION_POLICY)
+                llm_call.record_response_time(response)
+            return self._session_result(response.json())
 
-            # include speed if provided
-            if isinstance(speed, (int, float)):
-                clamped = max(0.25, min(1.5, float(speed)))
-                payload["speed"] = clamped
-                current_app.logger.info(f"Including TTS speed={clamped}")
+        except requests.exceptions.RequestException as e:
+            current_app.logger.error(f"Failed to create session: {str(e)}")
+            raise Exception(f"Failed to create session: {str(e)}")
 
-            response = requests.post(
-                f"{self.api_base}/realtime/sessions",
+    def _get_async_client(self):
+        if self._async_client is None:
+            self._async_client = httpx.AsyncClient(
                 headers=self.headers,
-                json=payload,
-                timeout=10,
+                timeout=httpx.Timeout(REALTIME_SESSION_POLICY.timeout, connect=CONNECT_TIMEOUT),
+                limits=httpx.Limits(max_connections=self.pool_size, max_keepalive_connections=self.pool_size),
             )
+        return self._async_client
+
+    async def start_session_async(self, payload, case_id=None, institution_id=None):
+        """
+        Async counterpart of start_session for the ASGI routes; the request
+        waits on the event loop instead of holding a worker thread.
+        """
+        client = self._get_async_client()
 
+        async def post_session():
+            response = await client.post(f"{self.api_base}/realtime/sessions", json=payload)
             response.raise_for_status()
-            session_data = response.json()
-
-            session_id = session_data["id"]
-            client_secret = session_data["client_secret"]["value"]
-            expires_at = session_data["client_secret"]["expires_at"]
-            websocket_url = f"wss://api.openai.com/v1/realtime/sessions/{session_id}/ws"
-
-            return {
-                "session_id": session_id,
-                "client_secret": client_secret,
-                "expires_at": expires_at,
-                "websocket_url": websocket_url,
-            }
+            return response
 
-        except requests.exceptions.RequestException as e:
+        try:
+            with track_llm_call("realtime_session", payload["model"], case_id=case_id, institution_id=institution_id) as llm_call:
+                response = await resilient_call_async("realtime.sessions", post_session, REALTIME_SESSION_POLICY)
+                llm_call.record_response_time(response)
+            return self._session_result(response.json())
+
+        except httpx.HTTPError as e:
             current_app.logger.error(f"Failed to create session: {str(e)}")
             raise Exception(f"Failed to create session: {str(e)}")
 
+    @staticmethod
+    def _session_result(session_data):
+        """The fields of a realtime session response the student client needs."""
+        session_id = session_data["id"]
+        return {
+            "session_id": session_id,
+            "client_secret": session_data["client_secret"]["value"],
+            "expires_at": session_data["client_secret"]["expires_at"],
+            "websocket_url": f"wss://api.openai.com/v1/realtime/sessions/{session_id}/ws",
+        }
+
     def end_session(self, session_id):
         """
         End a realtime conversation session.
         """
-        try:
-            response = requests.delete(
+        def delete_session():
+            return self._request(
+                "end_session",
+                "DELETE",
                 f"{self.api_base}/realtime/sessions/{session_id}",
-                headers=self.headers,
-                timeout=10,
+                REALTIME_SESSION_POLICY.timeout,
             )
 
-            response.raise_for_status()
+        try:
+            resilient_call("realtime.sessions", delete_session, REALTIME_SESSION_POLICY)
             current_app.logger.info(f"Ended realtime session: {session_id}")
             return True
 
@@ -159,16 +349,29 @@ class VoiceService:
         """
         Get the status of a realtime session.
         """
-        try:
-            response = requests.get(
+        def get_session():
+            return self._request(
+                "session_status",
+                "GET",
                 f"{self.api_base}/realtime/sessions/{session_id}",
-                headers=self.headers,
-                timeout=10,
+                REALTIME_SESSION_POLICY.timeout,
             )
 
-            response.raise_for_status()
-            return response.json()
+        try:
+            return resilient_call("realtime.sessions", get_session, REALTIME_SESSION_POLICY).json()
 
         except Exception as e:
             current_app.logger.error(f"Error checking session {session_id}: {str(e)}")
-            raise
\ No newline at end of file
+            raise
+
+_shared_voice_service = None
+_shared_voice_service_lock = threading.Lock()
+
+
+def get_voice_service():
+    """Process-wide VoiceService, so every caller shares one connection pool."""
+    global _shared_voice_service
+    with _shared_voice_service_lock:
+        if _shared_voice_service is None:
+            _shared_voice_service = VoiceService()
+        return _shared_voice_service
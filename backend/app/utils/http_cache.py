@@ -0,0 +1,69 @@
+import hashlib
+from functools import wraps
+
+from flask import Response, current_app, make_response, request
+from flask_jwt_extended import get_jwt_identity
+
+# Authenticated reads are per user: browsers keep them privately and revalidate every time
+REVALIDATE_HEADERS = {"Cache-Control": "private, no-cache", "Vary": "Authorization"}
+
+
+def compute_etag(version):
+    """
+    Strong ETag for the current request from a cheap version signal (anything
+    with a stable repr). The path with its query string, the JWT identity and
+    ETAG_SALT (the deploy) are mixed in, so equal signals never collide across
+    users, filters or response formats.
+    """
+    identity = get_jwt_identity() if request.headers.get("Authorization") else None
+    key = "\n".join([
+        current_app.config.get("ETAG_SALT") or "",
+        request.full_path,
+        str(identity),
+        repr(version),
+    ])
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+
+def not_modified(etag):
+    """A 304 response if the request's If-None-Match already holds etag, else None."""
+    if etag in request.if_none_match:
+        response = Response(status=304, headers=REVALIDATE_HEADERS)
+        response.set_etag(etag)
+        return response
+    return None
+
+
+def with_etag(rv, etag):
+    """Attach etag and revalidation headers to a successful view return value."""
+    response = make_response(rv)
+    if response.status_code == 200:
+        response.set_etag(etag)
+        response.headers.update(REVALIDATE_HEADERS)
+    return response
+
+
+def etag_cached(version_fn):
+    """
+    Conditional GET for a view. version_fn(*args, **kwargs) is called with the
+    view's arguments and returns a cheap version signal (max updated_at, row
+    counts, ...) that changes whenever the response would. A request whose
+    If-None-Match matches gets a 304 before the view runs; otherwise the view
+    runs and its 200 response carries the ETag. Place it under @jwt_required().
+    If version_fn returns None or fails, the view runs uncached.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            try:
+                version = version_fn(*args, **kwargs)
+            except Exception as e:
+                current_app.logger.warning(f"Could not compute ETag for {request.path}: {str(e)}")
+                version = None
+            if version is None:
+                return view(*args, **kwargs)
+
+            etag = compute_etag(version)
+            return not_modified(etag) or with_etag(view(*args, **kwargs), etag)
+        return wrapper
+    return decorator
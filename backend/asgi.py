@@ -0,0 +1,7 @@
+from app import create_app
+from app.async_routes import create_asgi_app
+
+# Async routes for the OpenAI-bound endpoints, with everything else served by Flask.
+# Run with: gunicorn asgi:app -k uvicorn.workers.UvicornWorker
+flask_app = create_app()
+app = create_asgi_app(flask_app)
@@ -0,0 +1,71 @@
+"""Add full-text search vector for the case library
+
+Revision ID: 9c4e1a7d3b2f
+Revises: 7b3e9d2f1c4a
+Create Date: 2025-10-29 10:12:44.518302
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '9c4e1a7d3b2f'
+down_revision = '7b3e9d2f1c4a'
+branch_labels = None
+depends_on = None
+
+# Snapshot of app.services.library_search.LANGUAGE_CONFIGS at the time of this migration
+LANGUAGE_CONFIGS = [
+    "danish", "dutch", "english", "finnish", "french", "german", "hungarian", "italian",
+    "norwegian", "portuguese", "romanian", "russian", "spanish", "swedish", "turkish",
+]
+
+
+def _weighted(expression, weight):
+    return (
+        f"setweight(to_tsvector(config, {expression}), '{weight}') || "
+        f"setweight(to_tsvector('simple', {expression}), '{weight}')"
+    )
+
+
+def upgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        # SQLite keeps its FTS5 index in a table created on first use
+        with op.batch_alter_table('practice_cases', schema=None) as batch_op:
+            batch_op.add_column(sa.Column('search_vector', sa.Text(), nullable=True))
+        return
+
+    op.add_column('practice_cases', sa.Column('search_vector', postgresql.TSVECTOR(), nullable=True))
+    op.create_index('ix_practice_cases_search_vector', 'practice_cases', ['search_vector'], unique=False, postgresql_using='gin')
+
+    # Index the cases already in the library
+    languages = ", ".join(f"'{language}'" for language in LANGUAGE_CONFIGS)
+    # library_tags is a JSON array in a text column; strip the JSON punctuation
+    tags = r"""regexp_replace(coalesce(library_tags, ''), '[\[\]",]', ' ', 'g')"""
+    op.execute(f"""
+        UPDATE practice_cases SET search_vector =
+            {_weighted("coalesce(title, '')", "A")} ||
+            {_weighted(tags, "B")} ||
+            {_weighted("coalesce(author_name, '')", "B")} ||
+            {_weighted("coalesce(description, '')", "C")} ||
+            {_weighted("coalesce(situation_instructions, '')", "D")}
+        FROM (
+            SELECT id AS case_id,
+                   CAST(CASE WHEN lower(trim(target_language)) IN ({languages})
+                             THEN lower(trim(target_language)) ELSE 'english' END AS regconfig) AS config
+            FROM practice_cases
+        ) AS configs
+        WHERE configs.case_id = practice_cases.id AND practice_cases.submitted_to_library
+    """)
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        with op.batch_alter_table('practice_cases', schema=None) as batch_op:
+            batch_op.drop_column('search_vector')
+        return
+
+    op.drop_index('ix_practice_cases_search_vector', table_name='practice_cases', postgresql_using='gin')
+    op.drop_column('practice_cases', 'search_vector')
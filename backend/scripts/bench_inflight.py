@@ -0,0 +1,179 @@
+"""
+Compare how many slow OpenAI calls one worker keeps in flight under the
+sync Flask server (wsgi:app) and the ASGI entry point (asgi:app).
+
+A stub upstream stands in for OpenAI: it answers every chat completion after
+--delay seconds and records the peak number of requests it held at once.
+Both servers run one gunicorn worker against a throwaway SQLite database
+seeded with one feedback conversation per request, and each receives
+--requests concurrent POSTs to the dialogic feedback chat endpoint.
+
+    python scripts/bench_inflight.py --requests 50 --delay 2
+"""
+
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+
+class SlowUpstreamHandler(BaseHTTPRequestHandler):
+    """Answers any POST with a canned chat completion after the configured delay."""
+
+    def do_POST(self):
+        server = self.server
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        with server.lock:
+            server.in_flight += 1
+            server.peak = max(server.peak, server.in_flight)
+        time.sleep(server.delay)
+        with server.lock:
+            server.in_flight -= 1
+
+        body = json.dumps({
+            "id": "chatcmpl-bench",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": "gpt-4o-mini",
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": "Nice work - try one more sentence."},
+                "finish_reason": "stop"
+            }],
+            "usage": {"prompt_tokens": 10, "completion_tokens": 10, "total_tokens": 20}
+        }).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def seed(env, count):
+    """Create the schema and one feedback conversation per request; returns (token, ids)."""
+    os.environ.update(env)
+    from flask_jwt_extended import create_access_token
+    from app import create_app
+    from app.models import db, User, Conversation, FeedbackConversation
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        user = User()
+        user.email = "bench@example.com"
+        user.set_password("bench")
+        db.session.add(user)
+        db.session.flush()
+
+        feedback_ids = []
+        for _ in range(count):
+            conversation = Conversation(user_id=user.id)
+            db.session.add(conversation)
+            db.session.flush()
+            feedback_conv = FeedbackConversation(original_conversation_id=conversation.id, user_id=user.id)
+            db.session.add(feedback_conv)
+            db.session.flush()
+            feedback_ids.append(feedback_conv.id)
+        db.session.commit()
+        return create_access_token(identity=str(user.id)), feedback_ids
+
+
+def wait_until_up(url, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            requests.get(url, timeout=1)
+            return
+        except requests.RequestException:
+            # Refused before gunicorn binds, read timeouts while the worker boots
+            time.sleep(0.2)
+    raise RuntimeError(f"Server at {url} did not start")
+
+
+def run(label, gunicorn_args, env, upstream, token, feedback_ids):
+    port = free_port()
+    server = subprocess.Popen(
+        ["gunicorn", "-w", "1", "-b", f"127.0.0.1:{port}", *gunicorn_args],
+        cwd=BACKEND_DIR, env={**os.environ, **env},
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    base = f"http://127.0.0.1:{port}"
+    try:
+        wait_until_up(base)
+        upstream.peak = 0
+
+        def chat(feedback_id):
+            response = requests.post(
+                f"{base}/api/dialogic_feedback/feedback/{feedback_id}/chat",
+                json={"message": "How can I improve?"},
+                headers={"Authorization": f"Bearer {token}"},
+                timeout=600
+            )
+            return response.status_code
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=len(feedback_ids)) as pool:
+            statuses = list(pool.map(chat, feedback_ids))
+        elapsed = time.perf_counter() - started
+    finally:
+        server.terminate()
+        server.wait()
+
+    ok = sum(1 for status in statuses if status == 200)
+    print(f"{label:<6} peak in-flight upstream: {upstream.peak:>4}   "
+          f"wall: {elapsed:6.1f}s   throughput: {len(statuses) / elapsed:6.2f} req/s   ok: {ok}/{len(statuses)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=50, help="concurrent chat requests per server")
+    parser.add_argument("--delay", type=float, default=2.0, help="seconds the stub upstream takes per call")
+    args = parser.parse_args()
+
+    upstream = ThreadingHTTPServer(("127.0.0.1", 0), SlowUpstreamHandler)
+    upstream.lock = threading.Lock()
+    upstream.in_flight = upstream.peak = 0
+    upstream.delay = args.delay
+    threading.Thread(target=upstream.serve_forever, daemon=True).start()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = {
+            "DATABASE_URL": f"sqlite:///{os.path.join(tmp, 'bench.db')}",
+            "OPENAI_API_KEY": os.getenv("OPENAI_API_KEY", "sk-bench"),
+            "OPENAI_BASE_URL": f"http://127.0.0.1:{upstream.server_address[1]}/v1",
+            "SECRET_KEY": os.getenv("SECRET_KEY", "bench-secret"),
+            "SUGGESTION_PREFETCH_ENABLED": "false",
+            "REALTIME_SESSION_POOL_ENABLED": "false",
+        }
+        token, feedback_ids = seed(env, args.requests * 2)
+
+        print(f"{args.requests} concurrent requests, upstream delay {args.delay}s, one worker each")
+        run("wsgi", ["wsgi:app"], env, upstream, token, feedback_ids[:args.requests])
+        run("asgi", ["-k", "uvicorn.workers.UvicornWorker", "asgi:app"], env, upstream, token, feedback_ids[args.requests:])
+
+    upstream.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -5,6 +5,9 @@ import sqlalchemy
 from sqlalchemy.orm import scoped_session, sessionmaker
 from app import create_app
 from app.models import db
+from app.services.library_counters import download_folder
+from app.services.llm_transport import reset_breakers
+from app.services.session_payloads import reset_compiled_sessions
 
 # Load environment variables
 load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), "../.env"))
@@ -58,3 +61,14 @@ def client(app):
     with app.test_client() as client:
         with app.app_context():
             yield client
+
+
+@pytest.fixture(autouse=True)
+def fresh_process_state():
+    """Reset process-wide caches and circuit breakers so tests cannot leak into each other."""
+    reset_breakers()
+    reset_compiled_sessions()
+    yield
+    reset_breakers()
+    reset_compiled_sessions()
+    download_folder.cancel()
@@ -0,0 +1,37 @@
+import os
+import time
+
+from app.services.audio_cache import DiskAudioCache, audio_cache_key
+
+
+def test_cache_key_covers_every_input():
+    base = audio_cache_key("gpt-4o-mini-tts", "verse", "Hola", "mp3")
+    assert base == audio_cache_key("gpt-4o-mini-tts", "verse", "Hola", "mp3")
+    assert base != audio_cache_key("gpt-4o-mini-tts", "ash", "Hola", "mp3")
+    assert base != audio_cache_key("gpt-4o-mini-tts", "verse", "Hola!", "mp3")
+    assert base != audio_cache_key("gpt-4o-mini-tts", "verse", "Hola", "opus")
+    assert base != audio_cache_key("tts-1", "verse", "Hola", "mp3")
+
+
+def test_disk_cache_round_trip(tmp_path):
+    cache = DiskAudioCache(str(tmp_path), max_bytes=1024)
+    assert cache.get("abc") is None
+    cache.put("abc", b"audio")
+    assert cache.get("abc") == b"audio"
+
+
+def test_disk_cache_evicts_least_recently_used(tmp_path):
+    cache = DiskAudioCache(str(tmp_path), max_bytes=250)
+    cache.put("first", b"a" * 100)
+    cache.put("second", b"b" * 100)
+
+    # Make "first" the most recently used, then push the cache over its bound
+    past = time.time() - 60
+    os.utime(tmp_path / "second.audio", (past, past))
+    os.utime(tmp_path / "first.audio", (past - 60, past - 60))
+    assert cache.get("first") is not None
+    cache.put("third", b"c" * 100)
+
+    assert cache.get("second") is None
+    assert cache.get("first") == b"a" * 100
+    assert cache.get("third") == b"c" * 100
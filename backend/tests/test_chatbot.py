@@ -140,7 +140,7 @@ def test_create_session_unauthorized(client, setup_user_and_case):
 
 def test_create_session_success(client, setup_user_and_case):
     user_id, case_id = setup_user_and_case
-    with patch("app.routes.chatbot.voice_service.VoiceService.create_session", return_value={"session_id": "abc123"}):
+    with patch("app.routes.chatbot.voice_service.start_session", return_value={"session_id": "abc123"}):
         response = client.post(
             "/api/chatbot/session",
             json={"user_id": user_id, "practice_case_id": case_id}
@@ -208,3 +208,54 @@ def test_proxy_openai_realtime(client):
     response = client.post("/api/chatbot/realtime")
     assert response.status_code == 400
     assert "not intended for direct SDP exchange" in response.get_json()["error"]
+
+
+def test_bootstrap_requires_auth(client):
+    response = client.post("/api/chatbot/bootstrap", json={"practice_case_id": 1})
+    assert response.status_code == 401
+
+
+def test_bootstrap_success(client, setup_user_and_case):
+    from flask_jwt_extended import create_access_token
+
+    user_id, case_id = setup_user_and_case
+    with client.application.app_context():
+        case = db.session.get(PracticeCase, case_id)
+        case.published = True
+        case.accessible_on = datetime(2025, 1, 1, tzinfo=timezone.utc)
+        db.session.commit()
+        token = create_access_token(identity=str(user_id))
+
+    session_data = {"session_id": "sess", "client_secret": "secret", "expires_at": 0}
+    with patch("app.routes.chatbot.session_pool.take", return_value=None), \
+         patch("app.routes.chatbot.voice_service.start_session", return_value=session_data):
+        response = client.post(
+            "/api/chatbot/bootstrap",
+            json={"practice_case_id": case_id},
+            headers={"Authorization": f"Bearer {token}"},
+        )
+
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data["conversation_id"]
+    assert data["session"]["client_secret"] == "secret"
+    assert data["case"]["id"] == case_id
+    assert "Server-Timing" in response.headers
+
+
+def test_authorize_case_start_accepts_naive_accessible_on(app, setup_user_and_case):
+    from app.routes.chatbot import authorize_case_start
+
+    user_id, case_id = setup_user_and_case
+    with app.app_context():
+        case = db.session.get(PracticeCase, case_id)
+        case.published = True
+
+        # Drivers without time zone support hand back naive UTC values
+        case.accessible_on = datetime(2025, 1, 1)
+        loaded, error = authorize_case_start(user_id, case_id)
+        assert error is None and loaded[1] is case
+
+        case.accessible_on = datetime(2999, 1, 1)
+        loaded, error = authorize_case_start(user_id, case_id)
+        assert loaded is None and error[1] == 403
@@ -0,0 +1,153 @@
+import json
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import pytest
+
+from app.models import db, User, Institution, Class, PracticeCase, Conversation, FeedbackConversation
+from app.services import feedback_regeneration
+from app.services.feedback_regeneration import FeedbackRegenerator
+
+
+@pytest.fixture
+def conversations(app):
+    """Three completed conversations; the first already has json_v2 feedback."""
+    institution = Institution(name="Regeneration University")
+    db.session.add(institution)
+    db.session.flush()
+    klass = Class(course_code="SPAN201", title="Spanish II", institution_id=institution.id)
+    user = User(email="regen@example.com")
+    user.set_password("pw123")
+    db.session.add_all([klass, user])
+    db.session.flush()
+    case = PracticeCase(class_id=klass.id, title="Pharmacy", system_prompt="Prompt", feedback_prompt="Grade it", max_time=300)
+    db.session.add(case)
+    db.session.flush()
+
+    conversation_list = [
+        Conversation(user_id=user.id, practice_case_id=case.id, completed=True) for _ in range(3)
+    ]
+    db.session.add_all(conversation_list)
+    db.session.flush()
+    db.session.add(FeedbackConversation(
+        original_conversation_id=conversation_list[0].id,
+        user_id=user.id,
+        feedback_version="json_v2_fallback"
+    ))
+    db.session.commit()
+    return [conversation.id for conversation in conversation_list]
+
+
+@pytest.fixture
+def written(monkeypatch):
+    rows = []
+    monkeypatch.setattr(FeedbackRegenerator, "write_results", lambda self, results: rows.extend(results))
+    return rows
+
+
+def test_resume_skips_conversations_with_feedback_for_the_version(app, conversations):
+    regenerator = FeedbackRegenerator("json_v2", chunk_size=2)
+
+    resumed = [conversation.id for conversation in regenerator.select_conversations()]
+    assert resumed == conversations[1:]
+
+    everything = [conversation.id for conversation in regenerator.select_conversations(resume=False)]
+    assert everything == conversations
+    assert [c.id for c in FeedbackRegenerator("json_v3").select_conversations()] == conversations
+
+
+def test_import_batch_resumes_and_reads_both_result_shapes(app, conversations, written, tmp_path):
+    done, top_level, nested = conversations
+    results = tmp_path / "results.jsonl"
+    results.write_text("\n".join(json.dumps(line) for line in [
+        {"custom_id": f"conversation-{done}", "content": "{}"},
+        {"custom_id": f"conversation-{top_level}", "content": "Top level"},
+        {"custom_id": f"conversation-{nested}", "response": {"body": {"choices": [{"message": {"content": "Nested"}}]}}},
+        {"custom_id": "request-7", "content": "Not ours"},
+        {"custom_id": "conversation-99", "response": {"body": {"choices": []}}},
+    ]) + "\n")
+
+    stats = FeedbackRegenerator("json_v2", chunk_size=10).import_batch(str(results))
+
+    assert sorted((conversation_id, content) for conversation_id, _, content in written) == [
+        (top_level, "Top level"), (nested, "Nested")
+    ]
+    assert stats["skipped"] == 1
+    assert stats["failed"] == 2
+
+
+def test_parse_result_line():
+    parse = FeedbackRegenerator._parse_result_line
+    assert parse({"custom_id": "conversation-12", "content": "Hi"}) == (12, "Hi")
+    assert parse({"custom_id": "conversation-12", "response": {"body": {"choices": [{"message": {"content": "Hi"}}]}}}) == (12, "Hi")
+    assert parse({"custom_id": "conversation-12", "response": {"body": None}}) == (12, None)
+    assert parse({"custom_id": "batch-12", "content": "Hi"}) == (None, None)
+    assert parse({}) == (None, None)
+
+
+def test_cli_parses_options(app, monkeypatch):
+    created = {}
+
+    class RecordingRegenerator:
+        def __init__(self, feedback_version, **kwargs):
+            created.update(kwargs, feedback_version=feedback_version)
+
+        def select_conversations(self, **filters):
+            created["filters"] = filters
+            return []
+
+        def run(self, conversations):
+            return {"generated": 0}
+
+    monkeypatch.setattr(feedback_regeneration, "FeedbackRegenerator", RecordingRegenerator)
+
+    result = app.test_cli_runner().invoke(args=[
+        "regenerate-feedback", "--feedback-version", "json_v2", "--model", "gpt-4o-mini",
+        "--class-id", "3", "--since", "2025-01-01", "--retry-budget", "5", "--no-resume",
+    ])
+
+    assert result.exit_code == 0, result.output
+    assert created["feedback_version"] == "json_v2"
+    assert created["model"] == "gpt-4o-mini"
+    assert created["retry_budget"] == 5
+    assert created["filters"]["class_id"] == 3
+    assert created["filters"]["since"] == datetime(2025, 1, 1, tzinfo=timezone.utc)
+    assert created["filters"]["until"] is None
+    assert created["filters"]["resume"] is False
+
+
+def test_exhausted_retry_budget_records_failures(app, monkeypatch, written):
+    attempts = []
+
+    class FailingCompletions:
+        async def create(self, model, messages):
+            attempts.append(messages[0]["content"])
+            raise RuntimeError("upstream unavailable")
+
+    class FailingClient:
+        def __init__(self, **kwargs):
+            self.chat = SimpleNamespace(completions=FailingCompletions())
+
+        async def close(self):
+            pass
+
+    monkeypatch.setattr(feedback_regeneration, "AsyncOpenAI", FailingClient)
+    monkeypatch.setattr(feedback_regeneration, "build_feedback_messages", lambda case, messages: messages)
+    monkeypatch.setattr(feedback_regeneration.random, "uniform", lambda low, high: 0)
+    monkeypatch.setattr(feedback_regeneration, "flush_usage", lambda: None)
+
+    conversation_list = [
+        SimpleNamespace(id=conversation_id, user_id=1, practice_case=None,
+                        get_messages_history=lambda conversation_id=conversation_id: [{"role": "user", "content": str(conversation_id)}])
+        for conversation_id in (1, 2)
+    ]
+    regenerator = FeedbackRegenerator("json_v2", concurrency=1, max_attempts=3, retry_budget=1)
+
+    with app.app_context():
+        stats = regenerator.run(conversation_list)
+
+    # One retry in the whole run, then every conversation gives up on its first failure
+    assert len(attempts) == 3
+    assert regenerator.retry_budget.remaining == 0
+    assert stats["failed"] == 2
+    assert written == []
@@ -0,0 +1,54 @@
+import io
+
+from PIL import Image
+
+from app.services.image_derivatives import (
+    build_derivatives, available_formats, content_hash, DERIVATIVE_WIDTHS, IMMUTABLE_CACHE_CONTROL
+)
+from app.services.image_service import ImageService
+
+
+def png(width=1024, height=1024):
+    buffer = io.BytesIO()
+    Image.new("RGB", (width, height), (200, 120, 40)).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def test_derivatives_cover_each_width_and_format():
+    derivatives, placeholder = build_derivatives(png())
+
+    assert {(d["width"], d["format"]) for d in derivatives} == {
+        (width, format_name) for width in DERIVATIVE_WIDTHS for format_name in available_formats()
+    }
+    for derivative in derivatives:
+        with Image.open(io.BytesIO(derivative["data"])) as image:
+            assert image.width == derivative["width"]
+    assert placeholder.startswith("data:image/webp;base64,")
+    assert len(placeholder) < 1000
+
+
+def test_small_images_are_not_upscaled():
+    derivatives, _ = build_derivatives(png(400, 300))
+    assert sorted({d["width"] for d in derivatives}) == [320, 400]
+
+
+def test_upload_uses_content_hash_keys_and_immutable_caching(app, monkeypatch):
+    monkeypatch.setenv("AWS_S3_BUCKET_NAME", "cases")
+    puts = []
+
+    class FakeS3:
+        def put_object(self, **kwargs):
+            puts.append(kwargs)
+
+    monkeypatch.setattr(ImageService, "_get_s3_client", staticmethod(lambda: FakeS3()))
+
+    data = png()
+    with app.app_context():
+        uploaded = ImageService._upload_to_s3(data, case_id=1)
+
+    digest = content_hash(data)
+    assert uploaded["content_hash"] == digest
+    assert uploaded["image_url"].endswith(f"/practice-cases/{digest}.png")
+    assert len(uploaded["variants"]) == len(DERIVATIVE_WIDTHS) * len(available_formats())
+    assert all(f"/practice-cases/{digest}/" in variant["url"] for variant in uploaded["variants"])
+    assert all(put["CacheControl"] == IMMUTABLE_CACHE_CONTROL for put in puts)
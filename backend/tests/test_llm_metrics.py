@@ -0,0 +1,41 @@
+import pytest
+from app.services.llm_metrics import Histogram, MetricsRegistry, estimate_cost, track_llm_call, registry
+
+
+def test_histogram_percentiles():
+    histogram = Histogram(buckets=(1, 2, 4, float("inf")))
+    for value in [0.5] * 50 + [1.5] * 45 + [3.0] * 5:
+        histogram.observe(value)
+
+    summary = histogram.to_dict()
+    assert summary["count"] == 100
+    assert summary["p50"] <= 1
+    assert 1 < summary["p95"] <= 2
+    assert 2 < summary["p99"] <= 4
+
+
+def test_registry_counters_are_labelled():
+    metrics = MetricsRegistry()
+    metrics.increment("llm_calls_total", route="end_conversation", model="gpt-4o")
+    metrics.increment("llm_calls_total", route="end_conversation", model="gpt-4o")
+    metrics.increment("llm_calls_total", route="voice_preview", model="gpt-4o-mini-tts")
+
+    assert metrics.counter_value("llm_calls_total", route="end_conversation", model="gpt-4o") == 2
+    assert metrics.counter_value("llm_calls_total", model="gpt-4o-mini-tts", route="voice_preview") == 1
+
+
+def test_estimate_cost_discounts_cached_tokens():
+    full = estimate_cost("gpt-4o", prompt_tokens=1_000_000, completion_tokens=0)
+    cached = estimate_cost("gpt-4o", prompt_tokens=1_000_000, completion_tokens=0, cached_tokens=1_000_000)
+    assert full == pytest.approx(2.50)
+    assert cached == pytest.approx(1.25)
+    assert estimate_cost("unknown-model", 1000, 1000) == 0.0
+
+
+def test_track_llm_call_records_errors(app):
+    with app.app_context():
+        with pytest.raises(RuntimeError):
+            with track_llm_call("test_route", "gpt-4o", case_id=1, institution_id=1):
+                raise RuntimeError("upstream failed")
+
+        assert registry.counter_value("llm_errors_total", route="test_route", model="gpt-4o", error="RuntimeError") >= 1
@@ -0,0 +1,164 @@
+import asyncio
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import pytest
+import requests
+
+from app.services import llm_transport
+from app.services.llm_transport import (
+    CircuitOpenError,
+    TransportPolicy,
+    get_breaker,
+    resilient_call,
+    resilient_call_async,
+)
+
+
+class FaultInjectingHandler(BaseHTTPRequestHandler):
+    """Replies with the next scripted (status, headers, delay) fault, then 200s."""
+
+    def do_POST(self):
+        server = self.server
+        with server.lock:
+            server.hits += 1
+            fault = server.script.pop(0) if server.script else (200, {}, 0)
+        status, headers, delay = fault
+        if delay:
+            time.sleep(delay)
+        body = b'{"ok": true}'
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FaultInjectingHandler)
+    server.lock = threading.Lock()
+    server.hits = 0
+    server.script = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    server.url = f"http://127.0.0.1:{server.server_address[1]}/v1/test"
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    recorded = []
+    monkeypatch.setattr(llm_transport, "_sleep", recorded.append)
+    return recorded
+
+
+def post(url):
+    response = requests.post(url, json={}, timeout=5)
+    response.raise_for_status()
+    return response.json()
+
+
+def test_retries_server_errors_until_success(stub, sleeps):
+    stub.script = [(503, {}, 0), (502, {}, 0)]
+    policy = TransportPolicy(max_attempts=3, base_delay=0.01)
+
+    assert resilient_call("test.retry", lambda: post(stub.url), policy) == {"ok": True}
+    assert stub.hits == 3
+    assert len(sleeps) == 2
+
+
+def test_honors_retry_after_header(stub, sleeps):
+    stub.script = [(429, {"Retry-After": "2"}, 0)]
+    policy = TransportPolicy(max_attempts=2, base_delay=0.01)
+
+    resilient_call("test.retry_after", lambda: post(stub.url), policy)
+    assert sleeps == [2.0]
+
+
+def test_gives_up_when_retry_after_exceeds_policy(stub, sleeps):
+    stub.script = [(429, {"retry-after-ms": "60000"}, 0)]
+    policy = TransportPolicy(max_attempts=3, max_retry_after=5.0)
+
+    with pytest.raises(requests.HTTPError):
+        resilient_call("test.long_retry_after", lambda: post(stub.url), policy)
+    assert stub.hits == 1
+    assert sleeps == []
+
+
+def test_client_errors_are_not_retried(stub, sleeps):
+    stub.script = [(400, {}, 0)]
+
+    with pytest.raises(requests.HTTPError):
+        resilient_call("test.bad_request", lambda: post(stub.url), TransportPolicy(max_attempts=3))
+    assert stub.hits == 1
+    assert get_breaker("test.bad_request").state == "closed"
+
+
+def test_circuit_opens_and_fails_fast(stub, sleeps):
+    breaker = get_breaker("test.circuit")
+    breaker.failure_threshold = 2
+    breaker.reset_timeout = 60
+    stub.script = [(500, {}, 0)] * 2
+
+    with pytest.raises(requests.HTTPError):
+        resilient_call("test.circuit", lambda: post(stub.url), TransportPolicy(max_attempts=2, base_delay=0.01))
+    assert breaker.state == "open"
+
+    with pytest.raises(CircuitOpenError):
+        resilient_call("test.circuit", lambda: post(stub.url), TransportPolicy(max_attempts=2))
+    assert stub.hits == 2
+
+
+def test_half_open_trial_closes_circuit(stub, sleeps):
+    breaker = get_breaker("test.half_open")
+    breaker.failure_threshold = 1
+    breaker.reset_timeout = 0
+    stub.script = [(500, {}, 0)]
+
+    with pytest.raises(requests.HTTPError):
+        resilient_call("test.half_open", lambda: post(stub.url), TransportPolicy(max_attempts=1))
+    assert breaker.state == "open"
+
+    assert resilient_call("test.half_open", lambda: post(stub.url), TransportPolicy(max_attempts=1)) == {"ok": True}
+    assert breaker.state == "closed"
+
+
+def test_hedged_request_beats_slow_first_attempt(stub, sleeps):
+    stub.script = [(200, {}, 2.0)]
+    policy = TransportPolicy(max_attempts=1, hedge_after=0.2)
+
+    started = time.perf_counter()
+    assert resilient_call("test.hedge", lambda: post(stub.url), policy) == {"ok": True}
+    assert time.perf_counter() - started < 1.5
+    assert stub.hits == 2
+
+
+def test_async_call_retries_without_blocking(stub, monkeypatch):
+    stub.script = [(503, {}, 0), (429, {"Retry-After": "1"}, 0)]
+    recorded = []
+
+    async def record_sleep(delay):
+        recorded.append(delay)
+
+    monkeypatch.setattr(llm_transport, "_async_sleep", record_sleep)
+
+    async def call():
+        async with httpx.AsyncClient() as client:
+            async def post_async():
+                response = await client.post(stub.url, json={}, timeout=5)
+                response.raise_for_status()
+                return response.json()
+            return await resilient_call_async("test.async_retry", post_async, TransportPolicy(max_attempts=3, base_delay=0.01))
+
+    assert asyncio.run(call()) == {"ok": True}
+    assert stub.hits == 3
+    assert recorded[1] == 1.0
@@ -0,0 +1,54 @@
+import pytest
+from types import SimpleNamespace
+
+from app.services import llm_transport
+from app.services.llm_metrics import registry
+from app.services.llm_transport import TransportPolicy
+from app.services.model_router import DEFAULT_ROUTES, routed_completion, select_models
+
+
+def test_select_models_defaults():
+    assert select_models("feedback_chat") == list(DEFAULT_ROUTES["feedback_chat"])
+
+
+def test_select_models_app_config_and_case_override(app):
+    with app.app_context():
+        app.config["FEEDBACK_CHAT_MODEL"] = "gpt-4.1-mini"
+        try:
+            assert select_models("feedback_chat")[0] == "gpt-4.1-mini"
+
+            case = SimpleNamespace(feedback_config={"models": {"feedback_chat": {"primary": "gpt-4o", "fallback": None}}})
+            assert select_models("feedback_chat", case) == ["gpt-4o"]
+
+            case = SimpleNamespace(feedback_config={"models": {"feedback": "gpt-4.1"}})
+            assert select_models("feedback", case)[0] == "gpt-4.1"
+        finally:
+            app.config["FEEDBACK_CHAT_MODEL"] = None
+
+
+def test_routed_completion_falls_back_on_error(monkeypatch):
+    monkeypatch.setattr(llm_transport, "_sleep", lambda seconds: None)
+    called = []
+
+    def create(model):
+        called.append(model)
+        if model == "primary-model":
+            raise TimeoutError("primary timed out")
+        return SimpleNamespace(usage=None, model=model)
+
+    response, model = routed_completion(
+        "feedback_chat", "test_route", create, TransportPolicy(max_attempts=1),
+        models=["primary-model", "fallback-model"]
+    )
+
+    assert model == "fallback-model"
+    assert called == ["primary-model", "fallback-model"]
+    assert registry.counter_value("llm_model_fallbacks_total", call_type="feedback_chat", model="primary-model") >= 1
+
+
+def test_routed_completion_raises_when_all_models_fail():
+    def create(model):
+        raise ValueError(f"{model} failed")
+
+    with pytest.raises(ValueError):
+        routed_completion("feedback", "test_route", create, TransportPolicy(max_attempts=1), models=["only-model"])
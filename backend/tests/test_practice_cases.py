@@ -0,0 +1,565 @@
+import pytest
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta, timezone
+from sqlalchemy import event
+from flask_jwt_extended import create_access_token
+from app.models import (
+    db, User, Institution, Class, Term, Section, Enrollment,
+    PracticeCase, PracticeCaseImage, Conversation
+)
+
+
+@pytest.fixture
+def student_in_class(app):
+    """A student enrolled in a class; returns (user_id, class_id)."""
+    with app.app_context():
+        institution = Institution(name="Test University", location="Testville")
+        db.session.add(institution)
+        db.session.commit()
+
+        term = Term(
+            name="Spring 2025",
+            code="SP25",
+            start_date=date(2025, 1, 1),
+            end_date=date(2025, 6, 1),
+            institution_id=institution.id
+        )
+        klass = Class(course_code="SPAN101", title="Medical Spanish", institution_id=institution.id)
+        db.session.add_all([term, klass])
+        db.session.commit()
+
+        section = Section(class_id=klass.id, section_code="001", term_id=term.id)
+        user = User()
+        user.email = "student@example.com"
+        user.set_password("pw123")
+        user.is_registered = True
+        user.is_active = True
+        db.session.add_all([section, user])
+        db.session.commit()
+
+        db.session.add(Enrollment(user_id=user.id, section_id=section.id, role="student"))
+        db.session.commit()
+        return user.id, klass.id
+
+
+def add_cases(user_id, class_id, count):
+    """Published cases with two images each; every other one completed by the user."""
+    for i in range(count):
+        case = PracticeCase(class_id=class_id, title=f"Case {i}", published=True, is_draft=False, max_time=300)
+        db.session.add(case)
+        db.session.flush()
+        db.session.add_all([
+            PracticeCaseImage(practice_case_id=case.id, image_url=f"https://img/{case.id}/a.png"),
+            PracticeCaseImage(practice_case_id=case.id, image_url=f"https://img/{case.id}/b.png"),
+        ])
+        if i % 2 == 0:
+            db.session.add(Conversation(user_id=user_id, practice_case_id=case.id, completed=True))
+    db.session.commit()
+
+
+@contextmanager
+def count_queries():
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.engine, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(db.engine, "before_cursor_execute", record)
+
+
+def test_get_cases_query_count_does_not_grow_with_cases(client, student_in_class):
+    user_id, class_id = student_in_class
+    headers = {"Authorization": f"Bearer {create_access_token(identity=str(user_id))}"}
+
+    add_cases(user_id, class_id, 2)
+    with count_queries() as few:
+        response = client.get("/api/practice_cases/get_cases", headers=headers)
+    assert response.status_code == 200
+    assert len(response.get_json()) == 2
+
+    add_cases(user_id, class_id, 10)
+    with count_queries() as many:
+        response = client.get("/api/practice_cases/get_cases", headers=headers)
+    assert response.status_code == 200
+    cases = response.get_json()
+    assert len(cases) == 12
+
+    assert len(many) == len(few)
+    assert sum(case["completed"] for case in cases) == 6
+    assert all(len(case["images"]) == 2 and case["image_url"] for case in cases)
+
+
+def test_get_cases_sparse_fieldsets(client, student_in_class):
+    user_id, class_id = student_in_class
+    headers = {"Authorization": f"Bearer {create_access_token(identity=str(user_id))}"}
+    add_cases(user_id, class_id, 2)
+
+    summary = client.get("/api/practice_cases/get_cases?view=summary", headers=headers).get_json()
+    assert set(summary[0]) == set(PracticeCase.SUMMARY_FIELDS) | {"accessible", "completed"}
+
+    sparse = client.get("/api/practice_cases/get_cases?fields=id,title,completed", headers=headers).get_json()
+    assert all(set(case) == {"id", "title", "completed"} for case in sparse)
+
+    response = client.get("/api/practice_cases/get_cases?fields=id,system_prompt", headers=headers)
+    assert response.status_code == 400
+
+
+def test_summary_describes_the_latest_image(client, student_in_class):
+    user_id, class_id = student_in_class
+    headers = {"Authorization": f"Bearer {create_access_token(identity=str(user_id))}"}
+
+    case = PracticeCase(class_id=class_id, title="Cafe", published=True, is_draft=False, max_time=300)
+    db.session.add(case)
+    db.session.flush()
+    variants = [{"url": "https://img/latest-640.avif", "width": 640, "format": "avif"}]
+    db.session.add_all([
+        PracticeCaseImage(practice_case_id=case.id, image_url="https://img/old.png",
+                          created_at=datetime.now(timezone.utc) - timedelta(days=1)),
+        PracticeCaseImage(practice_case_id=case.id, image_url="https://img/latest.png",
+                          variants=variants, placeholder="data:image/webp;base64,AAAA"),
+    ])
+    db.session.commit()
+
+    summary = client.get("/api/practice_cases/get_cases?view=summary", headers=headers).get_json()
+    assert summary[0]["image_url"] == "https://img/latest.png"
+    assert summary[0]["image_variants"] == variants
+    assert summary[0]["image_placeholder"] == "data:image/webp;base64,AAAA"
+
+
+def test_get_cases_conditional_get(client, student_in_class):
+    user_id, class_id = student_in_class
+    headers = {"Authorization": f"Bearer {create_access_token(identity=str(user_id))}"}
+    add_cases(user_id, class_id, 2)
+
+    first = client.get("/api/practice_cases/get_cases", headers=headers)
+    etag = first.headers["ETag"]
+    assert first.headers["Cache-Control"] == "private, no-cache"
+
+    revalidated = client.get("/api/practice_cases/get_cases", headers={**headers, "If-None-Match": etag})
+    assert revalidated.status_code == 304
+    assert revalidated.data == b""
+
+    # A new case changes the version signal
+    add_cases(user_id, class_id, 1)
+    changed = client.get("/api/practice_cases/get_cases", headers={**headers, "If-None-Match": etag})
+    assert changed.status_code == 200
+    assert len(changed.get_json()) == 3
+    assert changed.headers["ETag"] != etag
+
+
+def test_library_search_is_ranked_and_prefix_matching(client, student_in_class):
+    from app.services.library_search import index_case
+
+    user_id, class_id = student_in_class
+    headers = {"Authorization": f"Bearer {create_access_token(identity=str(user_id))}"}
+    cases = [
+        PracticeCase(class_id=class_id, title="Ordering at a restaurant", description="Order dinner politely.",
+                     target_language="English"),
+        PracticeCase(class_id=class_id, title="Doctor visit", description="Describe symptoms; mentions restaurants once.",
+                     target_language="English"),
+        PracticeCase(class_id=class_id, title="Train station", description="Buy a ticket.", target_language="English"),
+    ]
+    for case in cases:
+        case.submitted_to_library = True
+        case.library_approved = True
+        db.session.add(case)
+        db.session.flush()
+        index_case(case)
+    db.session.commit()
+
+    found = client.get("/api/practice_cases/library?search=restaur", headers=headers).get_json()["cases"]
+    assert [case["title"] for case in found] == ["Ordering at a restaurant", "Doctor visit"]
+
+    # Stemming: "orders" matches "Ordering"/"Order"
+    stemmed = client.get("/api/practice_cases/library?search=orders", headers=headers).get_json()["cases"]
+    assert [case["title"] for case in stemmed] == ["Ordering at a restaurant"]
+
+
+def test_library_tag_counts_follow_case_changes(client, student_in_class):
+    import json
+    from app.models import LibraryTag
+    from app.services.library_tags import sync_case_tags, release_case_tags
+
+    user_id, class_id = student_in_class
+    headers = {"Authorization": f"Bearer {create_access_token(identity=str(user_id))}"}
+
+    def library_case(title, tags, approved=True):
+        case = PracticeCase(class_id=class_id, title=title, submitted_to_library=True,
+                            library_approved=approved, library_tags=json.dumps(tags))
+        db.session.add(case)
+        db.session.flush()
+        sync_case_tags(case, was_counted=False)
+        return case
+
+    def count(name):
+        db.session.expire_all()
+        return LibraryTag.query.filter_by(name=name).one().case_count
+
+    first = library_case("Cafe", ["Beginner", "food"])
+    library_case("Market", ["beginner ", "shopping"])
+    pending = library_case("Clinic", ["beginner"], approved=False)
+    db.session.commit()
+    assert count("beginner") == 2
+
+    stats = client.get("/api/practice_cases/library/stats", headers=headers).get_json()
+    assert stats["popular_tags"][0] == "beginner"
+    tagged = client.get("/api/practice_cases/library?tag=Food", headers=headers).get_json()["cases"]
+    assert [case["title"] for case in tagged] == ["Cafe"]
+
+    # Approving counts the case; retagging and deleting move the counters back
+    pending.library_approved = True
+    sync_case_tags(pending, was_counted=False)
+    first.library_tags = json.dumps(["food"])
+    sync_case_tags(first, was_counted=True)
+    db.session.commit()
+    assert count("beginner") == 2
+
+    release_case_tags(pending)
+    db.session.delete(pending)
+    db.session.commit()
+    assert count("beginner") == 1
+    assert count("food") == 1
+
+
+def test_library_stats_are_materialized(client, student_in_class):
+    import json
+    from app.services import library_stats
+    from app.services.library_tags import sync_case_tags
+
+    user_id, class_id = student_in_class
+    headers = {"Authorization": f"Bearer {create_access_token(identity=str(user_id))}"}
+    library_stats._cache.clear()
+
+    case = PracticeCase(class_id=class_id, title="Cafe", target_language="Spanish", submitted_to_library=True,
+                        library_approved=True, library_tags=json.dumps(["food"]), library_downloads=3)
+    db.session.add(case)
+    db.session.flush()
+    sync_case_tags(case, was_counted=False)
+    db.session.commit()
+
+    stats = client.get("/api/practice_cases/library/stats", headers=headers).get_json()
+    assert stats["total_cases"] == 1
+    assert stats["total_downloads"] == 3
+    assert stats["popular_languages"] == ["Spanish"]
+    assert stats["popular_tags"] == ["food"]
+    assert stats["computed_at"]
+    assert stats["max_staleness_seconds"] == client.application.config["LIBRARY_STATS_MAX_AGE_SECONDS"] + library_stats.STATS_CACHE_SECONDS
+
+    # Folded downloads are added to the row in place
+    library_stats.record_downloads(1)
+    db.session.commit()
+    assert client.get("/api/practice_cases/library/stats", headers=headers).get_json()["total_downloads"] == 4
+    library_stats._cache.clear()
+
+
+def test_library_stats_refresh_after_approval_commits(client, student_in_class):
+    from app.models import LibraryStats
+    from app.services import library_stats
+
+    user_id, class_id = student_in_class
+    user = db.session.get(User, user_id)
+    user.is_master = True
+    headers = {"Authorization": f"Bearer {create_access_token(identity=str(user_id))}"}
+
+    case = PracticeCase(class_id=class_id, title="Cafe", target_language="Spanish", submitted_to_library=True,
+                        library_approved=False)
+    db.session.add(case)
+    db.session.commit()
+    assert client.get("/api/practice_cases/library/stats", headers=headers).get_json()["total_cases"] == 0
+
+    response = client.post(f"/api/practice_cases/library/admin/approve/{case.id}", headers=headers)
+    assert response.status_code == 200
+
+    # Recomputed after the approval committed, and no stale snapshot survives
+    assert db.session.get(LibraryStats, LibraryStats.SINGLETON_ID).total_cases == 1
+    assert client.get("/api/practice_cases/library/stats", headers=headers).get_json()["total_cases"] == 1
+
+    # A recompute that started before the stored one does not overwrite it
+    db.session.get(LibraryStats, LibraryStats.SINGLETON_ID).computed_at = datetime.now(timezone.utc) + timedelta(minutes=1)
+    db.session.commit()
+    case.library_approved = False
+    db.session.commit()
+    library_stats.refresh_library_stats()
+    db.session.commit()
+    assert db.session.get(LibraryStats, LibraryStats.SINGLETON_ID).total_cases == 1
+    library_stats._cache.clear()
+
+
+def test_library_rating_is_one_per_user(client, student_in_class):
+    user_id, class_id = student_in_class
+    headers = {"Authorization": f"Bearer {create_access_token(identity=str(user_id))}"}
+
+    case = PracticeCase(class_id=class_id, title="Cafe", submitted_to_library=True, library_approved=True,
+                        library_rating=2.0, library_rating_count=1)
+    db.session.add(case)
+    db.session.commit()
+    updated_at = case.updated_at
+
+    first = client.post(f"/api/practice_cases/rate_library_case/{case.id}", json={"rating": 4}, headers=headers)
+    assert first.status_code == 200
+    assert first.get_json()["rating_count"] == 2
+    assert first.get_json()["new_rating"] == 3.0
+
+    # Rating again replaces the user's earlier rating instead of adding a vote
+    again = client.post(f"/api/practice_cases/rate_library_case/{case.id}", json={"rating": 5}, headers=headers)
+    assert again.get_json()["rating_count"] == 2
+    assert again.get_json()["new_rating"] == 3.5
+
+    # A rating is not an edit: cached payloads keyed on updated_at stay valid
+    db.session.refresh(case)
+    assert case.updated_at == updated_at
+
+
+def test_library_downloads_are_folded(client, student_in_class):
+    from app.services import library_stats
+    from app.services.library_counters import download_folder, fold_downloads
+
+    user_id, class_id = student_in_class
+    headers = {"Authorization": f"Bearer {create_access_token(identity=str(user_id))}"}
+
+    case = PracticeCase(class_id=class_id, title="Cafe", submitted_to_library=True, library_approved=True,
+                        library_downloads=0)
+    db.session.add(case)
+    db.session.commit()
+
+    for _ in range(3):
+        response = client.post(f"/api/practice_cases/copy_from_library/{case.id}",
+                               json={"class_id": class_id}, headers=headers)
+        assert response.status_code == 201
+
+    # The copies schedule a single fold even though no later copy arrives
+    assert download_folder._timer is not None
+    download_folder.cancel()
+
+    assert fold_downloads() == 3
+    db.session.refresh(case)
+    assert case.library_downloads == 3
+    assert fold_downloads() == 0
+    library_stats._cache.clear()
+
+
+def test_library_cursor_pagination(client, student_in_class):
+    from app.services import library_pagination
+
+    user_id, class_id = student_in_class
+    headers = {"Authorization": f"Bearer {create_access_token(identity=str(user_id))}"}
+    library_pagination._totals.clear()
+
+    for i in range(5):
+        # Ties on downloads are broken by id
+        db.session.add(PracticeCase(class_id=class_id, title=f"Case {i}", submitted_to_library=True,
+                                    library_approved=True, library_downloads=i // 2))
+    db.session.commit()
+
+    seen, cursor = [], None
+    while True:
+        params = {"sort": "downloads", "per_page": 2, **({"cursor": cursor} if cursor else {})}
+        body = client.get("/api/practice_cases/library", query_string=params, headers=headers).get_json()
+        assert body["pagination"]["total"] == 5
+        seen.extend(c["library_downloads"] for c in body["cases"])
+        cursor = body["pagination"]["next_cursor"]
+        if not cursor:
+            break
+    assert seen == [2, 1, 1, 0, 0]
+
+    bad = client.get("/api/practice_cases/library", query_string={"sort": "title", "cursor": "nonsense"}, headers=headers)
+    assert bad.status_code == 400
+    library_pagination._totals.clear()
+
+
+def test_similar_library_cases(client, student_in_class):
+    from app.models import LibraryCaseVector
+    from app.services import library_similarity
+
+    user_id, class_id = student_in_class
+    headers = {"Authorization": f"Bearer {create_access_token(identity=str(user_id))}"}
+
+    def library_case(title, situation):
+        case = PracticeCase(class_id=class_id, title=title, situation_instructions=situation,
+                            submitted_to_library=True, library_approved=True)
+        db.session.add(case)
+        db.session.flush()
+        return case
+
+    cafe = library_case("Ordering coffee", "You are a barista taking a coffee order at a cafe")
+    bakery = library_case("Ordering pastries", "You are a baker taking an order at a cafe counter")
+    doctor = library_case("Doctor visit", "You are a doctor asking a patient about symptoms")
+    db.session.commit()
+    assert library_similarity.build_index(top_k=2) == 3
+
+    body = client.get(f"/api/practice_cases/library/{cafe.id}/similar", headers=headers).get_json()
+    assert body["indexed"] is True
+    assert body["cases"][0]["id"] == bakery.id
+
+    # A newly approved case is spliced into existing lists without a rebuild
+    teahouse = library_case("Ordering tea", "You are a waiter taking a tea order at a cafe")
+    library_similarity.index_case(teahouse)
+    db.session.commit()
+    similar = client.get(f"/api/practice_cases/library/{teahouse.id}/similar", headers=headers).get_json()
+    assert doctor.id not in [case["id"] for case in similar["cases"]]
+    assert teahouse.id in [neighbor_id for neighbor_id, _ in db.session.get(LibraryCaseVector, cafe.id).neighbors]
+
+
+def test_library_near_duplicates_are_flagged(student_in_class):
+    from app.services import library_duplicates
+
+    _, class_id = student_in_class
+    text = dict(
+        description="Order lunch at a busy market stall and ask about the ingredients",
+        situation_instructions="You run a food stall at the market. Greet the customer, recommend the daily special "
+                               "and answer questions about spices, prices and portion sizes.",
+        curricular_goals="Food vocabulary, numbers and polite requests",
+    )
+    original = PracticeCase(class_id=class_id, title="At the market", submitted_to_library=True,
+                            library_approved=True, **text)
+    db.session.add(original)
+    db.session.flush()
+    assert library_duplicates.index_case(original) is None
+
+    copy = original.create_copy_from_library(class_id, None)
+    copy.submitted_to_library = True
+    other = PracticeCase(class_id=class_id, title="Job interview", submitted_to_library=True,
+                         situation_instructions="You interview the student for a summer job at a bookshop.")
+    db.session.add_all([copy, other])
+    db.session.flush()
+
+    duplicate_of_id, score = library_duplicates.index_case(copy)
+    assert duplicate_of_id == original.id and score >= library_duplicates.DUPLICATE_THRESHOLD
+    assert library_duplicates.index_case(other) is None
+    assert library_duplicates.duplicate_flags([copy.id, other.id]) == {copy.id: (original.id, score)}
+    db.session.commit()
+
+
+def test_bulk_copy_from_library_copies_images(client, student_in_class, monkeypatch):
+    from app.services.image_service import ImageService
+
+    user_id, class_id = student_in_class
+    headers = {"Authorization": f"Bearer {create_access_token(identity=str(user_id))}"}
+    monkeypatch.setenv("AWS_S3_BUCKET_NAME", "cases")
+
+    copied = []
+
+    class FakeS3:
+        def copy_object(self, **kwargs):
+            copied.append((kwargs["CopySource"]["Key"], kwargs["Key"]))
+
+    monkeypatch.setattr(ImageService, "_get_s3_client", staticmethod(lambda: FakeS3()))
+
+    sources = []
+    for i in range(2):
+        case = PracticeCase(class_id=class_id, title=f"Library {i}", submitted_to_library=True, library_approved=True)
+        db.session.add(case)
+        db.session.flush()
+        # Image 2 is the newer one; only the timestamps say so once copies are inserted together
+        for n, age in ((1, 2), (2, 1)):
+            db.session.add(PracticeCaseImage(
+                practice_case_id=case.id,
+                image_url=f"https://cases.s3.us-east-2.amazonaws.com/practice-cases/case_{case.id}_{n}.png",
+                created_at=datetime.now(timezone.utc) - timedelta(days=age)
+            ))
+        sources.append(case.id)
+    db.session.commit()
+
+    response = client.post("/api/practice_cases/copy_from_library/bulk",
+                           json={"case_ids": sources + [999999], "class_id": class_id}, headers=headers)
+    assert response.status_code == 201
+    body = response.get_json()
+    assert body["missing"] == [999999]
+    assert [case["title"] for case in body["cases"]] == ["Copy of Library 0", "Copy of Library 1"]
+
+    # Each image is a server-side copy under the new case's key, not a shared or regenerated object
+    assert sorted(source for source, _ in copied) == sorted(
+        f"practice-cases/case_{i}_{n}.png" for i in sources for n in (1, 2)
+    )
+    sources_by_copy = {key: source for source, key in copied}
+    for case in body["cases"]:
+        assert len(case["images"]) == 2
+        assert all(f"case_{case['id']}_" in image["image_url"] for image in case["images"])
+        latest_key = case["image_url"].split(".amazonaws.com/")[1]
+        assert sources_by_copy[latest_key].endswith("_2.png")
+
+
+def test_image_generation_runs_as_a_job(app, student_in_class, monkeypatch):
+    from app.models import ImageJob
+    from app.services import image_jobs
+    from app.services.image_service import ImageService
+
+    user_id, class_id = student_in_class
+    user = db.session.get(User, user_id)
+    case = PracticeCase(class_id=class_id, title="Cafe")
+    db.session.add(case)
+    db.session.commit()
+
+    queued = []
+
+    class DeferredExecutor:
+        def submit(self, fn, *args):
+            queued.append((fn, args))
+
+    def fake_generate(case, include_person=False):
+        image = PracticeCaseImage(practice_case_id=case.id, image_url="https://img/generated.png")
+        db.session.add(image)
+        db.session.commit()
+        return image
+
+    monkeypatch.setattr(image_jobs, "_get_executor", lambda app: DeferredExecutor())
+    monkeypatch.setattr(ImageService, "generate_and_save_image", fake_generate)
+    monkeypatch.setitem(app.config, "IMAGE_JOBS_PER_USER", 1)
+
+    job, created = image_jobs.submit(case, user)
+    assert created and job.status == ImageJob.QUEUED
+
+    # A second request for the same case joins the active job
+    again, created = image_jobs.submit(case, user)
+    assert not created and again.id == job.id
+
+    other = PracticeCase(class_id=class_id, title="Bakery")
+    db.session.add(other)
+    db.session.commit()
+    with pytest.raises(image_jobs.TooManyImageJobs):
+        image_jobs.submit(other, user)
+
+    # The job runs in its own app context, whose teardown removes the session,
+    # so objects loaded before it are detached
+    fn, args = queued.pop()
+    fn(*args)
+    user = db.session.get(User, user_id)
+    finished = image_jobs.get_job(job.id, user)
+    assert finished.status == ImageJob.SUCCEEDED
+    assert finished.to_dict()["image"]["image_url"] == "https://img/generated.png"
+
+
+def test_stale_image_jobs_are_measured_per_status(app, student_in_class):
+    from app.models import ImageJob
+    from app.services import image_jobs
+
+    user_id, class_id = student_in_class
+    user = db.session.get(User, user_id)
+    cases = [PracticeCase(class_id=class_id, title=title) for title in ("Cafe", "Bakery", "Market")]
+    db.session.add_all(cases)
+    db.session.flush()
+
+    old = datetime.now(timezone.utc) - timedelta(seconds=image_jobs.STALE_JOB_SECONDS + 60)
+    # Waiting behind a busy pool, started recently after a long wait, and abandoned mid-run
+    waiting = ImageJob(practice_case_id=cases[0].id, user_id=user_id, created_at=old)
+    started = ImageJob(practice_case_id=cases[1].id, user_id=user_id, status=ImageJob.RUNNING,
+                       created_at=old, started_at=datetime.now(timezone.utc))
+    abandoned = ImageJob(practice_case_id=cases[2].id, user_id=user_id, status=ImageJob.RUNNING,
+                         created_at=old, started_at=old)
+    db.session.add_all([waiting, started, abandoned])
+    db.session.commit()
+    job_ids = [waiting.id, started.id, abandoned.id]
+
+    statuses = [image_jobs.get_job(job_id, user).status for job_id in job_ids]
+    assert statuses == [ImageJob.QUEUED, ImageJob.RUNNING, ImageJob.FAILED]
+
+    # A worker that outlives its job being failed as stale does not overwrite the failure
+    assert image_jobs._finish(abandoned.id, ImageJob.SUCCEEDED) is False
+    assert image_jobs._finish(started.id, ImageJob.SUCCEEDED) is True
+    db.session.expire_all()
+    assert db.session.get(ImageJob, job_ids[2]).status == ImageJob.FAILED
+    assert db.session.get(ImageJob, job_ids[1]).status == ImageJob.SUCCEEDED
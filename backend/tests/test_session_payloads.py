@@ -0,0 +1,96 @@
+from datetime import datetime, timezone
+from unittest.mock import patch
+
+from app.models import db, Institution, Class, PracticeCase
+from app.services.session_payloads import get_compiled_session, invalidate_compiled_session, reset_compiled_sessions
+
+
+def make_case():
+    institution = Institution(name="Payload University")
+    db.session.add(institution)
+    db.session.commit()
+    klass = Class(course_code="SPAN201", title="Spanish II", institution_id=institution.id)
+    db.session.add(klass)
+    db.session.commit()
+    case = PracticeCase(
+        class_id=klass.id,
+        title="Ordering coffee",
+        system_prompt="You are a barista in Madrid.",
+        voice="coral",
+        language_code="es",
+        speaking_speed="slow",
+        max_time=300,
+    )
+    db.session.add(case)
+    db.session.commit()
+    return case
+
+
+def test_compiled_session_payload(app):
+    with app.app_context():
+        case = make_case()
+        compiled = get_compiled_session(case.id)
+
+        payload = compiled.build(2.0)
+        assert payload["voice"] == "coral"
+        assert payload["instructions"] == "You are a barista in Madrid."
+        assert payload["input_audio_transcription"]["language"] == "es"
+        assert payload["turn_detection"]["type"] == "server_vad"
+        assert payload["speed"] == 1.5
+        assert compiled.default_speed == 0.9
+        assert "speed" not in compiled.payload
+
+
+def test_compiled_session_is_served_from_memory(app):
+    with app.app_context():
+        case = make_case()
+        first = get_compiled_session(case.id)
+
+        with patch.object(db.session, "get", side_effect=AssertionError("database read")):
+            assert get_compiled_session(case.id) is first
+
+
+def test_compiled_session_invalidation(app):
+    with app.app_context():
+        case = make_case()
+        first = get_compiled_session(case.id)
+
+        invalidate_compiled_session(case.id)
+        second = get_compiled_session(case.id)
+        assert second is not first
+        assert second.signature == first.signature
+
+
+def test_compiled_session_follows_edits_from_other_workers(app):
+    with app.app_context():
+        case = make_case()
+        first = get_compiled_session(case.id)
+
+        # An edit handled elsewhere: the row changes but this process is not told
+        case.voice = "sage"
+        case.updated_at = datetime.now(timezone.utc)
+        db.session.commit()
+        db.session.expire_all()
+
+        second = get_compiled_session(case.id)
+        assert second.payload["voice"] == "sage"
+        assert second.signature != first.signature
+        assert get_compiled_session(case.id) is second
+
+
+def test_deleted_case_is_not_served(app):
+    with app.app_context():
+        case = make_case()
+        get_compiled_session(case.id)
+
+        db.session.delete(case)
+        db.session.commit()
+        assert get_compiled_session(case.id) is None
+
+
+def test_reset_compiled_sessions(app):
+    with app.app_context():
+        case = make_case()
+        first = get_compiled_session(case.id)
+        reset_compiled_sessions()
+        assert get_compiled_session(case.id) is not first
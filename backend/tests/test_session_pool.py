@@ -0,0 +1,72 @@
+import time
+from types import SimpleNamespace
+
+from app.services.session_pool import RealtimeSessionPool
+
+
+def make_compiled(signature="sig-a"):
+    return SimpleNamespace(case_id=7, signature=signature, default_speed=1.0)
+
+
+def make_pool(app, monkeypatch):
+    monkeypatch.setitem(app.config, "REALTIME_SESSION_POOL_ENABLED", True)
+    pool = RealtimeSessionPool()
+    watched = []
+    monkeypatch.setattr(pool, "_watch", watched.append)
+    return pool, watched
+
+
+def pooled_session(expires_in):
+    return {"session_id": "sess", "client_secret": "secret", "expires_at": time.time() + expires_in}
+
+
+def test_take_hands_out_fresh_session_and_refills(app, monkeypatch):
+    pool, watched = make_pool(app, monkeypatch)
+    pool._pools[(7, 1.0)] = [("sig-a", pooled_session(60))]
+
+    with app.app_context():
+        assert pool.take(make_compiled(), 1.0)["session_id"] == "sess"
+        assert pool.take(make_compiled(), 1.0) is None
+
+    assert watched == [(7, 1.0), (7, 1.0)]
+
+
+def test_take_skips_expiring_and_stale_sessions(app, monkeypatch):
+    pool, _ = make_pool(app, monkeypatch)
+    pool._pools[(7, 1.0)] = [
+        ("sig-a", pooled_session(5)),
+        ("sig-old", pooled_session(60)),
+    ]
+
+    with app.app_context():
+        assert pool.take(make_compiled(), 1.0) is None
+    assert pool._pools[(7, 1.0)] == []
+
+
+def test_prewarm_uses_client_default_speed(app, monkeypatch):
+    pool, watched = make_pool(app, monkeypatch)
+
+    with app.app_context():
+        pool.prewarm(SimpleNamespace(case_id=7, signature="sig-a", default_speed=1.25))
+    assert watched == [(7, 1.25)]
+
+
+def test_reap_drops_expired_sessions(app, monkeypatch):
+    pool, _ = make_pool(app, monkeypatch)
+    pool._pools[(7, 1.0)] = [("sig-a", pooled_session(5)), ("sig-a", pooled_session(60))]
+    pool._interest[(7, 1.0)] = time.monotonic()
+
+    assert pool.reap() == 1
+    assert len(pool._pools[(7, 1.0)]) == 1
+
+
+def test_pool_is_off_by_default(app, monkeypatch):
+    pool = RealtimeSessionPool()
+    watched = []
+    monkeypatch.setattr(pool, "_watch", watched.append)
+    pool._pools[(7, 1.0)] = [("sig-a", pooled_session(60))]
+
+    with app.app_context():
+        assert pool.take(make_compiled(), 1.0) is None
+        pool.prewarm(make_compiled())
+    assert watched == []
@@ -0,0 +1,93 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.models import db, Conversation, Institution, RealtimeSession, User
+from app.services.session_registry import (
+    activate, admit, end_conversation_sessions, link_conversation_sessions, reap_expired
+)
+
+
+@pytest.fixture
+def institution_and_users(app):
+    with app.app_context():
+        institution = Institution(name="Test University", location="Testville")
+        db.session.add(institution)
+        users = []
+        for i in range(3):
+            user = User()
+            user.email = f"student{i}@example.com"
+            user.set_password("pw123")
+            db.session.add(user)
+            users.append(user)
+        db.session.commit()
+        return institution.id, [user.id for user in users]
+
+
+def test_admits_up_to_limit_then_queues_in_order(app, institution_and_users, monkeypatch):
+    institution_id, (first, second, third) = institution_and_users
+    monkeypatch.setitem(app.config, "REALTIME_SESSION_LIMIT", 1)
+
+    with app.app_context():
+        assert admit(first, institution_id).admitted
+
+        waiting = admit(second, institution_id)
+        assert not waiting.admitted
+        assert waiting.position == 1
+        assert waiting.eta_seconds > 0
+        assert admit(third, institution_id).position == 2
+
+        # Polling keeps the place in line while the slot is taken
+        assert admit(second, institution_id, ticket=waiting.ticket).position == 1
+
+
+def test_freed_slot_goes_to_head_of_queue(app, institution_and_users, monkeypatch):
+    institution_id, (first, second, third) = institution_and_users
+    monkeypatch.setitem(app.config, "REALTIME_SESSION_LIMIT", 1)
+
+    with app.app_context():
+        active = admit(first, institution_id)
+        waiting = admit(second, institution_id)
+        later = admit(third, institution_id)
+
+        active.entry.status = RealtimeSession.ENDED
+        db.session.commit()
+
+        # The later ticket cannot overtake the head of the line
+        assert not admit(third, institution_id, ticket=later.ticket).admitted
+        assert admit(second, institution_id, ticket=waiting.ticket).admitted
+
+
+def test_reap_expires_leases_and_abandons_unpolled_tickets(app, institution_and_users, monkeypatch):
+    institution_id, (first, second, _) = institution_and_users
+    monkeypatch.setitem(app.config, "REALTIME_SESSION_LIMIT", 1)
+
+    with app.app_context():
+        active = admit(first, institution_id, max_time=60)
+        waiting = admit(second, institution_id)
+
+        later = datetime.now(timezone.utc) + timedelta(minutes=10)
+        assert reap_expired(institution_id, now=later) == 2
+        db.session.commit()
+
+        assert db.session.get(RealtimeSession, active.ticket).status == RealtimeSession.EXPIRED
+        assert db.session.get(RealtimeSession, waiting.ticket).status == RealtimeSession.ABANDONED
+
+
+def test_ending_conversation_frees_slot_minted_without_its_id(app, institution_and_users, monkeypatch):
+    institution_id, (first, second, _) = institution_and_users
+    monkeypatch.setitem(app.config, "REALTIME_SESSION_LIMIT", 1)
+
+    with app.app_context():
+        admission = admit(first, institution_id)
+        activate(admission.entry, {"session_id": "sess"})
+        conversation = Conversation(user_id=first, start_time=datetime.now(timezone.utc))
+        db.session.add(conversation)
+        db.session.flush()
+
+        assert link_conversation_sessions(conversation) == 1
+        assert end_conversation_sessions(conversation.id) == 1
+        db.session.commit()
+
+        assert db.session.get(RealtimeSession, admission.ticket).status == RealtimeSession.ENDED
+        assert admit(second, institution_id).admitted
@@ -0,0 +1,96 @@
+import importlib
+import threading
+from types import SimpleNamespace
+
+import pytest
+from cachetools import TTLCache
+from flask import jsonify
+from flask_jwt_extended import create_access_token
+
+# The package re-exports the blueprint under the module's name
+dialogic_feedback = importlib.import_module("app.routes.dialogic_feedback")
+
+
+@pytest.fixture
+def prefetch(app, monkeypatch):
+    """Stub out the database and the coach model around the prefetch machinery."""
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    monkeypatch.setattr(dialogic_feedback, "_suggestion_answers", TTLCache(maxsize=16, ttl=60))
+    monkeypatch.setattr(dialogic_feedback, "parse_feedback_json", lambda conv: None)
+    monkeypatch.setattr(dialogic_feedback, "generate_feedback_suggestions", lambda conv, feedback_json=None: ["Why?"])
+    monkeypatch.setattr(dialogic_feedback, "create_welcome_message", lambda conv, feedback_json=None: "Welcome")
+    monkeypatch.setattr(dialogic_feedback, "feedback_case_labels", lambda conv: {})
+    monkeypatch.setattr(dialogic_feedback, "feedback_practice_case", lambda conv: None)
+    monkeypatch.setattr(dialogic_feedback, "select_models", lambda call_type, case=None: None)
+    monkeypatch.setattr(
+        dialogic_feedback, "build_feedback_chat_messages",
+        lambda conv, history, feedback_json=None: history
+    )
+    return SimpleNamespace(id=41)
+
+
+def test_click_is_served_from_prefetched_answer(app, monkeypatch, prefetch):
+    calls = []
+
+    def reply(api_messages, **kwargs):
+        calls.append(kwargs["route"])
+        return f"Answer to {api_messages[-1]['content']}"
+
+    monkeypatch.setattr(dialogic_feedback, "request_feedback_reply", reply)
+
+    with app.app_context():
+        dialogic_feedback.prefetch_suggestion_answers(prefetch)
+        assert dialogic_feedback.take_prefetched_answer(41, "Why?") == "Answer to Why?"
+        # Each answer is handed out once
+        assert dialogic_feedback.take_prefetched_answer(41, "Why?") is None
+
+    assert calls == ["suggestion_prefetch"]
+
+
+def test_slow_prefetch_falls_back_to_live_call(app, client, monkeypatch, prefetch):
+    release = threading.Event()
+
+    def slow_reply(api_messages, **kwargs):
+        release.wait(5)
+        return "Too late"
+
+    monkeypatch.setattr(dialogic_feedback, "request_feedback_reply", slow_reply)
+    monkeypatch.setitem(app.config, "SUGGESTION_PREFETCH_WAIT_SECONDS", 0.05)
+    monkeypatch.setattr(
+        dialogic_feedback, "receive_feedback_message",
+        lambda conv_id, user_id, data: ((prefetch, "Why?", None, (41, "Why?")), None)
+    )
+    monkeypatch.setattr(dialogic_feedback, "generate_ai_feedback_response", lambda conv, message, feedback_json=None: "Live")
+    monkeypatch.setattr(
+        dialogic_feedback, "reply_to_feedback_message",
+        lambda conv, ai_response, feedback_json: jsonify({"ai_response": ai_response})
+    )
+
+    try:
+        with app.app_context():
+            dialogic_feedback.prefetch_suggestion_answers(prefetch)
+            token = create_access_token(identity="1")
+
+        response = client.post(
+            "/api/dialogic_feedback/feedback/41/chat",
+            json={"message": "Why?", "is_suggestion": True},
+            headers={"Authorization": f"Bearer {token}"},
+        )
+    finally:
+        release.set()
+
+    assert response.status_code == 200
+    assert response.get_json()["ai_response"] == "Live"
+    assert len(dialogic_feedback._suggestion_answers) == 0
+
+
+def test_prefetch_disabled(app, monkeypatch, prefetch):
+    submitted = []
+    monkeypatch.setitem(app.config, "SUGGESTION_PREFETCH_ENABLED", False)
+    monkeypatch.setattr(dialogic_feedback._prefetch_executor, "submit", lambda *args: submitted.append(args))
+
+    with app.app_context():
+        dialogic_feedback.prefetch_suggestion_answers(prefetch)
+        assert dialogic_feedback.take_prefetched_answer(41, "Why?") is None
+
+    assert submitted == []
@@ -1,5 +1,8 @@
 import pytest
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from unittest.mock import patch
+from app.services.llm_metrics import registry
 from app.services.voice_service import VoiceService
 
 def test_create_session(app):
@@ -7,10 +10,10 @@ def test_create_session(app):
     service = VoiceService()
 
     with app.app_context():
-        with patch("requests.post") as mock_post:
-            mock_post.return_value.status_code = 200
-            mock_post.return_value.json.return_value = {
-                "id": "test_session_id",  
+        with patch.object(service.session, "request") as mock_request:
+            mock_request.return_value.status_code = 200
+            mock_request.return_value.json.return_value = {
+                "id": "test_session_id",
                 "client_secret": {
                     "value": "test_client_secret",
                     "expires_at": 1738180339
@@ -21,3 +24,40 @@ def test_create_session(app):
 
             assert session["session_id"] == "test_session_id"
             assert session["client_secret"] == "test_client_secret"
+            assert mock_request.call_args.args[0] == "POST"
+
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        body = b'{"status": "active"}'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def test_session_status_reuses_pooled_connection(app):
+    """Consecutive calls share one keep-alive connection."""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), KeepAliveHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        service = VoiceService()
+        service.api_base = f"http://127.0.0.1:{server.server_address[1]}/v1"
+        opened_before = registry.counter_value("voice_http_connections_opened_total", route="session_status")
+        reused_before = registry.counter_value("voice_http_connections_reused_total", route="session_status")
+
+        with app.app_context():
+            for _ in range(3):
+                assert service.get_session_status("sess_123") == {"status": "active"}
+
+        assert registry.counter_value("voice_http_connections_opened_total", route="session_status") - opened_before == 1
+        assert registry.counter_value("voice_http_connections_reused_total", route="session_status") - reused_before == 2
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,62 @@
+// src/components/common/ResponsiveImage.tsx
+
+import React from "react";
+
+export interface ImageVariant {
+  url: string;
+  width: number;
+  format: "avif" | "webp";
+}
+
+interface ResponsiveImageProps {
+  src: string;
+  alt: string;
+  // Rendered width of the image, so the browser can pick a variant
+  sizes: string;
+  variants?: ImageVariant[];
+  placeholder?: string | null;
+  className?: string;
+  imgClassName?: string;
+  onError?: React.ReactEventHandler<HTMLImageElement>;
+}
+
+const srcSetFor = (variants: ImageVariant[], format: ImageVariant["format"]) =>
+  variants
+    .filter((variant) => variant.format === format)
+    .map((variant) => `${variant.url} ${variant.width}w`)
+    .join(", ");
+
+// A case image served as AVIF/WebP variants when it has them, falling back to
+// the original, with its blurred placeholder shown until the image loads
+const ResponsiveImage: React.FC<ResponsiveImageProps> = ({
+  src,
+  alt,
+  sizes,
+  variants = [],
+  placeholder,
+  className = "",
+  imgClassName,
+  onError,
+}) => (
+  <picture
+    className={`block bg-cover bg-center ${className}`}
+    style={placeholder ? { backgroundImage: `url(${placeholder})` } : undefined}
+  >
+    {(["avif", "webp"] as const).map((format) => {
+      const srcSet = srcSetFor(variants, format);
+      return srcSet ? (
+        <source key={format} type={`image/${format}`} srcSet={srcSet} sizes={sizes} />
+      ) : null;
+    })}
+    <img
+      src={src}
+      alt={alt}
+      className={imgClassName}
+      loading="lazy"
+      decoding="async"
+      onError={onError}
+    />
+  </picture>
+);
+
+export default ResponsiveImage;
@@ -1,16 +1,52 @@
 // src/components/instructor/ImageManager.tsx
 
-import React, { useState } from 'react';
+import React, { useEffect, useRef, useState } from 'react';
 import { fetchWithAuth } from '@/utils/api';
 import { Button } from '@/components/ui/button';
 import { Card, CardContent, CardHeader, CardTitle, CardDescription } from '@/components/ui/card';
+import ResponsiveImage, { ImageVariant } from '@/components/common/ResponsiveImage';
 import { ImagePlus, Trash2, Loader2, AlertCircle, Users, MapPin, Image } from 'lucide-react';
 
 interface PracticeCaseImage {
   id: number;
   image_url: string;
+  variants?: ImageVariant[];
+  placeholder?: string | null;
 }
 
+interface ImageJob {
+  id: number;
+  status: 'queued' | 'running' | 'succeeded' | 'failed';
+  image: PracticeCaseImage | null;
+  error: string | null;
+}
+
+const POLL_INTERVAL_MS = 2000;
+
+// Image generation runs as a background job on the server; poll it until it finishes.
+// Resolves to null if the job succeeded but its image has since been deleted.
+const waitForImageJob = async (jobId: number, signal: AbortSignal): Promise<PracticeCaseImage | null> => {
+  for (;;) {
+    const response = await fetchWithAuth(`/api/practice_cases/image_jobs/${jobId}`, { signal });
+    if (!response.ok) {
+      const errData = await response.json();
+      throw new Error(errData.error || 'Failed to check image status');
+    }
+
+    const { job }: { job: ImageJob } = await response.json();
+    if (job.status === 'succeeded') return job.image;
+    if (job.status === 'failed') throw new Error(job.error || 'Failed to generate image');
+
+    await new Promise<void>((resolve, reject) => {
+      const timer = setTimeout(resolve, POLL_INTERVAL_MS);
+      signal.addEventListener('abort', () => {
+        clearTimeout(timer);
+        reject(new DOMException('Polling cancelled', 'AbortError'));
+      }, { once: true });
+    });
+  }
+};
+
 interface ImageManagerProps {
   caseId: number;
   images: PracticeCaseImage[];
@@ -21,13 +57,19 @@ const ImageManager: React.FC<ImageManagerProps> = ({ caseId, images, onImageUpda
   const [isGenerating, setIsGenerating] = useState(false);
   const [error, setError] = useState<string | null>(null);
   const [imageMode, setImageMode] = useState<'none' | 'scene' | 'avatar'>(images.length > 0 ? 'scene' : 'none');
+  const pollRef = useRef<AbortController | null>(null);
+
+  // Stop polling an image job when the manager unmounts
+  useEffect(() => () => pollRef.current?.abort(), []);
 
   const handleGenerateImage = async () => {
+    const controller = new AbortController();
+    pollRef.current = controller;
     setIsGenerating(true);
     setError(null);
 
     try {
-      // Single API call that handles generation and saving
+      // Starts generation; the image is saved (replacing the current one) when the job finishes
       const response = await fetchWithAuth(`/api/practice_cases/generate_image/${caseId}`, {
         method: 'POST',
         headers: {
@@ -43,14 +85,16 @@ const ImageManager: React.FC<ImageManagerProps> = ({ caseId, images, onImageUpda
         throw new Error(errData.error || 'Failed to generate image');
       }
 
-      const savedImage: PracticeCaseImage = await response.json();
+      const { job }: { job: ImageJob } = await response.json();
+      const savedImage = await waitForImageJob(job.id, controller.signal);
       
       // Replace the images array with just this one image (since we only allow one per case)
-      onImageUpdate([savedImage]);
+      if (savedImage) onImageUpdate([savedImage]);
     } catch (err) {
+      if (controller.signal.aborted) return;
       setError(err instanceof Error ? err.message : 'An unknown error occurred.');
     } finally {
-      setIsGenerating(false);
+      if (!controller.signal.aborted) setIsGenerating(false);
     }
   };
 
@@ -195,10 +239,14 @@ const ImageManager: React.FC<ImageManagerProps> = ({ caseId, images, onImageUpda
               {currentImage ? (
                 <div className="relative group">
                   <div className="aspect-square rounded-xl border-2 border-gray-200 overflow-hidden bg-white shadow-lg">
-                    <img 
-                      src={currentImage.image_url} 
-                      alt="Practice Case Scenario" 
-                      className="w-full h-full object-cover"
+                    <ResponsiveImage
+                      src={currentImage.image_url}
+                      alt="Practice Case Scenario"
+                      sizes="(min-width: 768px) 384px, 100vw"
+                      variants={currentImage.variants}
+                      placeholder={currentImage.placeholder}
+                      className="w-full h-full"
+                      imgClassName="w-full h-full object-cover"
                     />
                   </div>
                   {/* Hover overlay with delete button */}
@@ -186,7 +186,8 @@ const PracticeCaseCard: React.FC<PracticeCaseCardProps> = ({
       if (onCaseUpdate) onCaseUpdate(result.case);
       
       setIsLibraryModalOpen(false);
-      alert("Case added to global library!");
+      // Near-duplicates of an existing library case are held for admin review
+      alert(result.duplicate_of ? result.message : "Case added to global library!");
     } catch (error) {
       console.error("Error submitting to library:", error);
       alert(error instanceof Error ? error.message : "Failed to submit to library");
@@ -62,8 +62,10 @@ const PracticeCases: React.FC = () => {
     try {
       setIsLoading(true);
       
-      const queryString = apiParams.toString();
-      const url = `/api/practice_cases/get_cases${queryString ? `?${queryString}` : ''}`;
+      const params = new URLSearchParams(apiParams.toString());
+      params.set('view', 'summary');
+
+      const url = `/api/practice_cases/get_cases?${params.toString()}`;
       
       const response = await fetchWithAuth(url);
       if (!response.ok) throw new Error("Failed to fetch practice cases");
@@ -1,26 +1,40 @@
-import React from "react";
+import React, { useState } from "react";
 import { Card } from "@/components/ui/card";
+import ResponsiveImage, { ImageVariant } from "@/components/common/ResponsiveImage";
 
 interface AIImageProps {
   scenarioImageUrl: string;
+  variants?: ImageVariant[];
+  placeholder?: string | null;
 }
 
-const AIImage: React.FC<AIImageProps> = ({ scenarioImageUrl }) => {
+const UNAVAILABLE_IMAGE =
+  "data:image/svg+xml;utf8,<svg xmlns='http://www.w3.org/2000/svg' width='600' height='600'><rect width='100%' height='100%' fill='%23f3f4f6'/><text x='50%' y='50%' dominant-baseline='middle' text-anchor='middle' fill='%236b7280' font-size='20'>Image unavailable</text></svg>";
+
+const AIImage: React.FC<AIImageProps> = ({ scenarioImageUrl, variants, placeholder }) => {
+  // A failed variant cannot be swapped out through img.src, so drop to a plain fallback
+  const [failed, setFailed] = useState(false);
+
   return (
     <Card className="h-full w-full overflow-hidden">
       <div className="h-full w-full flex items-center justify-center">
-        <img
-          src={scenarioImageUrl}
-          alt="Scenario"
-          className="max-h-full max-w-full object-contain"
-          onError={(e) => {
-            (e.currentTarget as HTMLImageElement).src =
-              "data:image/svg+xml;utf8,<svg xmlns='http://www.w3.org/2000/svg' width='600' height='600'><rect width='100%' height='100%' fill='%23f3f4f6'/><text x='50%' y='50%' dominant-baseline='middle' text-anchor='middle' fill='%236b7280' font-size='20'>Image unavailable</text></svg>";
-          }}
-        />
+        {failed ? (
+          <img src={UNAVAILABLE_IMAGE} alt="Scenario" className="max-h-full max-w-full object-contain" />
+        ) : (
+          <ResponsiveImage
+            src={scenarioImageUrl}
+            alt="Scenario"
+            sizes="(min-width: 768px) 50vw, 100vw"
+            variants={variants}
+            placeholder={placeholder}
+            className="max-h-full max-w-full"
+            imgClassName="max-h-full max-w-full object-contain"
+            onError={() => setFailed(true)}
+          />
+        )}
       </div>
     </Card>
   );
 };
 
-export default AIImage;
\ No newline at end of file
+export default AIImage;
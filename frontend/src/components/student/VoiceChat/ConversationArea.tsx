@@ -4,6 +4,7 @@ import { Card, CardContent } from "@/components/ui/card";
 import { Pause, Wifi, WifiOff } from "lucide-react";
 import Timer from "./Timer";
 import AIImage from "./AIImage";
+import { ImageVariant } from "@/components/common/ResponsiveImage";
 import SpeechAndControlsPanel from "./SpeechAndControlsPanel";
 import { Alert, AlertDescription } from "@/components/ui/alert";
 
@@ -14,6 +15,8 @@ interface PracticeCase {
   description: string;
   system_prompt: string;
   image_url?: string;
+  image_variants?: ImageVariant[];
+  image_placeholder?: string | null;
   notes_for_students?: string;
 }
 
@@ -161,7 +164,11 @@ const ConversationArea: React.FC<ConversationAreaProps> = ({
             <div className="grid grid-cols-2 gap-8" style={{ height: '70vh' }}>
               {/* Left Column - Image */}
               <div className="flex items-center justify-center">
-                <AIImage scenarioImageUrl={scenarioImageUrl!} />
+                <AIImage
+                  scenarioImageUrl={scenarioImageUrl!}
+                  variants={practiceCase?.image_variants}
+                  placeholder={practiceCase?.image_placeholder}
+                />
               </div>
 
               {/* Right Column - Combined Speech and Controls */}
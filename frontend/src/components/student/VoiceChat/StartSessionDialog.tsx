@@ -10,6 +10,7 @@ import { Button } from "@/components/ui/button";
   import { motion, AnimatePresence } from "framer-motion";
 import { Info } from "lucide-react";
 import { Alert, AlertDescription } from "@/components/ui/alert";
+import ResponsiveImage, { ImageVariant } from "@/components/common/ResponsiveImage";
 
 interface PracticeCase {
   id: number;
@@ -18,6 +19,8 @@ interface PracticeCase {
   description: string;
   system_prompt: string;
   image_url?: string;
+  image_variants?: ImageVariant[];
+  image_placeholder?: string | null;
 }
 
 interface StartSessionDialogProps {
@@ -208,10 +211,14 @@ const StartSessionDialog: React.FC<StartSessionDialogProps> = ({
                           {/* Image */}
                           <div className="flex justify-center md:justify-start">
                             <div className="w-[200px] aspect-square rounded-lg overflow-hidden border bg-gray-100">
-                              <img
+                              <ResponsiveImage
                                 src={practiceCase.image_url}
                                 alt="Scenario"
-                                className="w-full h-full object-cover"
+                                sizes="200px"
+                                variants={practiceCase.image_variants}
+                                placeholder={practiceCase.image_placeholder}
+                                className="w-full h-full"
+                                imgClassName="w-full h-full object-cover"
                               />
                             </div>
                           </div>
@@ -5,6 +5,7 @@ import { apiClient } from "../../../services/apiClient";
 import { setupWebRTCConnection } from "../../../services/websocket";
 import StartSessionDialog from "./StartSessionDialog";
 import ConversationArea from "./ConversationArea";
+import { ImageVariant } from "@/components/common/ResponsiveImage";
 import { Card, CardContent } from "@/components/ui/card";
 import { fetchWithAuth } from "@/utils/api";
 import { useAuth } from "@/contexts/AuthContext";
@@ -17,6 +18,8 @@ interface PracticeCase {
   description: string;
   system_prompt: string;
   image_url?: string;
+  image_variants?: ImageVariant[];
+  image_placeholder?: string | null;
   min_time: number; // in seconds
   max_time: number; // in seconds
 }
@@ -55,6 +58,7 @@ const VoiceChat: React.FC = () => {
   const [totalPausedTime, setTotalPausedTime] = useState(0);
 
   const conversationIdRef = useRef<number | null>(null);
+  const bootstrapAbortRef = useRef<AbortController | null>(null);
   const timerRef = useRef<NodeJS.Timeout | null>(null);
   const dataChannelRef = useRef<RTCDataChannel | null>(null);
   const noAudioHintTimeoutRef = useRef<NodeJS.Timeout | null>(null);
@@ -222,6 +226,9 @@ const VoiceChat: React.FC = () => {
     }
   }, [isAuthenticated, isSessionStarted, cleanupMediaResources]);
 
+  // Stop waiting in the session queue on unmount, so no session starts for a closed page
+  useEffect(() => () => bootstrapAbortRef.current?.abort(), []);
+
   // Cleanup on component unmount
   useEffect(() => {
     return () => {
@@ -382,6 +389,9 @@ const VoiceChat: React.FC = () => {
     clearIdlePromptTimer();
     setShowIdlePrompt(false);
 
+    const bootstrapAbort = new AbortController();
+    bootstrapAbortRef.current = bootstrapAbort;
+
     try {
       const userId = await fetchUserId();
       const practiceCaseId = parseInt(id as string, 10);
@@ -394,23 +404,29 @@ const VoiceChat: React.FC = () => {
         timestamp: new Date().toISOString(),
       });
 
-      const response = await fetchWithAuth("/api/conversations/conversation/start", {
-        method: "POST",
-        headers: { "Content-Type": "application/json" },
-        body: JSON.stringify({ user_id: userId, practice_case_id: practiceCaseId }),
-      });
-
-      const data = await response.json();
-      if (!response.ok) throw new Error(data.error || "Failed to start conversation");
-
       // compute numeric speed from the practiceCase setting
       const speed =
         typeof (practiceCase as any)?.speaking_speed_rate === "number"
           ? (practiceCase as any).speaking_speed_rate
           : mapSpeakingSpeedToRate((practiceCase as any)?.speaking_speed);
 
+      // One request creates the conversation and mints the realtime session
+      const data = await apiClient.bootstrapSession(practiceCaseId, {
+        speed,
+        signal: bootstrapAbort.signal,
+        onQueued: ({ position, eta_seconds }) =>
+          setStatus(
+            `Waiting for a free voice line (#${position} in line, about ${Math.max(
+              1,
+              Math.round(eta_seconds / 60)
+            )} min)...`
+          ),
+      });
+
+      if (bootstrapAbort.signal.aborted) return;
+
       conversationIdRef.current = data.conversation_id;
-      const { client_secret } = await apiClient.createSession(userId, practiceCaseId, { speed });
+      const { client_secret } = data.session;
 
       startNoAudioHintTimer();
 
@@ -459,6 +475,9 @@ const VoiceChat: React.FC = () => {
 
       setStatus("Waiting for AI...");
     } catch (err) {
+      // The page unmounted while the session was starting
+      if (bootstrapAbort.signal.aborted) return;
+
       console.error("Session error:", err);
 
       clearNoAudioHintTimer();
@@ -65,6 +65,8 @@ const InstructorDashboard: React.FC = () => {
     setIsLoading(true);
     try {
       const queryString = apiParams.toString();
+      const casesParams = new URLSearchParams(queryString);
+      casesParams.set('view', 'summary');
       
       const [
         engagementRes, 
@@ -72,7 +74,7 @@ const InstructorDashboard: React.FC = () => {
         analyticsRes
       ] = await Promise.all([
         fetchWithAuth(`/api/instructors/students/engagement${queryString ? `?${queryString}` : ''}`),
-        fetchWithAuth(`/api/practice_cases/get_cases${queryString ? `?${queryString}` : ''}`),
+        fetchWithAuth(`/api/practice_cases/get_cases?${casesParams.toString()}`),
         fetchWithAuth(`/api/instructors/analytics${queryString ? `?${queryString}` : ''}`)
       ]);
 
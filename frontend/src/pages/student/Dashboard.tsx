@@ -46,9 +46,11 @@ const StudentDashboard: React.FC = () => {
     setIsLoading(true);
     try {
       const queryString = apiParams.toString();
+      const casesParams = new URLSearchParams(queryString);
+      casesParams.set('view', 'summary');
       
       const [casesResponse, convResponse, progressResponse] = await Promise.all([
-        fetchWithAuth(`/api/practice_cases/get_cases${queryString ? `?${queryString}` : ''}`),
+        fetchWithAuth(`/api/practice_cases/get_cases?${casesParams.toString()}`),
         fetchWithAuth(`/api/conversations/conversation/latest${queryString ? `?${queryString}` : ''}`),
         fetchWithAuth(`/api/students/progress${queryString ? `?${queryString}` : ''}`)
       ]);
@@ -1,11 +1,14 @@
 // services/apiClient.ts
 import { fetchWithAuth } from "@/utils/api";
 
+// How long bootstrapSession waits in the session queue before giving up
+const BOOTSTRAP_MAX_WAIT_SECONDS = 15 * 60;
+
 export const apiClient = {
   createSession: async (
     userId: number,
     practiceCaseId: number,
-    opts?: { speed?: number } // ← NEW
+    opts?: { speed?: number; conversationId?: number } // ← NEW
   ): Promise<{ client_secret: string; session_id: string }> => {
     try {
       const response = await fetchWithAuth("/api/chatbot/session", {
@@ -15,6 +18,8 @@ export const apiClient = {
           user_id: userId,
           practice_case_id: practiceCaseId,
           speed: opts?.speed, // ← NEW
+          // Lets ending the conversation free this session's slot
+          conversation_id: opts?.conversationId,
         }),
       });
 
@@ -29,4 +34,71 @@ export const apiClient = {
       throw error;
     }
   },
+
+  // Creates the conversation and mints the realtime session in one request.
+  // While the institution is at its concurrent session limit the server answers
+  // 202 with a queue ticket; keep polling with it and report the position,
+  // until maxWaitSeconds pass or the signal aborts (e.g. the page unmounts).
+  bootstrapSession: async (
+    practiceCaseId: number,
+    opts?: {
+      speed?: number;
+      onQueued?: (queue: { position: number; eta_seconds: number }) => void;
+      signal?: AbortSignal;
+      maxWaitSeconds?: number;
+    }
+  ): Promise<{
+    conversation_id: number;
+    start_time: string;
+    session: { client_secret: string; session_id: string };
+    timings: Record<string, number>;
+  }> => {
+    const signal = opts?.signal;
+    const deadline = Date.now() + (opts?.maxWaitSeconds ?? BOOTSTRAP_MAX_WAIT_SECONDS) * 1000;
+    try {
+      let ticket: number | undefined;
+      while (true) {
+        const response = await fetchWithAuth("/api/chatbot/bootstrap", {
+          method: "POST",
+          headers: { "Content-Type": "application/json" },
+          body: JSON.stringify({
+            practice_case_id: practiceCaseId,
+            speed: opts?.speed,
+            ticket,
+          }),
+          signal,
+        });
+
+        const data = await response.json();
+        if (!response.ok) {
+          throw new Error(data.error || "Failed to start conversation");
+        }
+
+        if (response.status === 202) {
+          ticket = data.ticket;
+          if (Date.now() >= deadline) {
+            throw new Error("No voice line became free. Please try again in a few minutes.");
+          }
+          opts?.onQueued?.(data);
+          await new Promise<void>((resolve, reject) => {
+            const timer = setTimeout(resolve, (data.poll_after_seconds || 3) * 1000);
+            signal?.addEventListener(
+              "abort",
+              () => {
+                clearTimeout(timer);
+                reject(new DOMException("Session start cancelled", "AbortError"));
+              },
+              { once: true }
+            );
+          });
+          continue;
+        }
+
+        return data;
+      }
+    } catch (error) {
+      console.error("Error in bootstrapSession:", error);
+      throw error;
+    }
+  },
 };